@@ -1,55 +1,324 @@
 """Contains the Combat class."""
+import random
+from array import array
+from typing import Any
+from typing import Collection
+from typing import Counter
+from typing import Dict
+from typing import FrozenSet
+from typing import Hashable
 from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
 
 from . import attack as a
 from . import combatant as c
+from . import events as ev
 from . import helpers as h
+from . import policy as p
+from . import rng
+from . import sinks
+from . import turn_order as t
+
+
+class CombatResult(NamedTuple):
+    """How a Combat ended. Survivors are given by combatant_id."""
+
+    winner: Optional[Hashable]
+    rounds: int
+    survivors: Tuple[int, ...]
+    hit_points: Tuple[int, ...]
+
+
+class CombatSnapshot(NamedTuple):
+    """Mutable state of a Combat, as saved by snapshot().
+
+    combatant_states holds the Combatant.state() of every Combatant in the
+    roster, four numbers each, in combatant_id order. The roster itself is
+    a tuple of the same Combatant objects, not copies.
+    """
+
+    has_started: bool
+    has_finished: bool
+    current_round: int
+    current_initiative: int
+    current_combatant_id: Optional[int]
+    roster: Tuple[c.Combatant, ...]
+    active_ids: Tuple[int, ...]
+    combatant_states: "array[int]"
+    turn_keys: Tuple[t.TurnKey, ...]
+    turn_ids: Tuple[int, ...]
+    cursor: int
+    joined: int
+    event_count: int
+    random_state: Any
 
 
 class Combat:
     """Keeps a collection of Combatants and tracks progress of fight."""
 
-    def __init__(self, combatant_list: List[c.Combatant]):
-        """New instance with the supplied list of Combatants."""
+    def __init__(
+        self,
+        combatant_list: List[c.Combatant],
+        random_source: Optional[rng.RandomSource] = None,
+        log_level: h.LogLevel = h.LogLevel.TECHNICAL,
+        log_sink: Optional[sinks.LogSink] = None,
+        alliances: Optional[Sequence[Collection[Hashable]]] = None,
+    ):
+        """New instance with the supplied list of Combatants.
+
+        If a random_source is given, every Combatant rolls from it, so the
+        whole Combat can be reproduced from its seed. log_level controls which
+        events are recorded; events below it cost only a flag check.
+        Recorded events are sent to log_sink in batches, by flush_log() and
+        when the combat ends. By default they are printed to stdout.
+        Factions in the same one of the alliances fight on the same side.
+        """
         self.has_started: bool = False
         self.has_finished: bool = False
         self.current_round: int = 0
         self.current_initiative: int = 0
         self.initiative_order: dict = {}
-        self.combatant_list: List[c.Combatant] = combatant_list
+        self.combatants_by_id: Dict[int, c.Combatant] = {}
+        self.roster: Dict[int, c.Combatant] = {}
+        self.combatant_ids: Dict[c.Combatant, int] = {}
+        self.next_combatant_id: int = 0
+        self.alliance_of: Dict[Hashable, FrozenSet[Hashable]] = {}
+        for alliance in alliances or ():
+            for faction in alliance:
+                self.alliance_of[faction] = frozenset(alliance)
+        self.dodging: Dict[int, c.Combatant] = {}
+        self.disengaging: Dict[int, c.Combatant] = {}
+        self.readied: Dict[int, c.Combatant] = {}
+        self.standing_sides: Dict[int, Hashable] = {}
+        self.side_counts: Counter[Hashable] = Counter()
+        self.newest_standing: int = -1
+        self.combatant_list = combatant_list
         self.current_combatant: c.Combatant
         self.used_initiatives: List[int] = []
-        self.narrative_log: str = ""
-        self.technical_log: str = ""
+        self.turn_order: t.TurnOrder = t.TurnOrder()
+        self.event_log: List[ev.LogEntry] = []
+        self.log_level: h.LogLevel
+        self.logs_narrative: bool
+        self.logs_technical: bool
+        self.set_log_level(log_level=log_level)
+        self.log_sink: sinks.LogSink = (
+            log_sink if log_sink is not None else sinks.PrintSink()
+        )
+        self.flushed_entries: int = 0
+        self.random_source: Optional[rng.RandomSource] = None
+        if random_source is not None:
+            self.set_random_source(random_source=random_source)
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Unpickle or copy, listening again to the Combatants still in it."""
+        self.__dict__.update(state)
+        for combatant in self.combatants_by_id.values():
+            combatant.status_listeners.append(self.update_status)
+
+    @property
+    def combatant_list(self) -> Tuple[c.Combatant, ...]:
+        """Combatants still in the combat, in the order they joined.
+
+        A new tuple on each read: use add_combatant() and remove_combatant()
+        to change who is in the combat.
+        """
+        return tuple(self.combatants_by_id.values())
+
+    @combatant_list.setter
+    def combatant_list(self, combatant_list: List[c.Combatant]) -> None:
+        """Replace the Combatants in the combat, registering each of them."""
+        for combatant in self.combatants_by_id.values():
+            combatant.status_listeners.remove(self.update_status)
+        self.combatants_by_id = {}
+        self.dodging.clear()
+        self.disengaging.clear()
+        self.readied.clear()
+        for combatant in combatant_list:
+            self.register_combatant(combatant=combatant)
+        self.recount_sides()
+
+    def register_combatant(self, combatant: c.Combatant) -> int:
+        """Give a Combatant the next free id and add it to the registry."""
+        combatant_id = self.next_combatant_id
+        self.next_combatant_id += 1
+        self.combatant_ids[combatant] = combatant_id
+        self.combatants_by_id[combatant_id] = combatant
+        self.roster[combatant_id] = combatant
+        combatant.status_listeners.append(self.update_status)
+        self.update_status(combatant=combatant)
+        return combatant_id
+
+    def combatant_with_id(self, combatant_id: int) -> c.Combatant:
+        """The Combatant still in the combat with a given id."""
+        try:
+            return self.combatants_by_id[combatant_id]
+        except KeyError as ke:
+            raise ValueError(
+                f"Combatant {combatant_id} not found in combatant list."
+            ) from ke
+
+    def id_of(self, combatant: c.Combatant) -> int:
+        """The combatant_id a Combatant was given on joining this combat.
+
+        Ids belong to the Combat, so a Combatant can be in several at once.
+        """
+        try:
+            return self.combatant_ids[combatant]
+        except KeyError as ke:
+            raise ValueError(
+                f"Combatant {str(combatant)} has not joined this combat."
+            ) from ke
+
+    def side(self, faction: Hashable) -> Hashable:
+        """The side a faction fights on: its alliance, or just itself."""
+        return self.alliance_of.get(faction, faction)
+
+    def update_standing(self, combatant: c.Combatant) -> None:
+        """Recount a Combatant's side after it joins, leaves, drops or flees.
+
+        Combatants count towards their side while they are in the combat,
+        above 0 HP and have not fled. standing_sides stays in join order,
+        so one coming back up from 0 HP is sorted back into place.
+        take_damage() and heal() report drops to and rises from 0 HP
+        through update_status(); after setting hit points, faction or
+        fighting status directly, call recount_sides().
+        """
+        combatant_id = self.id_of(combatant=combatant)
+        standing = (
+            combatant_id in self.combatants_by_id
+            and combatant.current_hit_points > 0
+            and combatant.fighting_status != h.FightingStatus.FLED
+        )
+        if standing == (combatant_id in self.standing_sides):
+            return
+        if not standing:
+            old_side = self.standing_sides.pop(combatant_id)
+            self.side_counts[old_side] -= 1
+            if not self.side_counts[old_side]:
+                del self.side_counts[old_side]
+            return
+        new_side = self.side(faction=combatant.faction)
+        self.standing_sides[combatant_id] = new_side
+        self.side_counts[new_side] += 1
+        if combatant_id < self.newest_standing:
+            self.standing_sides = dict(sorted(self.standing_sides.items()))
+        else:
+            self.newest_standing = combatant_id
+
+    def update_status(self, combatant: c.Combatant) -> None:
+        """Keep the side counts and action indexes in step with a Combatant.
+
+        Registered Combatants call this whenever their action flags change,
+        and when they drop to or rise from 0 HP, so it also recounts their
+        side.
+        """
+        self.update_standing(combatant=combatant)
+        combatant_id = self.id_of(combatant=combatant)
+        active = combatant_id in self.combatants_by_id
+        for index, flag in (
+            (self.dodging, combatant.is_dodging),
+            (self.disengaging, combatant.is_disengaging),
+            (self.readied, combatant.is_readied),
+        ):
+            if active and flag:
+                index[combatant_id] = combatant
+            else:
+                index.pop(combatant_id, None)
+
+    def recount_sides(self) -> None:
+        """Rebuild the side counts, e.g. after changing a Combatant's faction."""
+        self.standing_sides.clear()
+        self.side_counts.clear()
+        self.newest_standing = -1
+        for combatant in self.combatants_by_id.values():
+            self.update_standing(combatant=combatant)
+
+    @property
+    def narrative_log(self) -> str:
+        """Text of the narrative log, rendered from the event log."""
+        return ev.render_channel(
+            entries=self.event_log, log_channel=ev.Channel.NARRATIVE
+        )
+
+    @property
+    def technical_log(self) -> str:
+        """Text of the technical log, rendered from the event log."""
+        return ev.render_channel(
+            entries=self.event_log, log_channel=ev.Channel.TECHNICAL
+        )
+
+    def log_event(
+        self, event: ev.Event, actor: Any = None, target: Any = None, *values: Any
+    ) -> None:
+        """Record an event in the event log, to be rendered only if needed.
+
+        Combatants are recorded by id; roster maps the ids back to them.
+        """
+        if isinstance(actor, c.Combatant):
+            actor = self.combatant_ids.get(actor)
+        if isinstance(target, c.Combatant):
+            target = self.combatant_ids.get(target)
+        self.event_log.append(
+            ev.LogEntry(
+                self.current_round,
+                self.current_initiative,
+                event,
+                actor,
+                target,
+                values,
+            )
+        )
+
+    def set_log_level(self, log_level: h.LogLevel) -> None:
+        """Choose which events are recorded from now on."""
+        self.log_level = log_level
+        self.logs_narrative = log_level.value >= h.LogLevel.NARRATIVE.value
+        self.logs_technical = log_level.value >= h.LogLevel.TECHNICAL.value
+
+    def flush_log(self) -> None:
+        """Send every event recorded since the last flush to the log sink."""
+        if self.flushed_entries < len(self.event_log):
+            self.log_sink.write(entries=self.event_log[self.flushed_entries :])
+            self.flushed_entries = len(self.event_log)
+        self.log_sink.flush()
 
     def narrative_log_comment(self, comment: str) -> None:
         """Append line to narrative log."""
-        log_line = (
-            f"R: {str(self.current_round)}  "
-            f"I:{str(self.current_initiative)} {comment}\n"
-        )
-        self.narrative_log += log_line
+        if self.logs_narrative:
+            self.log_event(ev.Event.NARRATIVE_COMMENT, None, None, comment)
 
     def technical_log_comment(self, comment: str) -> None:
         """Append line to technical log."""
-        log_line = (
-            f"R: {str(self.current_round)}  "
-            f"I:{str(self.current_initiative)} {comment}\n"
-        )
-        self.technical_log += log_line
+        if self.logs_technical:
+            self.log_event(ev.Event.TECHNICAL_COMMENT, None, None, comment)
+
+    def set_random_source(self, random_source: rng.RandomSource) -> None:
+        """Roll all dice in this Combat from random_source."""
+        self.random_source = random_source
+        for combatant in self.combatants_by_id.values():
+            combatant.random_source = random_source
 
     def populate_used_initiatives(self) -> None:
-        """Recreate the used_initiatives list."""
-        self.technical_log_comment("Repopulated used initiative list.")
+        """Recreate the used_initiatives list and the turn order."""
+        if self.logs_technical:
+            self.log_event(ev.Event.REPOPULATED_INITIATIVES)
         self.used_initiatives = sorted(self.initiative_order.keys(), reverse=True)
+        self.turn_order.clear()
+        for initiative in self.used_initiatives:
+            for combatant in self.initiative_order[initiative]:
+                self.turn_order.insert(combatant=combatant, initiative=initiative)
 
     def fill_initiative_list(self) -> None:
         """Populates initiative_order dict.
 
         Each combatant in combatant_list generates its own initiative
         """
-        self.technical_log_comment("Filled initiative order.")
-        for combatant in self.combatant_list:
+        if self.logs_technical:
+            self.log_event(ev.Event.FILLED_INITIATIVE)
+        for combatant in self.combatants_by_id.values():
             initiative = combatant.roll_initiative(dex_modifier=0)
             if initiative in self.initiative_order:
                 self.initiative_order[initiative].append(combatant)
@@ -62,42 +331,43 @@ class Combat:
 
         Also adds combatant to initiative_order if that is populated.
         """
-        self.narrative_log_comment(
-            comment=f"Combatant {str(new_combatant)} joined the combat."
-        )
-        self.combatant_list.append(new_combatant)
+        self.register_combatant(combatant=new_combatant)
+        if self.logs_narrative:
+            self.log_event(ev.Event.JOINED, new_combatant)
+        if self.random_source is not None:
+            new_combatant.random_source = self.random_source
         if self.initiative_order:
             new_initiative = new_combatant.roll_initiative()
             if new_initiative in self.initiative_order:
                 self.initiative_order[new_initiative].append(new_combatant)
             else:
                 self.initiative_order[new_initiative] = [new_combatant]
-        self.used_initiatives = sorted(self.initiative_order.keys(), reverse=True)
+                t.insert_descending(values=self.used_initiatives, value=new_initiative)
+            self.turn_order.insert(combatant=new_combatant, initiative=new_initiative)
 
     def add_combatants(self, new_combatants: List[c.Combatant]) -> None:
         """Iteratively adds members of supplied list of combatants."""
-        self.technical_log_comment(f"Adding {len(new_combatants)} new combatants.")
+        if self.logs_technical:
+            self.log_event(ev.Event.ADDING_COMBATANTS, None, None, len(new_combatants))
         for new_combatant in new_combatants:
             self.add_combatant(new_combatant=new_combatant)
 
     def can_start_combat(self) -> bool:
         """True when all prerequisites are complete to begin combat."""
-        if not self.combatant_list:
-            self.technical_log_comment(
-                "Cannot start combat as there are no combatants."
-            )
+        if not self.combatants_by_id:
+            if self.logs_technical:
+                self.log_event(ev.Event.NO_COMBATANTS)
             return False
         if not self.initiative_order:
-            self.technical_log_comment(
-                "Cannot start combat as the initiative order is not populated."
-            )
+            if self.logs_technical:
+                self.log_event(ev.Event.NO_INITIATIVE_ORDER)
             return False
         if self.current_round != 0:
-            self.technical_log_comment(
-                f"Cannot start combat as current round = {str(self.current_round)}."
-            )
+            if self.logs_technical:
+                self.log_event(ev.Event.ROUND_NOT_ZERO, None, None, self.current_round)
             return False
-        self.technical_log_comment("Can start combat.")
+        if self.logs_technical:
+            self.log_event(ev.Event.CAN_START)
         return True
 
     def remove_combatant(self, combatant_to_remove: c.Combatant) -> None:
@@ -106,81 +376,80 @@ class Combat:
         Combatant removed from combatant_list, and from initiative_order if it
         is populated. Combat finished automatically if combat_over() is True.
         """
-        self.narrative_log_comment(
-            comment=f"Removing Combatant {str(combatant_to_remove)}."
-        )
-        try:
-            self.combatant_list.remove(combatant_to_remove)
-        except ValueError as ve:
+        combatant_id = self.combatant_ids.get(combatant_to_remove)
+        if (
+            combatant_id is None
+            or self.combatants_by_id.get(combatant_id) is not combatant_to_remove
+        ):
             raise ValueError(
                 f"Combatant {str(combatant_to_remove)} not found in combatant list."
-            ) from ve
+            )
+        self.remove_combatant_by_id(combatant_id=combatant_id)
+
+    def remove_combatant_by_id(self, combatant_id: int) -> None:
+        """Remove the Combatant with a given id from this combat."""
+        combatant_to_remove = self.combatant_with_id(combatant_id=combatant_id)
+        if self.logs_narrative:
+            self.log_event(ev.Event.REMOVING, combatant_to_remove)
+        del self.combatants_by_id[combatant_id]
+        self.update_standing(combatant=combatant_to_remove)
+        combatant_to_remove.status_listeners.remove(self.update_status)
+        self.update_status(combatant=combatant_to_remove)
         if self.initiative_order:
-            combatant_initiative: int
-            for initiative, combatants in self.initiative_order.items():
-                if combatant_to_remove in combatants:
-                    combatants.remove(combatant_to_remove)
-                    combatant_initiative = initiative
-                    break
-            else:  # I finally used it.
+            if combatant_to_remove not in self.turn_order:
                 raise ValueError(
                     f"Combatant {str(combatant_to_remove)} not found in "
                     "initiative order."
                 )
+            combatant_initiative = self.turn_order.remove(combatant=combatant_to_remove)
+            self.initiative_order[combatant_initiative].remove(combatant_to_remove)
             if len(self.initiative_order[combatant_initiative]) == 0:
                 del self.initiative_order[combatant_initiative]
+                self.used_initiatives.remove(combatant_initiative)
         if self.combat_over():
             self.end_combat()
 
     def start_combat(self) -> None:
         """Start the round counter, set the current initiative and current combatant."""
-        self.technical_log_comment("Starting combat.")
+        if self.logs_technical:
+            self.log_event(ev.Event.STARTING)
+        self.recount_sides()
         self.current_round = 1
-        self.current_initiative = self.used_initiatives[0]
-        self.current_combatant = self.initiative_order[self.current_initiative][0]
+        self.current_combatant = self.turn_order.start()
+        self.current_initiative = self.turn_order.current_initiative()
         self.has_started = True
 
     def next_combatant(self) -> c.Combatant:
         """Return the combatant that will be next."""
-        self.technical_log_comment("Getting next combatant.")
+        if self.logs_technical:
+            self.log_event(ev.Event.GETTING_NEXT_COMBATANT)
         if not self.has_started or self.has_finished:
-            self.technical_log_comment(
-                "Trying to determine next_combatant when combat is not in progress"
-            )
+            if self.logs_technical:
+                self.log_event(ev.Event.NOT_IN_PROGRESS)
             raise ValueError(
                 "Cannot get next_combatant when combat is not in progress."
             )
-        num_equal_initiative_combatants = len(
-            self.initiative_order[self.current_initiative]
-        )
-        if (
-            num_equal_initiative_combatants > 1
-            and self.initiative_order[self.current_initiative][-1]
-            != self.current_combatant
-        ):
-            for position, combatant in enumerate(
-                self.initiative_order[self.current_initiative]
-            ):
-                if combatant == self.current_combatant:
-                    return self.initiative_order[self.current_initiative][position + 1]
-            raise ValueError(
-                f"next_combatant() could not find {str(self.current_combatant)}"
-                f" in the list for initiative {self.current_initiative}"
-            )
-        return self.initiative_order[self.next_initiative()][0]
+        return self.turn_order.peek()
 
     def advance_combatant(self) -> c.Combatant:
-        """Advance the combatant by one and return them."""
-        self.technical_log_comment(f"Moving to Combatant {str(self.next_combatant())}.")
+        """Advance the combatant by one and return them.
+
+        Wrapping round to the top of the turn order starts a new round.
+        """
+        next_combatant = self.next_combatant()
+        if self.logs_technical:
+            self.log_event(ev.Event.MOVING_TO_COMBATANT, next_combatant)
         self.current_combatant.end_turn()
-        self.narrative_log_comment(
-            f"Combatant {str(self.next_combatant())}'s turn is over."
-        )
-        self.current_combatant = self.next_combatant()
+        if self.logs_narrative:
+            self.log_event(ev.Event.TURN_OVER, self.current_combatant)
+        new_round = self.turn_order.at_end()
+        self.current_combatant = self.turn_order.advance()
+        self.current_initiative = self.turn_order.current_initiative()
+        if new_round:
+            self.advance_round()
         self.current_combatant.start_turn()
-        self.narrative_log_comment(
-            f"Combatant {str(self.next_combatant())}'s turn is starting."
-        )
+        if self.logs_narrative:
+            self.log_event(ev.Event.TURN_STARTING, self.current_combatant)
         return self.current_combatant
 
     def next_initiative(self) -> int:
@@ -189,54 +458,48 @@ class Combat:
         Goes to the next used initiative, or back to the highest if currently
         at the lowest used initiative.
         """
-        for this_initiative in self.used_initiatives:
-            if this_initiative < self.current_initiative:
-                return this_initiative
-        return max(self.used_initiatives)
+        return t.next_lower(values=self.used_initiatives, value=self.current_initiative)
 
     def advance_initiative(self) -> None:
         """Advance the initiative."""
-        self.technical_log_comment(
-            f"Moving to initiative {str(self.next_initiative())}."
-        )
-        self.current_initiative = self.next_initiative()
+        next_initiative = self.next_initiative()
+        if self.logs_technical:
+            self.log_event(ev.Event.MOVING_TO_INITIATIVE, None, None, next_initiative)
+        self.current_initiative = next_initiative
 
     def advance_round(self) -> int:
         """Increment the round number and return it."""
-        self.technical_log_comment(f"Starting round {str(self.current_round+1)}.")
+        if self.logs_technical:
+            self.log_event(ev.Event.STARTING_ROUND, None, None, self.current_round + 1)
         self.current_round += 1
         return self.current_round
 
     def combat_over(self) -> bool:
         """Should the combat be finished?"""
         if not self.has_started:
-            self.technical_log_comment("Combat cannot end because it has not started.")
+            if self.logs_technical:
+                self.log_event(ev.Event.NOT_STARTED)
             return False
 
-        # are multiple factions present?
-        enemies_present: bool = False
-        pcs_present: bool = False
-        for combatant in self.combatant_list:
-            if combatant.faction == h.Faction.ENEMIES:
-                enemies_present = True
-            else:
-                pcs_present = True
-            if enemies_present and pcs_present:
-                self.technical_log_comment(
-                    "Combat cannot end because multiple factions are still present."
-                )
-                return False
-        self.technical_log_comment("Combat can end.")
+        if len(self.side_counts) > 1:
+            if self.logs_technical:
+                self.log_event(ev.Event.FACTIONS_PRESENT)
+            return False
+        if self.logs_technical:
+            self.log_event(ev.Event.CAN_END)
         return True
 
+    def flee_combatant(self, combatant_to_flee: c.Combatant) -> None:
+        """A Combatant flees, and is removed from the combat."""
+        combatant_to_flee.fighting_status = h.FightingStatus.FLED
+        self.remove_combatant(combatant_to_remove=combatant_to_flee)
+
     def end_combat(self) -> None:
         """End the combat."""
-        self.technical_log_comment("Ending the combat.")
+        if self.logs_technical:
+            self.log_event(ev.Event.ENDING)
         self.has_finished = True
-        print()
-        print(self.narrative_log)
-        print()
-        print(self.technical_log)
+        self.flush_log()
 
     def damage_combatant(
         self,
@@ -245,17 +508,44 @@ class Combat:
         damage_type: h.DamageType,
     ) -> None:
         """Apply a given number of HP of damage, of a given type, to a Combatant."""
-        self.technical_log_comment(
-            f"{combatant_to_damage} takes {str(gross_damage)} "
-            f"HP of {damage_type} damage."
-        )
+        if self.logs_technical:
+            self.log_event(
+                ev.Event.TAKES_DAMAGE,
+                combatant_to_damage,
+                None,
+                gross_damage,
+                damage_type,
+            )
         combatant_to_damage.take_damage(hp_damage=gross_damage, damage_type=damage_type)
         if combatant_to_damage.current_hit_points < 1:
-            self.technical_log_comment(
-                f"{combatant_to_damage} has 0HP or fewer, and is removed."
-            )
+            if self.logs_technical:
+                self.log_event(ev.Event.REMOVED_AT_ZERO_HP, combatant_to_damage)
             self.remove_combatant(combatant_to_remove=combatant_to_damage)
 
+    def log_attack_roll(
+        self,
+        attacking_combatant: c.Combatant,
+        attack_score: int,
+        dice_score: int,
+        is_critical: bool,
+        hits: bool,
+    ) -> None:
+        """Record the narrative event describing an attack roll."""
+        if dice_score == 1:
+            self.log_event(ev.Event.NATURAL_ONE, attacking_combatant)
+        elif dice_score == 20:
+            self.log_event(ev.Event.NATURAL_TWENTY, attacking_combatant)
+        elif is_critical:
+            self.log_event(ev.Event.CRITICAL_HIT, attacking_combatant, None, dice_score)
+        else:
+            self.log_event(
+                ev.Event.HIT if hits else ev.Event.MISS,
+                attacking_combatant,
+                None,
+                dice_score,
+                attack_score,
+            )
+
     def manage_attack(
         self,
         attacking_combatant: c.Combatant,
@@ -263,71 +553,246 @@ class Combat:
         target_combatant: c.Combatant,
     ) -> None:
         """Determine if the Attack hits and manage any damage done."""
-        self.narrative_log_comment(
-            comment=f"{attacking_combatant} attacks {target_combatant} with "
-            f"{attack_used}"
-        )
+        if self.logs_narrative:
+            self.log_event(
+                ev.Event.ATTACKS, attacking_combatant, target_combatant, attack_used
+            )
         attack_score, dice_score, is_critical = attacking_combatant.roll_attack(
             attack=attack_used
         )
-        if dice_score == 1:
-            self.narrative_log_comment(
-                comment=f"{attacking_combatant} rolls a 1 and misses."
+        hits = c.attack_hits(
+            raw_dice_score=dice_score,
+            attack_score=attack_score,
+            armor_class=target_combatant.armor_class,
+        )
+        if self.logs_narrative:
+            self.log_attack_roll(
+                attacking_combatant=attacking_combatant,
+                attack_score=attack_score,
+                dice_score=dice_score,
+                is_critical=is_critical,
+                hits=hits,
             )
+        if not hits:
             return
-        if dice_score == 20:
-            self.narrative_log_comment(
-                comment=f"{attacking_combatant} rolls a 20 and makes a critical hit."
-            )
-        elif is_critical:
-            self.narrative_log_comment(
-                comment=f"{attacking_combatant} makes a critical hit with a "
-                f"roll of {str(dice_score)}"
-            )
-        elif attack_score >= target_combatant.armor_class:
-            self.narrative_log_comment(
-                comment=f"{attacking_combatant} rolls a {str(dice_score)}, "
-                f"hitting with a score of {str(attack_score)} ."
+        raw_damage, damage_type = attacking_combatant.roll_damage(
+            attack=attack_used, critical_hit=is_critical
+        )
+        if self.logs_narrative:
+            self.log_event(
+                ev.Event.DAMAGE_DEALT,
+                attacking_combatant,
+                None,
+                raw_damage,
+                damage_type,
             )
-        else:
-            self.narrative_log_comment(
-                comment=f"{attacking_combatant} rolls a {str(dice_score)},"
-                f" missing with a score of {str(attack_score)} ."
+        target_combatant.take_damage(hp_damage=raw_damage, damage_type=damage_type)
+        if self.logs_narrative:
+            self.log_event(
+                ev.Event.HIT_POINTS_NOW,
+                target_combatant,
+                None,
+                target_combatant.current_hit_points,
             )
+
+    def take_turn(
+        self,
+        attacker: c.Combatant,
+        target_policy: p.TargetPolicy = p.first_standing_enemy,
+        attack_policy: p.AttackPolicy = p.first_attack,
+    ) -> None:
+        """Attack whoever the policies choose, removing the target if it drops.
+
+        A Combatant that is not standing, e.g. one at 0 HP whose removal
+        condition is not met yet, does nothing. The combat ends as soon as
+        only one side is standing, whether or not the target was removed.
+        """
+        if self.id_of(combatant=attacker) not in self.standing_sides:
             return
-        raw_damage, damage_type = attacking_combatant.roll_damage(
-            attack=attack_used, critical_hit=is_critical
+        target = target_policy(self, attacker)
+        if target is None:
+            return
+        attack_used = attack_policy(attacker, target)
+        if attack_used is None:
+            return
+        self.manage_attack(
+            attacking_combatant=attacker,
+            attack_used=attack_used,
+            target_combatant=target,
+        )
+        if target.removal_conditions_met():
+            self.remove_combatant(combatant_to_remove=target)
+        elif len(self.side_counts) < 2 and self.combat_over():
+            self.end_combat()
+
+    def run_to_completion(
+        self,
+        target_policy: p.TargetPolicy = p.first_standing_enemy,
+        attack_policy: p.AttackPolicy = p.first_attack,
+        max_rounds: int = 100,
+    ) -> CombatResult:
+        """Fight until one side is left standing, or max_rounds have passed.
+
+        Rolls initiative and starts the combat if that has not been done.
+        Each Combatant attacks on its turn, choosing its target and Attack
+        with the policies given.
+        """
+        if not self.has_started:
+            if not self.initiative_order:
+                self.fill_initiative_list()
+            if not self.can_start_combat():
+                raise ValueError("Combat cannot be started.")
+            self.start_combat()
+            self.current_combatant.start_turn()
+            if self.combat_over():
+                self.end_combat()
+        while not self.has_finished:
+            self.take_turn(
+                attacker=self.current_combatant,
+                target_policy=target_policy,
+                attack_policy=attack_policy,
+            )
+            if self.has_finished:
+                break
+            if self.turn_order.at_end() and self.current_round >= max_rounds:
+                self.end_combat()
+                break
+            self.advance_combatant()
+        return self.result()
+
+    def result(self) -> CombatResult:
+        """Winner, rounds fought, and the survivors with their hit points."""
+        survivors = tuple(self.standing_sides)
+        return CombatResult(
+            winner=next(iter(self.side_counts)) if len(self.side_counts) == 1 else None,
+            rounds=self.current_round,
+            survivors=survivors,
+            hit_points=tuple(
+                self.combatants_by_id[combatant_id].current_hit_points
+                for combatant_id in survivors
+            ),
         )
-        self.narrative_log_comment(
-            comment=f"{attacking_combatant} causes {str(raw_damage)} HP of "
-            f"{damage_type} damage."
+
+    def snapshot(self) -> CombatSnapshot:
+        """Save the state of the combat, to go back to with restore().
+
+        Only what changes during a fight is saved: hit points, action flags,
+        the turn order, the length of the event log and the position of the
+        random source, or of the random module if there is no source.
+        Combatants and their Attacks are shared, not copied.
+        """
+        combatant_states: "array[int]" = array("q")
+        for combatant in self.roster.values():
+            combatant_states.extend(combatant.state())
+        current_combatant = getattr(self, "current_combatant", None)
+        return CombatSnapshot(
+            has_started=self.has_started,
+            has_finished=self.has_finished,
+            current_round=self.current_round,
+            current_initiative=self.current_initiative,
+            current_combatant_id=(
+                None
+                if current_combatant is None
+                else self.combatant_ids[current_combatant]
+            ),
+            roster=tuple(self.roster.values()),
+            active_ids=tuple(self.combatants_by_id),
+            combatant_states=combatant_states,
+            turn_keys=tuple(self.turn_order.keys),
+            turn_ids=tuple(
+                self.id_of(combatant=combatant) for combatant in self.turn_order.slots
+            ),
+            cursor=self.turn_order.cursor,
+            joined=self.turn_order.joined,
+            event_count=len(self.event_log),
+            random_state=(
+                random.getstate()
+                if self.random_source is None
+                else self.random_source.snapshot()
+            ),
         )
-        target_combatant.take_damage(hp_damage=raw_damage, damage_type=damage_type)
-        self.narrative_log_comment(
-            comment=f"{target_combatant} now has "
-            f"{str(target_combatant.current_hit_points)} HP ."
+
+    def restore(self, snapshot: CombatSnapshot) -> None:
+        """Go back to the state saved by snapshot().
+
+        Combatants that joined since are forgotten. Events recorded since
+        are dropped from the event log, but not recalled from the log sink.
+        """
+        self.restore_state(snapshot=snapshot)
+        if self.random_source is None:
+            random.setstate(snapshot.random_state)
+        else:
+            self.random_source.restore(snapshot=snapshot.random_state)
+
+    def restore_state(self, snapshot: CombatSnapshot) -> None:
+        """Everything restore() does except moving the random numbers back.
+
+        snapshot.random_state is not read, so it may be None.
+        """
+        self.restore_combatants(snapshot=snapshot)
+        self.turn_order.load(
+            keys=list(snapshot.turn_keys),
+            slots=[self.roster[combatant_id] for combatant_id in snapshot.turn_ids],
+            cursor=snapshot.cursor,
+            joined=snapshot.joined,
         )
+        self.initiative_order = {}
+        for position, key in enumerate(snapshot.turn_keys):
+            self.initiative_order.setdefault(-key[0], []).append(
+                self.turn_order.slots[position]
+            )
+        self.used_initiatives = sorted(self.initiative_order, reverse=True)
+        self.has_started = snapshot.has_started
+        self.has_finished = snapshot.has_finished
+        self.current_round = snapshot.current_round
+        self.current_initiative = snapshot.current_initiative
+        if snapshot.current_combatant_id is not None:
+            self.current_combatant = self.roster[snapshot.current_combatant_id]
+        del self.event_log[snapshot.event_count :]
+        self.flushed_entries = min(self.flushed_entries, snapshot.event_count)
+
+    def restore_combatants(self, snapshot: CombatSnapshot) -> None:
+        """Restore the registry, every Combatant's state, and the indexes."""
+        for combatant in self.combatants_by_id.values():
+            combatant.status_listeners.remove(self.update_status)
+        self.roster = dict(enumerate(snapshot.roster))
+        self.combatant_ids = {
+            combatant: combatant_id for combatant_id, combatant in self.roster.items()
+        }
+        self.next_combatant_id = len(snapshot.roster)
+        active = {
+            combatant_id: self.roster[combatant_id]
+            for combatant_id in snapshot.active_ids
+        }
+        for combatant in active.values():
+            combatant.status_listeners.append(self.update_status)
+        self.combatants_by_id = active
+        states = snapshot.combatant_states
+        for combatant_id, combatant in self.roster.items():
+            start = 4 * combatant_id
+            combatant.set_state(
+                state=(
+                    states[start],
+                    states[start + 1],
+                    states[start + 2],
+                    states[start + 3],
+                )
+            )
+        self.recount_sides()
+        self.dodging.clear()
+        self.disengaging.clear()
+        self.readied.clear()
+        for combatant in active.values():
+            self.update_status(combatant=combatant)
 
     def combatants_dodging(self) -> list:
-        """All Combatants that Dodged as their last action."""
-        return [
-            this_combatant
-            for this_combatant in self.combatant_list
-            if this_combatant.is_dodging
-        ]
+        """All Combatants that Dodged as their last action, in join order."""
+        return [combatant for _, combatant in sorted(self.dodging.items())]
 
     def combatants_disengaging(self) -> list:
-        """All Combatants that Disengaged as their last action."""
-        return [
-            this_combatant
-            for this_combatant in self.combatant_list
-            if this_combatant.is_disengaging
-        ]
+        """All Combatants that Disengaged as their last action, in join order."""
+        return [combatant for _, combatant in sorted(self.disengaging.items())]
 
     def combatants_readied(self) -> list:
-        """All Combatants that Readied an Action as their last action."""
-        return [
-            this_combatant
-            for this_combatant in self.combatant_list
-            if this_combatant.is_readied
-        ]
+        """All Combatants that Readied an Action last, in join order."""
+        return [combatant for _, combatant in sorted(self.readied.items())]
@@ -1,13 +1,51 @@
 """Contains the Combatant class."""
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Hashable
 from typing import List
 from typing import Optional
 from typing import Tuple
 
 from . import attack as a
 from . import helpers as h
+from . import rng
 from . import roll as r
 
 
+STATE_FLAGS = (
+    "conscious",
+    "movement_available",
+    "action_available",
+    "bonus_action_available",
+    "reaction_available",
+    "is_disengaging",
+    "is_dodging",
+    "is_readied",
+)
+
+
+def is_critical(raw_dice_score: Any, crit_range: int = 20) -> Any:
+    """Is a d20 attack roll a critical hit? Works elementwise on arrays too.
+
+    Natural rolls of crit_range or more are critical hits.
+    """
+    return raw_dice_score >= crit_range
+
+
+def attack_hits(
+    raw_dice_score: Any, attack_score: Any, armor_class: Any, crit_range: int = 20
+) -> Any:
+    """Does an attack roll hit? Works elementwise on arrays too.
+
+    A natural 1 always misses and a critical hit always hits.
+    """
+    return (raw_dice_score != 1) & (
+        is_critical(raw_dice_score=raw_dice_score, crit_range=crit_range)
+        | (attack_score >= armor_class)
+    )
+
+
 class Combatant:
     """An agent in a combat. Has at least initiative, attacks, and hit points."""
 
@@ -18,9 +56,10 @@ class Combatant:
         attacks: List[a.Attack],
         current_hit_points: Optional[int] = None,
         control: str = "DM",
-        faction: h.Faction = h.Faction.ENEMIES,
+        faction: Hashable = h.Faction.ENEMIES,
         fighting_status: h.FightingStatus = h.FightingStatus.FIGHTING,
         removal_condition: h.RemovalConditions = h.RemovalConditions.ZERO_HP,
+        random_source: Optional[rng.RandomSource] = None,
     ):
         """New instance of a Combatant."""
         self.control: str = control
@@ -41,25 +80,75 @@ class Combatant:
         self.is_disengaging = False
         self.is_dodging = False
         self.is_readied = False
+        self.initiative = 0
+        self.random_source = random_source
+        self.status_listeners: List[Callable[["Combatant"], None]] = []
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Attributes to pickle or copy, leaving out the status listeners.
+
+        Listeners are bound to whatever Combat holds the Combatant, which a
+        copy of the Combatant alone should not drag along.
+        """
+        state = self.__dict__.copy()
+        state["status_listeners"] = []
+        return state
+
+    def notify_status(self) -> None:
+        """Tell every status listener that the action flags or standing changed."""
+        for listener in self.status_listeners:
+            listener(self)
+
+    def state(self) -> Tuple[int, int, int, int]:
+        """Hit points, STATE_FLAGS as a bitmask, fighting status and initiative."""
+        flags = 0
+        for bit, name in enumerate(STATE_FLAGS):
+            if getattr(self, name):
+                flags |= 1 << bit
+        return (
+            self.current_hit_points,
+            flags,
+            self.fighting_status.value,
+            self.initiative,
+        )
+
+    def set_state(self, state: Tuple[int, int, int, int]) -> None:
+        """Go back to a state returned by state(). Listeners are not told."""
+        self.current_hit_points, flags, fighting_status, self.initiative = state
+        for bit, name in enumerate(STATE_FLAGS):
+            setattr(self, name, bool(flags & 1 << bit))
+        self.fighting_status = h.FightingStatus(fighting_status)
 
     def take_damage(self, hp_damage: int, damage_type: h.DamageType) -> None:
-        """Damage the combatant. Current_hit_points cannot fall below zero."""
+        """Damage the combatant. Current_hit_points cannot fall below zero.
+
+        Status listeners are told if this drops the combatant to 0 HP.
+        """
+        dropped = 0 < self.current_hit_points <= hp_damage
         self.conscious = hp_damage < self.current_hit_points
         if self.conscious:
             self.current_hit_points -= hp_damage
         else:
             self.current_hit_points = 0
+        if dropped:
+            self.notify_status()
 
     def heal(self, hp_heal: int) -> None:
-        """Heal the combatant. Current_hit_points cannot exceed max_hit_points."""
+        """Heal the combatant. Current_hit_points cannot exceed max_hit_points.
+
+        Status listeners are told if this brings the combatant up from 0 HP.
+        """
+        was_down = self.current_hit_points <= 0
         if (self.current_hit_points + hp_heal) < self.max_hit_points:
             self.current_hit_points += hp_heal
         else:
             self.current_hit_points = self.max_hit_points
+        if was_down and self.current_hit_points > 0:
+            self.notify_status()
 
     def roll_initiative(self, dex_modifier: int = 0) -> int:
         """Returns _and_ stores initiative of d20 plus supplied modifier."""
-        result = r.roll(full_roll_description="d20")
+        result = r.d20(source=self.random_source)
         result += dex_modifier
         self.initiative = result
         return result
@@ -82,6 +171,7 @@ class Combatant:
         self.is_disengaging = False
         self.is_dodging = False
         self.is_readied = False
+        self.notify_status()
 
     def end_turn(self) -> None:
         """Disables flags for available movement, action, and bonus action."""
@@ -94,6 +184,7 @@ class Combatant:
         if self.action_available:
             self.is_disengaging = True
             self.action_available = False
+            self.notify_status()
         else:
             raise ValueError(
                 f"Combatant {self} cannot Disengage as they have already acted."
@@ -104,6 +195,7 @@ class Combatant:
         if self.action_available:
             self.is_dodging = True
             self.action_available = False
+            self.notify_status()
         else:
             raise ValueError(
                 f"Combatant {self} cannot Dodge as they have already acted."
@@ -114,6 +206,7 @@ class Combatant:
         if self.action_available:
             self.is_readied = True
             self.action_available = False
+            self.notify_status()
         else:
             raise ValueError(
                 f"Combatant {self} cannot Ready an Action as they have already"
@@ -124,6 +217,7 @@ class Combatant:
         """Take the Action that was readied."""
         if self.is_readied:
             self.is_readied = False
+            self.notify_status()
         else:
             raise ValueError(
                 f"Combatant {self} cannot take a _Readied_ Action, as they "
@@ -141,24 +235,31 @@ class Combatant:
             raise ValueError(f"{self} does not have this attack available: {attack}.")
         if with_advantage and with_disadvantage:
             raise ValueError("Cannot *roll* with advantage and disadvantge.")
-        raw_dice_score = r.roll(full_roll_description="d20")
-        if with_advantage or with_disadvantage:
-            second_die = r.roll(full_roll_description="d20")
-            if with_advantage:
-                raw_dice_score = max(raw_dice_score, second_die)
-            else:
-                raw_dice_score = min(raw_dice_score, second_die)
+        if with_advantage:
+            raw_dice_score = r.roll(
+                full_roll_description="2d20kh1", source=self.random_source
+            )
+        elif with_disadvantage:
+            raw_dice_score = r.roll(
+                full_roll_description="2d20kl1", source=self.random_source
+            )
+        else:
+            raw_dice_score = r.d20(source=self.random_source)
         return (
             raw_dice_score + attack.attack_bonus,
             raw_dice_score,
-            (raw_dice_score == 20),
+            is_critical(raw_dice_score=raw_dice_score),
         )
 
     def roll_damage(
         self, attack: a.Attack, critical_hit: bool = False
     ) -> Tuple[int, h.DamageType]:
         """Calculate damage and damage type from an Attack."""
-        dice_damage: int = r.roll(full_roll_description=attack.damage_dice)
+        dice_damage: int = r.roll(
+            full_roll_description=attack.damage_dice, source=self.random_source
+        )
         if critical_hit:
-            dice_damage += r.roll(full_roll_description=attack.damage_dice)
+            dice_damage += r.roll(
+                full_roll_description=attack.damage_dice, source=self.random_source
+            )
         return dice_damage + attack.damage_bonus, attack.damage_type
@@ -0,0 +1,182 @@
+"""Structured log events recorded during a Combat."""
+from enum import Enum
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import NamedTuple
+from typing import Tuple
+
+
+class Channel(Enum):
+    """Which log an event belongs to."""
+
+    NARRATIVE = 1
+    TECHNICAL = 2
+
+
+class Event(Enum):
+    """Everything a Combat can log. Formats are kept in EVENT_FORMATS."""
+
+    NARRATIVE_COMMENT = 1
+    JOINED = 2
+    REMOVING = 3
+    TURN_OVER = 4
+    TURN_STARTING = 5
+    ATTACKS = 6
+    NATURAL_ONE = 7
+    NATURAL_TWENTY = 8
+    CRITICAL_HIT = 9
+    HIT = 10
+    MISS = 11
+    DAMAGE_DEALT = 12
+    HIT_POINTS_NOW = 13
+    TECHNICAL_COMMENT = 101
+    REPOPULATED_INITIATIVES = 102
+    FILLED_INITIATIVE = 103
+    ADDING_COMBATANTS = 104
+    NO_COMBATANTS = 105
+    NO_INITIATIVE_ORDER = 106
+    ROUND_NOT_ZERO = 107
+    CAN_START = 108
+    STARTING = 109
+    GETTING_NEXT_COMBATANT = 110
+    NOT_IN_PROGRESS = 111
+    MOVING_TO_COMBATANT = 112
+    MOVING_TO_INITIATIVE = 113
+    STARTING_ROUND = 114
+    NOT_STARTED = 115
+    FACTIONS_PRESENT = 116
+    CAN_END = 117
+    ENDING = 118
+    TAKES_DAMAGE = 119
+    REMOVED_AT_ZERO_HP = 120
+
+
+EVENT_FORMATS: Dict[Event, Tuple[Channel, str]] = {
+    Event.NARRATIVE_COMMENT: (Channel.NARRATIVE, "{0}"),
+    Event.JOINED: (Channel.NARRATIVE, "Combatant {actor} joined the combat."),
+    Event.REMOVING: (Channel.NARRATIVE, "Removing Combatant {actor}."),
+    Event.TURN_OVER: (Channel.NARRATIVE, "Combatant {actor}'s turn is over."),
+    Event.TURN_STARTING: (Channel.NARRATIVE, "Combatant {actor}'s turn is starting."),
+    Event.ATTACKS: (Channel.NARRATIVE, "{actor} attacks {target} with {0}"),
+    Event.NATURAL_ONE: (Channel.NARRATIVE, "{actor} rolls a 1 and misses."),
+    Event.NATURAL_TWENTY: (
+        Channel.NARRATIVE,
+        "{actor} rolls a 20 and makes a critical hit.",
+    ),
+    Event.CRITICAL_HIT: (
+        Channel.NARRATIVE,
+        "{actor} makes a critical hit with a roll of {0}",
+    ),
+    Event.HIT: (
+        Channel.NARRATIVE,
+        "{actor} rolls a {0}, hitting with a score of {1} .",
+    ),
+    Event.MISS: (
+        Channel.NARRATIVE,
+        "{actor} rolls a {0}, missing with a score of {1} .",
+    ),
+    Event.DAMAGE_DEALT: (Channel.NARRATIVE, "{actor} causes {0} HP of {1} damage."),
+    Event.HIT_POINTS_NOW: (Channel.NARRATIVE, "{actor} now has {0} HP ."),
+    Event.TECHNICAL_COMMENT: (Channel.TECHNICAL, "{0}"),
+    Event.REPOPULATED_INITIATIVES: (
+        Channel.TECHNICAL,
+        "Repopulated used initiative list.",
+    ),
+    Event.FILLED_INITIATIVE: (Channel.TECHNICAL, "Filled initiative order."),
+    Event.ADDING_COMBATANTS: (Channel.TECHNICAL, "Adding {0} new combatants."),
+    Event.NO_COMBATANTS: (
+        Channel.TECHNICAL,
+        "Cannot start combat as there are no combatants.",
+    ),
+    Event.NO_INITIATIVE_ORDER: (
+        Channel.TECHNICAL,
+        "Cannot start combat as the initiative order is not populated.",
+    ),
+    Event.ROUND_NOT_ZERO: (
+        Channel.TECHNICAL,
+        "Cannot start combat as current round = {0}.",
+    ),
+    Event.CAN_START: (Channel.TECHNICAL, "Can start combat."),
+    Event.STARTING: (Channel.TECHNICAL, "Starting combat."),
+    Event.GETTING_NEXT_COMBATANT: (Channel.TECHNICAL, "Getting next combatant."),
+    Event.NOT_IN_PROGRESS: (
+        Channel.TECHNICAL,
+        "Trying to determine next_combatant when combat is not in progress",
+    ),
+    Event.MOVING_TO_COMBATANT: (Channel.TECHNICAL, "Moving to Combatant {actor}."),
+    Event.MOVING_TO_INITIATIVE: (Channel.TECHNICAL, "Moving to initiative {0}."),
+    Event.STARTING_ROUND: (Channel.TECHNICAL, "Starting round {0}."),
+    Event.NOT_STARTED: (
+        Channel.TECHNICAL,
+        "Combat cannot end because it has not started.",
+    ),
+    Event.FACTIONS_PRESENT: (
+        Channel.TECHNICAL,
+        "Combat cannot end because multiple factions are still present.",
+    ),
+    Event.CAN_END: (Channel.TECHNICAL, "Combat can end."),
+    Event.ENDING: (Channel.TECHNICAL, "Ending the combat."),
+    Event.TAKES_DAMAGE: (Channel.TECHNICAL, "{actor} takes {0} HP of {1} damage."),
+    Event.REMOVED_AT_ZERO_HP: (
+        Channel.TECHNICAL,
+        "{actor} has 0HP or fewer, and is removed.",
+    ),
+}
+
+
+class LogEntry(NamedTuple):
+    """One logged event. Nothing is formatted until the entry is rendered."""
+
+    round: int
+    initiative: int
+    event: Event
+    actor: Any = None
+    target: Any = None
+    values: Tuple[Any, ...] = ()
+
+
+def channel(entry: LogEntry) -> Channel:
+    """The log that an entry belongs to."""
+    return EVENT_FORMATS[entry.event][0]
+
+
+def describe(entry: LogEntry) -> str:
+    """Text of an entry, without the round and initiative prefix."""
+    return EVENT_FORMATS[entry.event][1].format(
+        *entry.values, actor=entry.actor, target=entry.target
+    )
+
+
+def plain_value(value: Any) -> Any:
+    """A JSON-friendly version of a value held in a LogEntry."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Enum):
+        return value.name
+    return str(value)
+
+
+def as_dict(entry: LogEntry) -> Dict[str, Any]:
+    """An entry as a dict of JSON-friendly values."""
+    return {
+        "round": entry.round,
+        "initiative": entry.initiative,
+        "event": entry.event.name,
+        "actor": plain_value(value=entry.actor),
+        "target": plain_value(value=entry.target),
+        "values": [plain_value(value=value) for value in entry.values],
+        "text": describe(entry=entry),
+    }
+
+
+def render(entry: LogEntry) -> str:
+    """One line of log text for an entry."""
+    return f"R: {str(entry.round)}  I:{str(entry.initiative)} {describe(entry=entry)}\n"
+
+
+def render_channel(entries: Iterable[LogEntry], log_channel: Channel) -> str:
+    """Full text of one log, from the entries on that channel."""
+    return "".join(
+        render(entry=entry) for entry in entries if channel(entry=entry) == log_channel
+    )
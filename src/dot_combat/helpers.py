@@ -56,7 +56,30 @@ class RemovalConditions(Enum):
 
 
 class Faction(Enum):
-    """Which side is a Combatant on?"""
+    """Which side is a Combatant on? Any hashable value can be a faction."""
 
     PCS = 1
     ENEMIES = 2
+
+
+class RollMethod(Enum):
+    """How a dice expression is turned into a result."""
+
+    DICE = 1
+    ALIAS = 2
+
+
+class Advantage(Enum):
+    """Is a d20 roll made with advantage, with disadvantage, or straight?"""
+
+    NONE = 0
+    ADVANTAGE = 1
+    DISADVANTAGE = 2
+
+
+class LogLevel(Enum):
+    """How much a Combat records. Each level includes the ones below it."""
+
+    OFF = 0
+    NARRATIVE = 1
+    TECHNICAL = 2
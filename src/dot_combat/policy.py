@@ -0,0 +1,48 @@
+"""Policies for choosing targets and attacks when a Combat runs itself."""
+from typing import TYPE_CHECKING
+from typing import Callable
+from typing import Optional
+
+from . import attack as a
+from . import combatant as c
+
+
+if TYPE_CHECKING:  # pragma: no cover
+    from . import combat
+
+
+TargetPolicy = Callable[["combat.Combat", c.Combatant], Optional[c.Combatant]]
+AttackPolicy = Callable[[c.Combatant, c.Combatant], Optional[a.Attack]]
+
+
+def first_standing_enemy(
+    fight: "combat.Combat", attacker: c.Combatant
+) -> Optional[c.Combatant]:
+    """The earliest-joined standing Combatant on another side."""
+    attacker_side = fight.side(faction=attacker.faction)
+    for combatant_id, side in fight.standing_sides.items():
+        if side != attacker_side:
+            return fight.combatants_by_id[combatant_id]
+    return None
+
+
+def weakest_standing_enemy(
+    fight: "combat.Combat", attacker: c.Combatant
+) -> Optional[c.Combatant]:
+    """The standing Combatant on another side with the fewest hit points."""
+    attacker_side = fight.side(faction=attacker.faction)
+    weakest: Optional[c.Combatant] = None
+    for combatant_id, side in fight.standing_sides.items():
+        if side != attacker_side:
+            candidate = fight.combatants_by_id[combatant_id]
+            if (
+                weakest is None
+                or candidate.current_hit_points < weakest.current_hit_points
+            ):
+                weakest = candidate
+    return weakest
+
+
+def first_attack(attacker: c.Combatant, target: c.Combatant) -> Optional[a.Attack]:
+    """The attacker's first Attack, if it has any."""
+    return attacker.attacks[0] if attacker.attacks else None
@@ -0,0 +1,297 @@
+"""Exact odds and damage for attacks, following the rules Combats are fought by."""
+from functools import lru_cache
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+import numpy as np
+
+from . import attack as a
+from . import combatant as c
+from . import helpers as h
+from . import roll as r
+
+
+HIT_CHANCES_CACHE_SIZE = 4096
+DAMAGE_CACHE_SIZE = 4096
+TIME_TO_KILL_CACHE_SIZE = 1024
+D20_DESCRIPTIONS = {
+    h.Advantage.NONE: "1d20",
+    h.Advantage.ADVANTAGE: "2d20kh1",
+    h.Advantage.DISADVANTAGE: "2d20kl1",
+}
+NO_DAMAGE = r.Distribution(minimum=0, pmf=np.ones(1))
+AttackKey = Tuple[Tuple[str, int, int], ...]
+
+
+class TimeToKill(NamedTuple):
+    """Distribution of the round in which a target drops.
+
+    Rounds are counted from 1, until the chance of the target still
+    standing falls below epsilon. rounds is the distribution of the round
+    given that the target drops by then, so its pmf sums to 1; survival is
+    the chance that it does not.
+    """
+
+    rounds: r.Distribution
+    survival: float
+
+
+class HitChances(NamedTuple):
+    """Probabilities that an attack roll misses, hits, or is a critical hit.
+
+    The three add up to 1, so hit does not include critical hits.
+    """
+
+    miss: float
+    hit: float
+    critical: float
+
+    @property
+    def any_hit(self) -> float:
+        """Probability of a hit of either kind."""
+        return self.hit + self.critical
+
+
+@lru_cache(maxsize=HIT_CHANCES_CACHE_SIZE)
+def hit_chances(
+    attack_bonus: int,
+    armor_class: int,
+    advantage: h.Advantage = h.Advantage.NONE,
+    crit_range: int = 20,
+) -> HitChances:
+    """Exact, cached odds of an attack roll against an armor class.
+
+    Every natural d20 result is put through the same attack_hits() and
+    is_critical() as Combatant.roll_attack() and Combat.manage_attack(), so
+    a natural 1 always misses and a natural crit_range or more always crits.
+    """
+    if not 2 <= crit_range <= 20:
+        raise ValueError(f"Cannot score critical hits on {crit_range} or more.")
+    pmf = r.distribution(full_roll_description=D20_DESCRIPTIONS[advantage]).pmf
+    faces = np.arange(1, 21)
+    critical = c.is_critical(raw_dice_score=faces, crit_range=crit_range)
+    hits = c.attack_hits(
+        raw_dice_score=faces,
+        attack_score=faces + attack_bonus,
+        armor_class=armor_class,
+        crit_range=crit_range,
+    )
+    return HitChances(
+        miss=float(pmf[~hits].sum()),
+        hit=float(pmf[hits & ~critical].sum()),
+        critical=float(pmf[critical].sum()),
+    )
+
+
+def attack_chances(
+    attack: a.Attack,
+    target: c.Combatant,
+    advantage: h.Advantage = h.Advantage.NONE,
+) -> HitChances:
+    """Odds of one Attack roll against a Combatant's armor class."""
+    return hit_chances(
+        attack_bonus=attack.attack_bonus,
+        armor_class=target.armor_class,
+        advantage=advantage,
+    )
+
+
+def mixture(components: Sequence[Tuple[float, r.Distribution]]) -> r.Distribution:
+    """Distribution of a result drawn from one of several, with given weights."""
+    minimum = min(distribution.minimum for _, distribution in components)
+    maximum = max(distribution.maximum for _, distribution in components)
+    pmf = np.zeros(maximum - minimum + 1)
+    for weight, distribution in components:
+        start = distribution.minimum - minimum
+        pmf[start : start + len(distribution.pmf)] += weight * distribution.pmf
+    return r.Distribution(minimum=minimum, pmf=pmf)
+
+
+@lru_cache(maxsize=DAMAGE_CACHE_SIZE)
+def damage_distribution(
+    damage_dice: str,
+    damage_bonus: int,
+    attack_bonus: int,
+    armor_class: int,
+    advantage: h.Advantage = h.Advantage.NONE,
+    crit_range: int = 20,
+) -> r.Distribution:
+    """Exact, cached distribution of the damage one attack roll deals.
+
+    A miss deals 0. As in Combatant.roll_damage(), a hit deals the dice
+    plus damage_bonus, and a critical hit rolls the dice twice.
+    """
+    chances = hit_chances(
+        attack_bonus=attack_bonus,
+        armor_class=armor_class,
+        advantage=advantage,
+        crit_range=crit_range,
+    )
+    dice = r.distribution(full_roll_description=damage_dice)
+    return mixture(
+        components=(
+            (chances.miss, NO_DAMAGE),
+            (chances.hit, dice.shift(constant=damage_bonus)),
+            (chances.critical, dice.repeat(times=2).shift(constant=damage_bonus)),
+        )
+    )
+
+
+def attack_damage(
+    attack: a.Attack,
+    target: c.Combatant,
+    advantage: h.Advantage = h.Advantage.NONE,
+) -> r.Distribution:
+    """Distribution of the damage one Attack deals to a Combatant."""
+    return damage_distribution(
+        damage_dice=attack.damage_dice,
+        damage_bonus=attack.damage_bonus,
+        attack_bonus=attack.attack_bonus,
+        armor_class=target.armor_class,
+        advantage=advantage,
+    )
+
+
+def best_attack(
+    attacker: c.Combatant,
+    target: c.Combatant,
+    advantage: h.Advantage = h.Advantage.NONE,
+) -> Optional[a.Attack]:
+    """The attacker's Attack with the highest expected damage to the target."""
+    best: Optional[a.Attack] = None
+    best_mean = 0.0
+    for attack in attacker.attacks:
+        mean = attack_damage(attack=attack, target=target, advantage=advantage).mean
+        if best is None or mean > best_mean:
+            best, best_mean = attack, mean
+    return best
+
+
+def dpr_distribution(
+    attacker: Union[a.Attack, c.Combatant],
+    target: c.Combatant,
+    advantage: h.Advantage = h.Advantage.NONE,
+) -> r.Distribution:
+    """Distribution of the damage an Attack, or a Combatant, deals in a round.
+
+    A Combatant makes one attack a turn, so it uses its best_attack(). One
+    with no Attacks deals no damage.
+    """
+    if isinstance(attacker, a.Attack):
+        return attack_damage(attack=attacker, target=target, advantage=advantage)
+    attack = best_attack(attacker=attacker, target=target, advantage=advantage)
+    if attack is None:
+        return NO_DAMAGE
+    return attack_damage(attack=attack, target=target, advantage=advantage)
+
+
+def expected_dpr(
+    attacker: Union[a.Attack, c.Combatant],
+    target: c.Combatant,
+    advantage: h.Advantage = h.Advantage.NONE,
+) -> float:
+    """Exact expected damage per round from an Attack, or a Combatant."""
+    return dpr_distribution(attacker=attacker, target=target, advantage=advantage).mean
+
+
+@lru_cache(maxsize=TIME_TO_KILL_CACHE_SIZE)
+def kill_time(
+    attacks: AttackKey,
+    armor_class: int,
+    max_hit_points: int,
+    advantage: h.Advantage = h.Advantage.NONE,
+    epsilon: float = 1e-9,
+    max_rounds: int = 1000,
+) -> TimeToKill:
+    """Cached time_to_kill(), for Attacks given as (dice, bonus, attack bonus).
+
+    Only the distribution of damage dealt so far while the target is still
+    standing is kept, so each round is one convolution truncated to
+    max_hit_points values.
+    """
+    if max_hit_points < 1:
+        raise ValueError(f"A target with {max_hit_points} HP has already dropped.")
+    per_round = NO_DAMAGE
+    for damage_dice, damage_bonus, attack_bonus in attacks:
+        per_round = per_round.convolve(
+            other=damage_distribution(
+                damage_dice=damage_dice,
+                damage_bonus=damage_bonus,
+                attack_bonus=attack_bonus,
+                armor_class=armor_class,
+                advantage=advantage,
+            )
+        )
+    if per_round.minimum < 0:
+        raise ValueError("Cannot time Attacks that can heal their target.")
+    if per_round.probability(value=0) >= 1.0:
+        raise ValueError("These Attacks can never drop the target.")
+    if per_round.maximum * max_rounds < max_hit_points:
+        raise ValueError(
+            f"These Attacks cannot drop the target in {max_rounds} rounds."
+        )
+    offset = min(per_round.minimum, max_hit_points)
+    damage = np.concatenate(
+        (np.zeros(offset), per_round.pmf[: max_hit_points - offset])
+    )
+    standing = np.zeros(max_hit_points)
+    standing[0] = 1.0
+    survival = 1.0
+    dropped: List[float] = []
+    while survival >= epsilon and len(dropped) < max_rounds:
+        standing = np.convolve(standing, damage)[:max_hit_points]
+        remaining = float(standing.sum())
+        dropped.append(survival - remaining)
+        survival = remaining
+    return TimeToKill(
+        rounds=r.Distribution(minimum=1, pmf=np.array(dropped) / (1.0 - survival)),
+        survival=survival,
+    )
+
+
+def time_to_kill(
+    attacks: Sequence[a.Attack],
+    max_hit_points: int,
+    armor_class: int,
+    advantage: h.Advantage = h.Advantage.NONE,
+    epsilon: float = 1e-9,
+) -> TimeToKill:
+    """Exact distribution of the rounds needed to drop a target.
+
+    attacks are the Attacks made every round, each rolled once, against a
+    target starting at max_hit_points. A Combatant makes one attack a
+    turn, so for one that is [best_attack()]; see combatant_time_to_kill().
+    Results are cached on the Attacks' dice and bonuses, the armor class
+    and the hit points.
+    """
+    return kill_time(
+        attacks=tuple(
+            (attack.damage_dice, attack.damage_bonus, attack.attack_bonus)
+            for attack in attacks
+        ),
+        armor_class=armor_class,
+        max_hit_points=max_hit_points,
+        advantage=advantage,
+        epsilon=epsilon,
+    )
+
+
+def combatant_time_to_kill(
+    attacker: c.Combatant,
+    target: c.Combatant,
+    advantage: h.Advantage = h.Advantage.NONE,
+    epsilon: float = 1e-9,
+) -> TimeToKill:
+    """Rounds a Combatant needs to drop a target from full hit points."""
+    attack = best_attack(attacker=attacker, target=target, advantage=advantage)
+    return time_to_kill(
+        attacks=[] if attack is None else [attack],
+        max_hit_points=target.max_hit_points,
+        armor_class=target.armor_class,
+        advantage=advantage,
+        epsilon=epsilon,
+    )
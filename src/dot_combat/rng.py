@@ -0,0 +1,284 @@
+"""Reproducible, independent random number streams."""
+from array import array
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Sequence
+from typing import Union
+
+import numpy as np
+
+
+Seed = Union[None, int, Sequence[int], np.random.SeedSequence]
+
+
+class RandomSource:
+    """A seeded stream of random numbers for rolling dice.
+
+    Children made with spawn() are statistically independent of the parent
+    and of each other, so each worker or Combat can have its own stream and
+    still be reproduced exactly from the root seed.
+    """
+
+    def __init__(self, seed: Seed = None):
+        """New stream from a seed, or from fresh OS entropy if seed is None."""
+        self.seed_sequence: np.random.SeedSequence = (
+            seed
+            if isinstance(seed, np.random.SeedSequence)
+            else np.random.SeedSequence(seed)
+        )
+        self.generator: np.random.Generator = np.random.Generator(
+            np.random.PCG64(self.seed_sequence)
+        )
+
+    def spawn(self, n: int) -> List["RandomSource"]:
+        """Return n independent child streams."""
+        return [self.child(seed=child) for child in self.seed_sequence.spawn(n)]
+
+    def child(self, seed: np.random.SeedSequence) -> "RandomSource":
+        """New stream of the same kind as this one, from a spawned seed."""
+        return RandomSource(seed=seed)
+
+    def die_roll(self, sides: int) -> int:
+        """Roll a die of a given size."""
+        return int(self.generator.integers(1, sides + 1))
+
+    def dice_rolls(self, dice_num: int, dice_size: int) -> List[int]:
+        """Every die from dice_num rolls of dice_size."""
+        rolls: List[int] = self.generator.integers(
+            1, dice_size + 1, size=dice_num
+        ).tolist()
+        return rolls
+
+    def dice_total(self, dice_num: int, dice_size: int) -> int:
+        """Total from dice_num rolls of dice_size."""
+        if dice_num == 1:
+            return self.die_roll(sides=dice_size)
+        return sum(self.dice_rolls(dice_num=dice_num, dice_size=dice_size))
+
+    def random(self) -> float:
+        """Uniform float in [0, 1)."""
+        return float(self.generator.random())
+
+    def snapshot(self) -> Any:
+        """Token recording the position of the stream, for restore()."""
+        return self.generator.bit_generator.state
+
+    def restore(self, snapshot: Any) -> None:
+        """Return the stream to where it was when snapshot() was called."""
+        self.generator.bit_generator.state = snapshot
+
+
+class BufferedRandomSource(RandomSource):
+    """RandomSource that pre-draws results in blocks and serves them one by one.
+
+    Each die size gets its own compact block of block_size results, drawn in
+    one vectorized call and refilled when it runs out. This makes the common
+    single d20 roll a pop() from an array rather than a call into NumPy.
+    The bytes of each block are kept as drawn, so a snapshot only needs to
+    record how much of each block is left.
+    """
+
+    def __init__(self, seed: Seed = None, block_size: int = 65536):
+        """New buffered stream, drawing block_size results at a time."""
+        super().__init__(seed=seed)
+        self.block_size = block_size
+        self.blocks: Dict[int, "array[int]"] = {}
+        self.drawn: Dict[int, bytes] = {}
+        self.uniforms: "array[float]" = array("d")
+        self.uniforms_drawn = b""
+
+    def child(self, seed: np.random.SeedSequence) -> "BufferedRandomSource":
+        """New buffered stream with the same block size, from a spawned seed."""
+        return BufferedRandomSource(seed=seed, block_size=self.block_size)
+
+    def refill(self, sides: int) -> "array[int]":
+        """Replace the block for a die size with block_size fresh results."""
+        if sides < 2**8:
+            typecode, dtype = "B", "uint8"
+        elif sides < 2**16:
+            typecode, dtype = "H", "uint16"
+        else:
+            typecode, dtype = "q", "int64"
+        drawn = self.generator.integers(
+            1, sides + 1, size=self.block_size, dtype=dtype
+        ).tobytes()
+        block = array(typecode, drawn)
+        self.blocks[sides] = block
+        self.drawn[sides] = drawn
+        return block
+
+    def die_roll(self, sides: int) -> int:
+        """Roll a die of a given size, from the buffered block."""
+        block = self.blocks.get(sides)
+        if not block:
+            block = self.refill(sides=sides)
+        return block.pop()
+
+    def dice_rolls(self, dice_num: int, dice_size: int) -> List[int]:
+        """Every die from dice_num rolls of dice_size, from the buffered block."""
+        if dice_num > self.block_size:
+            return super().dice_rolls(dice_num=dice_num, dice_size=dice_size)
+        block = self.blocks.get(dice_size)
+        if block is None or len(block) < dice_num:
+            block = self.refill(sides=dice_size)
+        start = len(block) - dice_num
+        rolls = block[start:].tolist()
+        del block[start:]
+        return rolls
+
+    def random(self) -> float:
+        """Uniform float in [0, 1), from the buffered block."""
+        if not self.uniforms:
+            self.uniforms_drawn = self.generator.random(self.block_size).tobytes()
+            self.uniforms = array("d", self.uniforms_drawn)
+        return self.uniforms.pop()
+
+    def snapshot(self) -> Any:
+        """Token recording the stream and how much of each block is left."""
+        return (
+            self.generator.bit_generator.state,
+            {
+                sides: (block.typecode, self.drawn[sides], len(block))
+                for sides, block in self.blocks.items()
+            },
+            (self.uniforms_drawn, len(self.uniforms)),
+        )
+
+    def restore(self, snapshot: Any) -> None:
+        """Return the stream and its blocks to where they were at snapshot()."""
+        state, blocks, uniforms = snapshot
+        self.generator.bit_generator.state = state
+        self.blocks = {}
+        self.drawn = {}
+        for sides, (typecode, drawn, length) in blocks.items():
+            self.blocks[sides] = restored_block(typecode, drawn, length)
+            self.drawn[sides] = drawn
+        self.uniforms_drawn, length = uniforms
+        self.uniforms = restored_block("d", self.uniforms_drawn, length)
+
+
+class Tape(NamedTuple):
+    """Every result a RecordingRandomSource handed out, in order."""
+
+    dice: "array[int]"
+    uniforms: "array[float]"
+
+
+class RecordingRandomSource(RandomSource):
+    """RandomSource that passes on results from another and records them.
+
+    Die results go on one unsigned integer array and uniforms on another,
+    so a whole Combat can be replayed later by a ReplayRandomSource.
+    """
+
+    def __init__(self, source: RandomSource):
+        """New recorder of the results drawn from source."""
+        self.source = source
+        self.seed_sequence = source.seed_sequence
+        self.generator = source.generator
+        self.dice: "array[int]" = array("I")
+        self.uniforms: "array[float]" = array("d")
+
+    def child(self, seed: np.random.SeedSequence) -> "RecordingRandomSource":
+        """New recorder of a child of the recorded stream, from a spawned seed."""
+        return RecordingRandomSource(source=self.source.child(seed=seed))
+
+    def die_roll(self, sides: int) -> int:
+        """Roll a die of a given size, and record the result."""
+        result = self.source.die_roll(sides=sides)
+        self.dice.append(result)
+        return result
+
+    def dice_rolls(self, dice_num: int, dice_size: int) -> List[int]:
+        """Every die from dice_num rolls of dice_size, all recorded."""
+        rolls = self.source.dice_rolls(dice_num=dice_num, dice_size=dice_size)
+        self.dice.extend(rolls)
+        return rolls
+
+    def random(self) -> float:
+        """Uniform float in [0, 1), recorded."""
+        result = self.source.random()
+        self.uniforms.append(result)
+        return result
+
+    def tape(self) -> Tape:
+        """Copy of everything recorded so far."""
+        return Tape(dice=array("I", self.dice), uniforms=array("d", self.uniforms))
+
+    def clear(self) -> None:
+        """Forget everything recorded so far, e.g. between fights."""
+        del self.dice[:]
+        del self.uniforms[:]
+
+    def snapshot(self) -> Any:
+        """Token recording the position of the stream and of the tape."""
+        return self.source.snapshot(), len(self.dice), len(self.uniforms)
+
+    def restore(self, snapshot: Any) -> None:
+        """Return the stream and the tape to where they were at snapshot()."""
+        state, dice, uniforms = snapshot
+        self.source.restore(snapshot=state)
+        del self.dice[dice:]
+        del self.uniforms[uniforms:]
+
+
+class ReplayRandomSource(RandomSource):
+    """RandomSource that hands out the results on a Tape, in order.
+
+    Nothing is drawn from the generator, so a Combat replayed from the tape
+    of a recorded one makes exactly the same rolls. Running off the end of
+    the tape, or finding a result too big for the die, means the replay has
+    diverged from the recording and raises ValueError.
+    """
+
+    def __init__(self, tape: Tape):
+        """New replay of a tape, from its start."""
+        super().__init__(seed=0)
+        self.tape = tape
+        self.dice: "array[int]" = array("I", reversed(tape.dice))
+        self.uniforms: "array[float]" = array("d", reversed(tape.uniforms))
+
+    def die_roll(self, sides: int) -> int:
+        """Next die result on the tape."""
+        if not self.dice:
+            raise ValueError("The replay tape has run out of dice.")
+        result = self.dice.pop()
+        if result > sides:
+            raise ValueError(f"The replay tape has {result} for a d{sides}.")
+        return result
+
+    def dice_rolls(self, dice_num: int, dice_size: int) -> List[int]:
+        """Next dice_num die results on the tape."""
+        return [self.die_roll(sides=dice_size) for _ in range(dice_num)]
+
+    def random(self) -> float:
+        """Next uniform on the tape."""
+        if not self.uniforms:
+            raise ValueError("The replay tape has run out of uniforms.")
+        return self.uniforms.pop()
+
+    def snapshot(self) -> Any:
+        """Token recording how much of the tape is left."""
+        return len(self.dice), len(self.uniforms)
+
+    def restore(self, snapshot: Any) -> None:
+        """Return to where the replay was at snapshot()."""
+        dice, uniforms = snapshot
+        used = len(self.tape.dice) - dice
+        self.dice = array("I", reversed(self.tape.dice[used:]))
+        used = len(self.tape.uniforms) - uniforms
+        self.uniforms = array("d", reversed(self.tape.uniforms[used:]))
+
+
+def restored_block(typecode: str, drawn: bytes, length: int) -> "array[Any]":
+    """The first length items of a block, rebuilt from the bytes it was drawn as."""
+    block = array(typecode)
+    block.frombytes(memoryview(drawn)[: length * block.itemsize])
+    return block
+
+
+def spawn_sources(seed: Seed, n: int) -> List[RandomSource]:
+    """Independent streams for n workers, all derived from one root seed."""
+    return RandomSource(seed=seed).spawn(n=n)
@@ -1,6 +1,31 @@
 """Basic die roller."""
+import heapq
 import random as rnd
+import re
+from collections import Counter
+from dataclasses import dataclass
+from dataclasses import field
+from functools import lru_cache
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
 from typing import Tuple
+from typing import Union
+
+import numpy as np
+
+from . import helpers as h
+from . import rng
+
+
+EXPRESSION_CACHE_SIZE = 1024
+DISTRIBUTION_CACHE_SIZE = 1024
+ALIAS_TABLE_CACHE_SIZE = 256
+MAX_EXPLOSIONS = 20
+TERM_PATTERN = re.compile(r"([+-]?)([^+-]+)")
+DICE_TERM_PATTERN = re.compile(r"([^dk!]*d[^dk!]*)(?:k([hl])(\d+)|(!))?")
+default_generator = np.random.default_rng()
 
 
 def single_die_roll(sides: int) -> int:
@@ -8,6 +33,13 @@ def single_die_roll(sides: int) -> int:
     return rnd.randrange(1, sides + 1, 1)  # noqa: S311
 
 
+def d20(source: Optional[rng.RandomSource] = None) -> int:
+    """Roll a single d20, skipping expression handling on this hot path."""
+    if source is None:
+        return single_die_roll(sides=20)
+    return source.die_roll(sides=20)
+
+
 def dice_description_result(dice_num: int, dice_size: int) -> int:
     """Returns the total from dice_num rolls of dice_size."""
     return sum(single_die_roll(sides=dice_size) for _ in range(dice_num))
@@ -15,7 +47,7 @@ def dice_description_result(dice_num: int, dice_size: int) -> int:
 
 def dice_description_parser(dice_roll_description: str) -> Tuple[int, int]:
     """Breaks string expression like "2d10" into tuple of ints[2, 10]."""
-    dice_num_str, dice_size_str = dice_roll_description.split("d")
+    dice_num_str, _, dice_size_str = dice_roll_description.partition("d")
     try:
         dice_num = int(dice_num_str) if dice_num_str else 1
         dice_size = int(dice_size_str)
@@ -23,6 +55,8 @@ def dice_description_parser(dice_roll_description: str) -> Tuple[int, int]:
         raise ValueError(
             f"Could not evaluate dice expression: {dice_roll_description}"
         ) from err
+    if dice_num < 0 or dice_size < 1:
+        raise ValueError(f"Could not evaluate dice expression: {dice_roll_description}")
     return dice_num, dice_size
 
 
@@ -31,7 +65,402 @@ def constant_evaluator(constant: str) -> int:
     return int(constant)
 
 
-def roll(full_roll_description: str) -> int:
+@dataclass(frozen=True, eq=False)
+class Distribution:
+    """Exact probability distribution of an integer result.
+
+    pmf[i] is the probability of the result minimum + i. The array is
+    read-only, as Distributions are cached and shared.
+    """
+
+    minimum: int
+    pmf: np.ndarray
+
+    def __post_init__(self) -> None:
+        """Stop the shared pmf array from being modified."""
+        self.pmf.setflags(write=False)
+
+    @property
+    def maximum(self) -> int:
+        """Largest possible result."""
+        return self.minimum + len(self.pmf) - 1
+
+    @property
+    def values(self) -> np.ndarray:
+        """Every result from minimum to maximum, aligned with pmf."""
+        return np.arange(self.minimum, self.maximum + 1)
+
+    @property
+    def mean(self) -> float:
+        """Expected result."""
+        return float(self.values @ self.pmf)
+
+    @property
+    def variance(self) -> float:
+        """Variance of the result."""
+        deviations = self.values - self.mean
+        return float((deviations * deviations) @ self.pmf)
+
+    def probability(self, value: int) -> float:
+        """Probability of a result of exactly value."""
+        if self.minimum <= value <= self.maximum:
+            return float(self.pmf[value - self.minimum])
+        return 0.0
+
+    def cdf(self, value: int) -> float:
+        """Probability of a result of value or lower."""
+        if value < self.minimum:
+            return 0.0
+        if value >= self.maximum:
+            return 1.0
+        return float(self.pmf[: value - self.minimum + 1].sum())
+
+    def at_least(self, value: int) -> float:
+        """Probability of a result of value or higher."""
+        return 1.0 - self.cdf(value=value - 1)
+
+    def shift(self, constant: int) -> "Distribution":
+        """Distribution of this result plus a constant."""
+        return Distribution(minimum=self.minimum + constant, pmf=self.pmf.copy())
+
+    def negate(self) -> "Distribution":
+        """Distribution of minus this result."""
+        return Distribution(minimum=-self.maximum, pmf=self.pmf[::-1].copy())
+
+    def convolve(self, other: "Distribution") -> "Distribution":
+        """Distribution of the sum of this result and an independent other."""
+        return Distribution(
+            minimum=self.minimum + other.minimum, pmf=np.convolve(self.pmf, other.pmf)
+        )
+
+    def repeat(self, times: int) -> "Distribution":
+        """Distribution of the sum of times independent copies of this result."""
+        result = Distribution(minimum=0, pmf=np.ones(1))
+        power = self
+        while times:
+            if times & 1:
+                result = result.convolve(other=power)
+            times >>= 1
+            if times:
+                power = power.convolve(other=power)
+        return result
+
+
+@dataclass(frozen=True, eq=False)
+class AliasTable:
+    """Walker alias table for sampling a Distribution with one uniform draw.
+
+    Slot i is picked uniformly, then kept with probability thresholds[i], or
+    swapped for aliases[i] otherwise. Slots are offsets from minimum.
+    """
+
+    minimum: int
+    thresholds: np.ndarray
+    aliases: np.ndarray
+    threshold_list: List[float] = field(init=False, repr=False)
+    alias_list: List[int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """Keep plain Python copies of the table for the scalar sampler."""
+        self.thresholds.setflags(write=False)
+        self.aliases.setflags(write=False)
+        object.__setattr__(self, "threshold_list", self.thresholds.tolist())
+        object.__setattr__(self, "alias_list", self.aliases.tolist())
+
+    @classmethod
+    def from_distribution(cls, distribution: Distribution) -> "AliasTable":
+        """Build the table with Vose's method, in time linear in the support."""
+        size = len(distribution.pmf)
+        scaled = distribution.pmf * size
+        thresholds = np.ones(size)
+        aliases = np.arange(size)
+        small = [slot for slot in range(size) if scaled[slot] < 1.0]
+        large = [slot for slot in range(size) if scaled[slot] >= 1.0]
+        while small and large:
+            short_slot = small.pop()
+            long_slot = large.pop()
+            thresholds[short_slot] = scaled[short_slot]
+            aliases[short_slot] = long_slot
+            scaled[long_slot] -= 1.0 - scaled[short_slot]
+            if scaled[long_slot] < 1.0:
+                small.append(long_slot)
+            else:
+                large.append(long_slot)
+        # whatever is left over is 1.0 up to rounding error
+        return cls(minimum=distribution.minimum, thresholds=thresholds, aliases=aliases)
+
+    def sample(self, source: Optional[rng.RandomSource] = None) -> int:
+        """Return one result, using a single uniform draw."""
+        uniform = rnd.random() if source is None else source.random()  # noqa: S311
+        position = uniform * len(self.threshold_list)
+        slot = int(position)
+        if position - slot < self.threshold_list[slot]:
+            return self.minimum + slot
+        return self.minimum + self.alias_list[slot]
+
+    def sample_many(self, n: int, generator: np.random.Generator) -> np.ndarray:
+        """Return an array of n results, using n uniform draws."""
+        positions = generator.random(n) * len(self.thresholds)
+        slots = positions.astype(np.int64)
+        keep = (positions - slots) < self.thresholds[slots]
+        return self.minimum + np.where(keep, slots, self.aliases[slots])
+
+
+def die_distribution(sides: int) -> Distribution:
+    """Distribution of a single die of a given size."""
+    return Distribution(minimum=1, pmf=np.full(sides, 1 / sides))
+
+
+def exploding_die_distribution(sides: int) -> Distribution:
+    """Distribution of a single exploding die, exploding MAX_EXPLOSIONS times."""
+    pmf = np.zeros(sides * (MAX_EXPLOSIONS + 1))
+    for explosions in range(MAX_EXPLOSIONS + 1):
+        start = explosions * sides
+        pmf[start : start + sides] = float(sides) ** -(explosions + 1)
+        if explosions < MAX_EXPLOSIONS:
+            # a maximum result explodes rather than standing
+            pmf[start + sides - 1] = 0.0
+    return Distribution(minimum=1, pmf=pmf)
+
+
+def keep_distribution(
+    dice_num: int, dice_size: int, keep: int, keep_highest: bool
+) -> Distribution:
+    """Exact distribution of the highest (or lowest) keep of dice_num dice.
+
+    Faces are visited from the kept end. Each state counts the ordered
+    outcomes with a given number of dice placed and total kept so far, so
+    the result is exact without enumerating every outcome.
+    """
+    binomials = [[1]]
+    for row in range(dice_num):
+        previous = binomials[row]
+        binomials.append(
+            [1] + [previous[i] + previous[i + 1] for i in range(row)] + [1]
+        )
+    faces = range(dice_size, 0, -1) if keep_highest else range(1, dice_size + 1)
+    states: Dict[Tuple[int, int], int] = {(0, 0): 1}
+    for face in faces:
+        next_states: Dict[Tuple[int, int], int] = Counter()
+        for (placed, kept_total), ways in states.items():
+            remaining = dice_num - placed
+            kept_room = max(keep - placed, 0)
+            for count in range(remaining + 1):
+                key = (placed + count, kept_total + face * min(count, kept_room))
+                next_states[key] += ways * binomials[remaining][count]
+        states = next_states
+    outcomes = dice_size**dice_num
+    counts = {
+        total: ways for (placed, total), ways in states.items() if placed == dice_num
+    }
+    minimum = min(counts)
+    pmf = np.zeros(max(counts) - minimum + 1)
+    for total, ways in counts.items():
+        pmf[total - minimum] = ways / outcomes
+    return Distribution(minimum=minimum, pmf=pmf)
+
+
+@dataclass(frozen=True)
+class DiceTerm:
+    """A single "xdy" group of dice within a DiceExpression.
+
+    keep > 0 keeps only the highest (or, if keep_highest is False, lowest)
+    keep dice, as in "4d6kh3". explode rolls an extra die for every die
+    showing its maximum, as in "d6!", up to MAX_EXPLOSIONS times.
+    """
+
+    sign: int
+    dice_num: int
+    dice_size: int
+    keep: int = 0
+    keep_highest: bool = True
+    explode: bool = False
+
+    def draw(self, dice_num: int, source: Optional[rng.RandomSource]) -> List[int]:
+        """Every die from dice_num rolls of this term's dice."""
+        if source is None:
+            return [single_die_roll(sides=self.dice_size) for _ in range(dice_num)]
+        return source.dice_rolls(dice_num=dice_num, dice_size=self.dice_size)
+
+    def roll(self, source: Optional[rng.RandomSource] = None) -> int:
+        """Signed total for one throw of this group of dice."""
+        if self.keep:
+            rolls = self.draw(dice_num=self.dice_num, source=source)
+            if self.keep == 1:
+                total = max(rolls) if self.keep_highest else min(rolls)
+            elif self.keep_highest:
+                total = sum(heapq.nlargest(self.keep, rolls))
+            else:
+                total = sum(heapq.nsmallest(self.keep, rolls))
+        elif self.explode:
+            rolls = self.draw(dice_num=self.dice_num, source=source)
+            total = sum(rolls)
+            pending = rolls.count(self.dice_size)
+            for _ in range(MAX_EXPLOSIONS):
+                if not pending:
+                    break
+                rolls = self.draw(dice_num=pending, source=source)
+                total += sum(rolls)
+                pending = rolls.count(self.dice_size)
+        elif source is None:
+            total = dice_description_result(
+                dice_num=self.dice_num, dice_size=self.dice_size
+            )
+        else:
+            total = source.dice_total(dice_num=self.dice_num, dice_size=self.dice_size)
+        return self.sign * total
+
+    def roll_many(self, n: int, generator: np.random.Generator) -> np.ndarray:
+        """Signed totals for n throws, drawing every die in a single call."""
+        if self.dice_num == 1 and not self.explode:
+            return self.sign * generator.integers(1, self.dice_size + 1, size=n)
+        rolls = generator.integers(1, self.dice_size + 1, size=(n, self.dice_num))
+        if self.keep == 1:
+            totals = rolls.max(axis=1) if self.keep_highest else rolls.min(axis=1)
+        elif self.keep and self.keep_highest:
+            split = self.dice_num - self.keep
+            totals = np.partition(rolls, split, axis=1)[:, split:].sum(axis=1)
+        elif self.keep:
+            split = self.keep - 1
+            totals = np.partition(rolls, split, axis=1)[:, : self.keep].sum(axis=1)
+        else:
+            totals = rolls.sum(axis=1)
+        if self.explode:
+            pending = (rolls == self.dice_size).sum(axis=1)
+            for _ in range(MAX_EXPLOSIONS):
+                if not pending.any():
+                    break
+                owners = np.repeat(np.arange(n), pending)
+                extra = generator.integers(1, self.dice_size + 1, size=len(owners))
+                np.add.at(totals, owners, extra)
+                pending = np.bincount(
+                    owners, weights=extra == self.dice_size, minlength=n
+                ).astype(np.int64)
+        return self.sign * totals
+
+    def distribution(self) -> Distribution:
+        """Exact distribution of the signed total for this group of dice."""
+        if self.keep:
+            total = keep_distribution(
+                dice_num=self.dice_num,
+                dice_size=self.dice_size,
+                keep=self.keep,
+                keep_highest=self.keep_highest,
+            )
+        elif self.explode:
+            total = exploding_die_distribution(sides=self.dice_size).repeat(
+                times=self.dice_num
+            )
+        else:
+            total = die_distribution(sides=self.dice_size).repeat(times=self.dice_num)
+        return total if self.sign > 0 else total.negate()
+
+
+@dataclass(frozen=True)
+class DiceExpression:
+    """A parsed dice expression, which can be rolled many times.
+
+    Dice terms are kept in the order they were written, and all constant
+    terms are folded into a single modifier.
+    """
+
+    description: str
+    terms: Tuple[DiceTerm, ...]
+    constant: int
+
+    def roll(self, source: Optional[rng.RandomSource] = None) -> int:
+        """Return one result for this expression.
+
+        Dice come from source if one is given, or the random module if not.
+        """
+        total = self.constant
+        for term in self.terms:
+            total += term.roll(source=source)
+        return total
+
+    def roll_many(self, n: int, generator: np.random.Generator) -> np.ndarray:
+        """Return an array of n independent results for this expression."""
+        totals = np.full(n, self.constant, dtype=np.int64)
+        for term in self.terms:
+            totals += term.roll_many(n=n, generator=generator)
+        return totals
+
+    def distribution(self) -> Distribution:
+        """Exact distribution of results for this expression."""
+        result = Distribution(minimum=self.constant, pmf=np.ones(1))
+        for term in self.terms:
+            result = result.convolve(other=term.distribution())
+        return result
+
+
+def dice_term_parser(sign: str, dice_term_description: str) -> DiceTerm:
+    """Turn one term like "2d6", "4d6kh3" or "d6!" into a DiceTerm."""
+    match = DICE_TERM_PATTERN.fullmatch(dice_term_description)
+    if match is None:
+        raise ValueError(f"Could not evaluate dice expression: {dice_term_description}")
+    dice_description, keep_type, keep_str, explode = match.groups()
+    dice_num, dice_size = dice_description_parser(
+        dice_roll_description=dice_description
+    )
+    keep = int(keep_str) if keep_str else 0
+    if keep_type and not 1 <= keep <= dice_num or explode and dice_size == 1:
+        raise ValueError(f"Could not evaluate dice expression: {dice_term_description}")
+    return DiceTerm(
+        sign=-1 if sign == "-" else 1,
+        dice_num=dice_num,
+        dice_size=dice_size,
+        keep=keep,
+        keep_highest=keep_type != "l",
+        explode=bool(explode),
+    )
+
+
+def parse_expression(full_roll_description: str) -> DiceExpression:
+    """Turn a description like "2d6+1d4-1" into a DiceExpression.
+
+    Any number of "xdy" and constant terms can be joined with + or -. The
+    first term may be preceded by a sign. Dice terms can keep the highest or
+    lowest dice ("4d6kh3", "2d20kl1") or explode ("d6!").
+    """
+    description = full_roll_description.replace(" ", "")
+    tokens = TERM_PATTERN.findall(description)
+    if not tokens or "".join(sign + body for sign, body in tokens) != description:
+        raise ValueError(f"Could not evaluate dice expression: {full_roll_description}")
+    terms = []
+    constant = 0
+    for sign, body in tokens:
+        if "d" in body:
+            terms.append(dice_term_parser(sign=sign, dice_term_description=body))
+        else:
+            try:
+                constant += constant_evaluator(constant=sign + body)
+            except ValueError as err:
+                raise ValueError(
+                    f"Could not evaluate dice expression: {full_roll_description}"
+                ) from err
+    return DiceExpression(
+        description=full_roll_description, terms=tuple(terms), constant=constant
+    )
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(full_roll_description: str) -> DiceExpression:
+    """Cached parse_expression(), so each description is only parsed once."""
+    return parse_expression(full_roll_description=full_roll_description)
+
+
+def as_expression(full_roll_description: Union[str, DiceExpression]) -> DiceExpression:
+    """Compile a description, or pass through an existing DiceExpression."""
+    if isinstance(full_roll_description, DiceExpression):
+        return full_roll_description
+    return compile_expression(full_roll_description=full_roll_description)
+
+
+def roll(
+    full_roll_description: Union[str, DiceExpression],
+    method: h.RollMethod = h.RollMethod.DICE,
+    source: Optional[rng.RandomSource] = None,
+) -> int:
     """Return a result for a standard notation die description.
 
     Expected format is "xdy+c" where:
@@ -39,30 +468,82 @@ def roll(full_roll_description: str) -> int:
         d is mandatory if y is present
         y is the number of faces on the dice
         c is a constant, which can be negative, and can be omitted
+    Several dice and constant terms can be chained, e.g. "2d6+1d4-1".
+    A DiceExpression that has already been compiled is also accepted.
+
+    RollMethod.ALIAS samples from the cached alias_table() of the expression,
+    so a roll costs one uniform draw however many dice it contains.
+    Random numbers come from source if supplied, or the random module if not.
+    """
+    if method == h.RollMethod.ALIAS:
+        return alias_table(full_roll_description=full_roll_description).sample(
+            source=source
+        )
+    return as_expression(full_roll_description=full_roll_description).roll(
+        source=source
+    )
+
+
+def roll_many(
+    full_roll_description: Union[
+        str, DiceExpression, Sequence[Union[str, DiceExpression]]
+    ],
+    n: int = 1,
+    generator: Optional[np.random.Generator] = None,
+    method: h.RollMethod = h.RollMethod.DICE,
+) -> np.ndarray:
+    """Return n results for a die description, as a NumPy array.
+
+    A single description gives an array of shape (n,). A sequence of
+    descriptions gives shape (len(descriptions), n), one row per description.
+    Dice are drawn in bulk from generator, or from default_generator if none
+    is supplied. RollMethod.ALIAS draws one uniform per result instead.
     """
-    dice_score: int = 0
-    modifier_score: int = 0
-    dice_roll_description: str = ""
-    constant_str: str = ""
-    sign: str = ""
-
-    sign_present = set("+-").intersection(set(full_roll_description))
-    if sign_present and "d" in full_roll_description:
-        sign = sign_present.pop()
-        dice_roll_description, constant_str = full_roll_description.split(sign)
-    elif "d" in full_roll_description:
-        dice_roll_description = full_roll_description
-    else:  # constant expression
-        constant_str = full_roll_description
-
-    if dice_roll_description:
-        dice_num, dice_size = dice_description_parser(
-            dice_roll_description=dice_roll_description
+    if generator is None:
+        generator = default_generator
+    if isinstance(full_roll_description, (str, DiceExpression)):
+        return roll_many_single(
+            full_roll_description=full_roll_description,
+            n=n,
+            generator=generator,
+            method=method,
+        )
+    results = np.empty((len(full_roll_description), n), dtype=np.int64)
+    for row, description in enumerate(full_roll_description):
+        results[row] = roll_many_single(
+            full_roll_description=description,
+            n=n,
+            generator=generator,
+            method=method,
+        )
+    return results
+
+
+def roll_many_single(
+    full_roll_description: Union[str, DiceExpression],
+    n: int,
+    generator: np.random.Generator,
+    method: h.RollMethod,
+) -> np.ndarray:
+    """Array of n results for one description, by the requested method."""
+    if method == h.RollMethod.ALIAS:
+        return alias_table(full_roll_description=full_roll_description).sample_many(
+            n=n, generator=generator
         )
-        dice_score = dice_description_result(dice_num=dice_num, dice_size=dice_size)
-    if constant_str:
-        if sign:
-            constant_str = sign + constant_str
-        modifier_score = constant_evaluator(constant=constant_str)
+    return as_expression(full_roll_description=full_roll_description).roll_many(
+        n=n, generator=generator
+    )
+
+
+@lru_cache(maxsize=DISTRIBUTION_CACHE_SIZE)
+def distribution(full_roll_description: Union[str, DiceExpression]) -> Distribution:
+    """Exact, cached distribution of results for a die description."""
+    return as_expression(full_roll_description=full_roll_description).distribution()
+
 
-    return dice_score + modifier_score
+@lru_cache(maxsize=ALIAS_TABLE_CACHE_SIZE)
+def alias_table(full_roll_description: Union[str, DiceExpression]) -> AliasTable:
+    """Cached alias table built from the exact distribution of a description."""
+    return AliasTable.from_distribution(
+        distribution=distribution(full_roll_description=full_roll_description)
+    )
@@ -0,0 +1,390 @@
+"""Saving and loading Combats as versioned JSON or compact binary."""
+import json
+import os
+import struct
+import sys
+from array import array
+from enum import Enum
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from . import attack as a
+from . import combat as cb
+from . import combatant as c
+from . import events as ev
+from . import helpers as h
+from . import sinks
+
+
+FORMAT_NAME = "dot-combat"
+FORMAT_VERSION = 1
+MAGIC = b"DOTC"
+HEADER = struct.Struct("<4sHI")
+COUNT = struct.Struct("<I")
+ENUMS = {
+    enum.__name__: enum
+    for enum in (
+        h.DamageType,
+        h.Conditions,
+        h.FightingStatus,
+        h.RemovalConditions,
+        h.Faction,
+        h.LogLevel,
+        ev.Event,
+    )
+}
+BULK_ARRAYS = ("combatant_states", "turn_keys", "turn_ids", "active_ids")
+NUMERIC_FIELDS = ("max_hit_points", "armor_class")
+TABLED_FIELDS = ("attacks", "control", "faction", "removal_condition")
+
+
+def encode_value(value: Any, attack_index: Optional[Dict[int, int]] = None) -> Any:
+    """A JSON value for a faction or logged value.
+
+    Known enums become a pair of class and member name, and Attacks in
+    attack_index a pair of "Attack" and their index in the attack table.
+    Other types are saved as their text.
+    """
+    if isinstance(value, Enum) and type(value).__name__ in ENUMS:
+        return [type(value).__name__, value.name]
+    if attack_index is not None and id(value) in attack_index:
+        return [a.Attack.__name__, attack_index[id(value)]]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def decode_value(value: Any, attacks: Sequence[a.Attack] = ()) -> Any:
+    """The value that encode_value() was given, or its text for other types."""
+    if isinstance(value, list):
+        if value[0] == a.Attack.__name__:
+            return attacks[value[1]]
+        return ENUMS[value[0]][value[1]]
+    return value
+
+
+def encode_attack(attack: a.Attack) -> Dict[str, Any]:
+    """An Attack as a dict of JSON values."""
+    return {
+        "name": attack.name,
+        "attack_bonus": attack.attack_bonus,
+        "damage_dice": attack.damage_dice,
+        "damage_bonus": attack.damage_bonus,
+        "damage_type": attack.damage_type.name,
+        "range": attack.range,
+        "long_range": attack.long_range,
+    }
+
+
+def decode_attack(data: Dict[str, Any]) -> a.Attack:
+    """The Attack described by encode_attack()."""
+    return a.Attack(
+        name=data["name"],
+        attack_bonus=data["attack_bonus"],
+        damage_dice=data["damage_dice"],
+        damage_bonus=data["damage_bonus"],
+        damage_type=h.DamageType[data["damage_type"]],
+        range=data["range"],
+        long_range=data["long_range"],
+    )
+
+
+def encode_entry(
+    entry: ev.LogEntry, attack_index: Optional[Dict[int, int]] = None
+) -> List[Any]:
+    """A log entry as a list of JSON values."""
+    return [
+        entry.round,
+        entry.initiative,
+        entry.event.name,
+        encode_value(value=entry.actor, attack_index=attack_index),
+        encode_value(value=entry.target, attack_index=attack_index),
+        [
+            encode_value(value=value, attack_index=attack_index)
+            for value in entry.values
+        ],
+    ]
+
+
+def decode_entry(data: List[Any], attacks: Sequence[a.Attack] = ()) -> ev.LogEntry:
+    """The log entry described by encode_entry()."""
+    return ev.LogEntry(
+        data[0],
+        data[1],
+        ev.Event[data[2]],
+        decode_value(value=data[3], attacks=attacks),
+        decode_value(value=data[4], attacks=attacks),
+        tuple(decode_value(value=value, attacks=attacks) for value in data[5]),
+    )
+
+
+def add_attack(
+    attack: a.Attack, attack_index: Dict[int, int], attacks: List[Dict[str, Any]]
+) -> None:
+    """Put an Attack in the attack table, unless it is already there."""
+    if id(attack) not in attack_index:
+        attack_index[id(attack)] = len(attacks)
+        attacks.append(encode_attack(attack=attack))
+
+
+def to_dict(combat: cb.Combat, include_log: bool = False) -> Dict[str, Any]:
+    """Everything needed to rebuild a Combat, as JSON values.
+
+    Attacks shared between Combatants, or named in the log, are saved
+    once. The random source and log sink are not saved. Factions and
+    logged values other than None, bool, int, float, str, the enums in
+    ENUMS and Attacks are saved as their text, so they load back as str.
+    """
+    snapshot = combat.snapshot()
+    attack_index: Dict[int, int] = {}
+    attacks: List[Dict[str, Any]] = []
+    combatants: List[Dict[str, Any]] = []
+    for combatant in snapshot.roster:
+        for attack in combatant.attacks:
+            add_attack(attack=attack, attack_index=attack_index, attacks=attacks)
+        combatants.append(
+            {
+                "max_hit_points": combatant.max_hit_points,
+                "armor_class": combatant.armor_class,
+                "attacks": [attack_index[id(attack)] for attack in combatant.attacks],
+                "control": combatant.control,
+                "faction": encode_value(value=combatant.faction),
+                "removal_condition": combatant.removal_condition.name,
+            }
+        )
+    log = None
+    if include_log:
+        for entry in combat.event_log:
+            for value in entry.values:
+                if isinstance(value, a.Attack):
+                    add_attack(attack=value, attack_index=attack_index, attacks=attacks)
+        log = [
+            encode_entry(entry=entry, attack_index=attack_index)
+            for entry in combat.event_log
+        ]
+    return {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "log_level": combat.log_level.name,
+        "alliances": sorted(
+            (
+                sorted((encode_value(value=faction) for faction in alliance), key=repr)
+                for alliance in set(combat.alliance_of.values())
+            ),
+            key=repr,
+        ),
+        "attacks": attacks,
+        "combatants": combatants,
+        "has_started": snapshot.has_started,
+        "has_finished": snapshot.has_finished,
+        "current_round": snapshot.current_round,
+        "current_initiative": snapshot.current_initiative,
+        "current_combatant_id": snapshot.current_combatant_id,
+        "cursor": snapshot.cursor,
+        "joined": snapshot.joined,
+        "combatant_states": snapshot.combatant_states.tolist(),
+        "turn_keys": [value for key in snapshot.turn_keys for value in key],
+        "turn_ids": list(snapshot.turn_ids),
+        "active_ids": list(snapshot.active_ids),
+        "log": log,
+    }
+
+
+def from_dict(
+    data: Dict[str, Any], log_sink: Optional[sinks.LogSink] = None
+) -> cb.Combat:
+    """Rebuild a Combat saved by to_dict().
+
+    A saved log is treated as already sent, so it is not written to
+    log_sink again.
+    """
+    if data.get("format") != FORMAT_NAME or data.get("version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Cannot load {data.get('format')} version {data.get('version')}."
+        )
+    attacks = [decode_attack(data=attack) for attack in data["attacks"]]
+    combat = cb.Combat(
+        combatant_list=[],
+        log_level=h.LogLevel[data["log_level"]],
+        log_sink=log_sink,
+        alliances=[
+            [decode_value(value=faction) for faction in alliance]
+            for alliance in data["alliances"]
+        ],
+    )
+    roster = [
+        c.Combatant(
+            max_hit_points=combatant["max_hit_points"],
+            armor_class=combatant["armor_class"],
+            attacks=[attacks[index] for index in combatant["attacks"]],
+            control=combatant["control"],
+            faction=decode_value(value=combatant["faction"]),
+            removal_condition=h.RemovalConditions[combatant["removal_condition"]],
+        )
+        for combatant in data["combatants"]
+    ]
+    if data["log"] is not None:
+        combat.event_log = [
+            decode_entry(data=entry, attacks=attacks) for entry in data["log"]
+        ]
+        combat.flushed_entries = len(combat.event_log)
+    turn_keys = data["turn_keys"]
+    combat.restore_state(
+        snapshot=cb.CombatSnapshot(
+            has_started=data["has_started"],
+            has_finished=data["has_finished"],
+            current_round=data["current_round"],
+            current_initiative=data["current_initiative"],
+            current_combatant_id=data["current_combatant_id"],
+            roster=tuple(roster),
+            active_ids=tuple(data["active_ids"]),
+            combatant_states=array("q", data["combatant_states"]),
+            turn_keys=tuple(
+                (turn_keys[index], turn_keys[index + 1])
+                for index in range(0, len(turn_keys), 2)
+            ),
+            turn_ids=tuple(data["turn_ids"]),
+            cursor=data["cursor"],
+            joined=data["joined"],
+            event_count=len(combat.event_log),
+            random_state=None,
+        )
+    )
+    return combat
+
+
+def dumps_json(combat: cb.Combat, include_log: bool = False) -> str:
+    """A Combat as readable JSON text."""
+    return json.dumps(to_dict(combat=combat, include_log=include_log), indent=1)
+
+
+def loads_json(text: str, log_sink: Optional[sinks.LogSink] = None) -> cb.Combat:
+    """Rebuild a Combat from the text made by dumps_json()."""
+    return from_dict(data=json.loads(text), log_sink=log_sink)
+
+
+def to_columns(records: List[Dict[str, Any]]) -> Tuple[List[List[int]], Dict[str, Any]]:
+    """Combatant records as integer columns, with tables for the other fields.
+
+    Each field in TABLED_FIELDS is stored as an index into a table of its
+    distinct values, which are usually shared by many Combatants.
+    """
+    columns = [[record[name] for record in records] for name in NUMERIC_FIELDS]
+    tables: Dict[str, List[Any]] = {}
+    for name in TABLED_FIELDS:
+        index: Dict[Any, int] = {}
+        table: List[Any] = []
+        column: List[int] = []
+        for record in records:
+            value = record[name]
+            key = tuple(value) if isinstance(value, list) else value
+            if key not in index:
+                index[key] = len(table)
+                table.append(value)
+            column.append(index[key])
+        columns.append(column)
+        tables[name] = table
+    return columns, tables
+
+
+def from_columns(
+    columns: List[List[int]], tables: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """The combatant records split up by to_columns()."""
+    names = NUMERIC_FIELDS + TABLED_FIELDS
+    records: List[Dict[str, Any]] = [{} for _ in columns[0]]
+    for position, name in enumerate(names):
+        column = columns[position]
+        table = tables.get(name)
+        for row, record in enumerate(records):
+            record[name] = column[row] if table is None else table[column[row]]
+    return records
+
+
+def dumps_binary(combat: cb.Combat, include_log: bool = False) -> bytes:
+    """A Combat in the compact binary format.
+
+    A header of MAGIC, the format version and the length of a compact JSON
+    section; then each of BULK_ARRAYS, followed by the combatant columns
+    from to_columns(), as a count and that many little-endian 64-bit
+    integers.
+    """
+    data = to_dict(combat=combat, include_log=include_log)
+    bulk = [data.pop(name) for name in BULK_ARRAYS]
+    columns, data["tables"] = to_columns(records=data.pop("combatants"))
+    meta = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, len(meta)), meta]
+    for column in bulk + columns:
+        values = array("q", column)
+        if sys.byteorder == "big":  # pragma: no cover
+            values.byteswap()
+        parts.append(COUNT.pack(len(values)))
+        parts.append(values.tobytes())
+    return b"".join(parts)
+
+
+def check_length(data: bytes, end: int) -> None:
+    """Raise ValueError if the binary data stops before end."""
+    if end > len(data):
+        raise ValueError(
+            f"Binary data is truncated: needs {end} bytes but has {len(data)}."
+        )
+
+
+def loads_binary(data: bytes, log_sink: Optional[sinks.LogSink] = None) -> cb.Combat:
+    """Rebuild a Combat from the bytes made by dumps_binary()."""
+    check_length(data=data, end=HEADER.size)
+    magic, version, meta_length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"Cannot load binary data {magic!r} version {version}.")
+    offset = HEADER.size + meta_length
+    check_length(data=data, end=offset)
+    loaded: Dict[str, Any] = json.loads(data[HEADER.size : offset].decode("utf-8"))
+    columns: List[List[int]] = []
+    for _ in range(len(BULK_ARRAYS) + len(NUMERIC_FIELDS) + len(TABLED_FIELDS)):
+        check_length(data=data, end=offset + COUNT.size)
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        values: "array[int]" = array("q")
+        check_length(data=data, end=offset + values.itemsize * count)
+        values.frombytes(data[offset : offset + values.itemsize * count])
+        if sys.byteorder == "big":  # pragma: no cover
+            values.byteswap()
+        offset += values.itemsize * count
+        columns.append(values.tolist())
+    for position, name in enumerate(BULK_ARRAYS):
+        loaded[name] = columns[position]
+    loaded["combatants"] = from_columns(
+        columns=columns[len(BULK_ARRAYS) :], tables=loaded.pop("tables")
+    )
+    return from_dict(data=loaded, log_sink=log_sink)
+
+
+def save(
+    combat: cb.Combat,
+    path: Union[str, "os.PathLike[str]"],
+    include_log: bool = False,
+) -> None:
+    """Write a Combat to a file: JSON if the name ends in .json, else binary."""
+    if os.fspath(path).endswith(".json"):
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(dumps_json(combat=combat, include_log=include_log))
+    else:
+        with open(path, "wb") as file:
+            file.write(dumps_binary(combat=combat, include_log=include_log))
+
+
+def load(
+    path: Union[str, "os.PathLike[str]"], log_sink: Optional[sinks.LogSink] = None
+) -> cb.Combat:
+    """Read a Combat written by save(), in either format."""
+    with open(path, "rb") as file:
+        data = file.read()
+    if data.startswith(MAGIC):
+        return loads_binary(data=data, log_sink=log_sink)
+    return loads_json(text=data.decode("utf-8"), log_sink=log_sink)
@@ -0,0 +1,303 @@
+"""Monte Carlo simulation of many independent copies of a Combat."""
+import copy
+import math
+import os
+import pickle  # noqa: S403
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from functools import lru_cache
+from typing import Callable
+from typing import Counter
+from typing import Dict
+from typing import Hashable
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from . import combat as cb
+from . import helpers as h
+from . import policy as p
+from . import rng
+from . import sinks
+
+
+KeepPolicy = Callable[[cb.CombatResult], bool]
+
+
+class KeptFight(NamedTuple):
+    """A fight picked out by simulate(), with a way to fight it again.
+
+    random_source is a copy of the chunk's stream as it was when the fight
+    began. Passing it to record_fight() gives the same outcome, and a Tape
+    that replay_fight() can step through.
+    """
+
+    chunk: int
+    fight: int
+    outcome: cb.CombatResult
+    random_source: rng.RandomSource
+
+
+@dataclass
+class SimulationResult:
+    """Tallies over many fights: winners, rounds fought and final hit points.
+
+    hit_points maps each combatant_id to a tally of the hit points that
+    Combatant finished with, 0 for those that were knocked out. kept holds
+    the fights picked out by a keep policy, in the order they were fought.
+    """
+
+    fights: int = 0
+    wins: Counter[Optional[Hashable]] = field(default_factory=Counter)
+    rounds: Counter[int] = field(default_factory=Counter)
+    hit_points: Dict[int, Counter[int]] = field(default_factory=dict)
+    kept: List[KeptFight] = field(default_factory=list, compare=False)
+
+    def add(self, other: "SimulationResult") -> None:
+        """Fold the tallies of another result into this one."""
+        self.fights += other.fights
+        self.wins.update(other.wins)
+        self.rounds.update(other.rounds)
+        for combatant_id, tally in other.hit_points.items():
+            self.hit_points.setdefault(combatant_id, Counter()).update(tally)
+        self.kept.extend(other.kept)
+
+    def win_rate(self, side: Optional[Hashable]) -> float:
+        """Fraction of fights won by a side. None counts fights with no winner."""
+        return self.wins[side] / self.fights
+
+    def mean_rounds(self) -> float:
+        """Mean number of rounds fought."""
+        total = sum(rounds * count for rounds, count in self.rounds.items())
+        return total / self.fights
+
+    def survival_rate(self, combatant_id: int) -> float:
+        """Fraction of fights a Combatant finished above 0 HP."""
+        return 1 - self.hit_points[combatant_id][0] / self.fights
+
+    def win_rate_interval(
+        self, side: Optional[Hashable], confidence: float = 0.95
+    ) -> Tuple[float, float]:
+        """Wilson score interval for the win rate of a side."""
+        return wilson_interval(
+            successes=self.wins[side],
+            trials=self.fights,
+            z=z_score(confidence=confidence),
+        )
+
+    def converged(self, precision: float, confidence: float = 0.95) -> bool:
+        """Is every observed win rate known to within plus or minus precision?"""
+        for side in self.wins:
+            low, high = self.win_rate_interval(side=side, confidence=confidence)
+            if high - low > 2 * precision:
+                return False
+        return True
+
+
+@lru_cache(maxsize=None)
+def z_score(confidence: float) -> float:
+    """Two-sided standard normal quantile for a confidence level, e.g. 1.96."""
+    low, high = 0.0, 40.0
+    for _ in range(100):
+        middle = (low + high) / 2
+        if math.erf(middle / math.sqrt(2)) < confidence:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def wilson_interval(successes: int, trials: int, z: float) -> Tuple[float, float]:
+    """Wilson score interval for a proportion, sound even near 0 and 1."""
+    rate = successes / trials
+    scale = 1 + z * z / trials
+    centre = (rate + z * z / (2 * trials)) / scale
+    spread = (
+        z * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials))
+    ) / scale
+    return max(centre - spread, 0.0), min(centre + spread, 1.0)
+
+
+def headless_template(encounter: cb.Combat) -> bytes:
+    """Pickled copy of an encounter that logs nothing.
+
+    The encounter's log sink is swapped for a NullSink in the copy, so
+    sinks holding files or threads never need to be pickled.
+    """
+    headless = copy.deepcopy(encounter, {id(encounter.log_sink): sinks.NullSink()})
+    headless.event_log = []
+    headless.flushed_entries = 0
+    headless.set_log_level(log_level=h.LogLevel.OFF)
+    return pickle.dumps(headless, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def run_chunk(
+    template: bytes,
+    random_source: rng.RandomSource,
+    fights: int,
+    target_policy: p.TargetPolicy = p.first_standing_enemy,
+    attack_policy: p.AttackPolicy = p.first_attack,
+    max_rounds: int = 100,
+    keep: Optional[KeepPolicy] = None,
+    chunk: int = 0,
+) -> SimulationResult:
+    """Run fights copies of the pickled encounter, all rolling from random_source.
+
+    Fights whose outcome keep returns True for are added to result.kept,
+    labelled with chunk and their position in it.
+    """
+    result = SimulationResult(fights=fights)
+    hit_points = result.hit_points
+    for fight in range(fights):
+        combat: cb.Combat = pickle.loads(template)  # noqa: S301
+        combat.set_random_source(random_source=random_source)
+        start = random_source.snapshot() if keep is not None else None
+        outcome = combat.run_to_completion(
+            target_policy=target_policy,
+            attack_policy=attack_policy,
+            max_rounds=max_rounds,
+        )
+        if keep is not None and keep(outcome):
+            source = copy.deepcopy(random_source)
+            source.restore(snapshot=start)
+            result.kept.append(
+                KeptFight(
+                    chunk=chunk, fight=fight, outcome=outcome, random_source=source
+                )
+            )
+        result.wins[outcome.winner] += 1
+        result.rounds[outcome.rounds] += 1
+        for combatant_id, combatant in combat.roster.items():
+            if combatant_id not in hit_points:
+                hit_points[combatant_id] = Counter()
+            hit_points[combatant_id][combatant.current_hit_points] += 1
+    return result
+
+
+def record_fight(
+    encounter: cb.Combat,
+    random_source: rng.RandomSource,
+    target_policy: p.TargetPolicy = p.first_standing_enemy,
+    attack_policy: p.AttackPolicy = p.first_attack,
+    max_rounds: int = 100,
+) -> Tuple[cb.CombatResult, rng.Tape]:
+    """Fight a headless copy of an encounter, recording every roll on a Tape."""
+    recorder = rng.RecordingRandomSource(source=random_source)
+    combat: cb.Combat = pickle.loads(  # noqa: S301
+        headless_template(encounter=encounter)
+    )
+    combat.set_random_source(random_source=recorder)
+    outcome = combat.run_to_completion(
+        target_policy=target_policy, attack_policy=attack_policy, max_rounds=max_rounds
+    )
+    return outcome, recorder.tape()
+
+
+def replay_fight(
+    encounter: cb.Combat,
+    tape: rng.Tape,
+    target_policy: p.TargetPolicy = p.first_standing_enemy,
+    attack_policy: p.AttackPolicy = p.first_attack,
+    max_rounds: int = 100,
+) -> cb.Combat:
+    """Fight a headless copy of an encounter again, rolling from a recorded Tape.
+
+    The policies and max_rounds must match the recording. Nothing is logged;
+    the finished Combat is returned so its Combatants can be inspected.
+    """
+    combat: cb.Combat = pickle.loads(  # noqa: S301
+        headless_template(encounter=encounter)
+    )
+    combat.set_random_source(random_source=rng.ReplayRandomSource(tape=tape))
+    combat.run_to_completion(
+        target_policy=target_policy, attack_policy=attack_policy, max_rounds=max_rounds
+    )
+    return combat
+
+
+def simulate(
+    encounter: cb.Combat,
+    n: int,
+    workers: Optional[int] = None,
+    seed: rng.Seed = None,
+    chunk_size: int = 1000,
+    target_policy: p.TargetPolicy = p.first_standing_enemy,
+    attack_policy: p.AttackPolicy = p.first_attack,
+    max_rounds: int = 100,
+    precision: Optional[float] = None,
+    confidence: float = 0.95,
+    keep: Optional[KeepPolicy] = None,
+) -> SimulationResult:
+    """Run n independent copies of an encounter and tally the outcomes.
+
+    Fights are dealt out in chunks of chunk_size to a pool of worker
+    processes, one per CPU by default; with workers=1 they run in this
+    process. Each chunk rolls from its own stream spawned from seed, so the
+    results depend on seed and chunk_size but not on the number of workers.
+    Policies must be picklable, e.g. module-level functions.
+
+    With a precision, n is a limit: after each chunk the simulation stops
+    once every win rate is known to within plus or minus precision at the
+    given confidence, and chunks not yet started are cancelled. Chunks are
+    tallied in order, so where it stops does not depend on the workers
+    either. A smaller chunk_size lets lopsided fights stop sooner.
+
+    keep picks out fights worth a closer look, e.g. upsets, from their
+    CombatResult. Each one is returned in result.kept as a KeptFight that
+    can be fought again. Like the policies, keep must be picklable.
+    """
+    if n < 1:
+        raise ValueError(f"Cannot simulate {n} fights.")
+    template = headless_template(encounter=encounter)
+    chunks: List[int] = [chunk_size] * (n // chunk_size)
+    if n % chunk_size:
+        chunks.append(n % chunk_size)
+    sources = rng.BufferedRandomSource(seed=seed).spawn(n=len(chunks))
+    result = SimulationResult()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1:
+        for index, fights in enumerate(chunks):
+            result.add(
+                run_chunk(
+                    template,
+                    sources[index],
+                    fights,
+                    target_policy,
+                    attack_policy,
+                    max_rounds,
+                    keep,
+                    index,
+                )
+            )
+            if precision is not None and result.converged(
+                precision=precision, confidence=confidence
+            ):
+                break
+        return result
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                run_chunk,
+                template,
+                sources[index],
+                fights,
+                target_policy,
+                attack_policy,
+                max_rounds,
+                keep,
+                index,
+            )
+            for index, fights in enumerate(chunks)
+        ]
+        for future in futures:
+            result.add(future.result())
+            if precision is not None and result.converged(
+                precision=precision, confidence=confidence
+            ):
+                for pending in futures:
+                    pending.cancel()
+                break
+    return result
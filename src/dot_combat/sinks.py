@@ -0,0 +1,183 @@
+"""Destinations for the event logs of finished or running Combats."""
+import json
+import os
+import queue
+import sys
+import threading
+from typing import IO
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+from . import events as ev
+
+
+class LogSink:
+    """Receives batches of log entries from a Combat. Writes nothing."""
+
+    def write(self, entries: Sequence[ev.LogEntry]) -> None:
+        """Accept a batch of entries."""
+
+    def flush(self) -> None:
+        """Make sure everything written so far has reached its destination."""
+
+    def close(self) -> None:
+        """Flush, and release anything the sink holds open."""
+        self.flush()
+
+
+class NullSink(LogSink):
+    """Discards everything, for headless simulations."""
+
+
+class MemorySink(LogSink):
+    """Keeps every entry in a list."""
+
+    def __init__(self) -> None:
+        """New, empty sink."""
+        self.entries: List[ev.LogEntry] = []
+
+    def write(self, entries: Sequence[ev.LogEntry]) -> None:
+        """Keep the batch of entries."""
+        self.entries.extend(entries)
+
+
+class PrintSink(LogSink):
+    """Prints each batch as its narrative log followed by its technical log."""
+
+    def __init__(self, stream: Optional[IO[str]] = None):
+        """New sink printing to stream, or to stdout at the time of writing."""
+        self.stream = stream
+
+    def write(self, entries: Sequence[ev.LogEntry]) -> None:
+        """Print the narrative and technical text of the batch."""
+        stream = self.stream if self.stream is not None else sys.stdout
+        narrative = ev.render_channel(entries=entries, log_channel=ev.Channel.NARRATIVE)
+        technical = ev.render_channel(entries=entries, log_channel=ev.Channel.TECHNICAL)
+        stream.write(f"\n{narrative}\n\n{technical}\n")
+
+    def flush(self) -> None:
+        """Flush the stream."""
+        (self.stream if self.stream is not None else sys.stdout).flush()
+
+
+class JsonlSink(LogSink):
+    """Writes one JSON object per entry to a text stream."""
+
+    def __init__(self, stream: IO[str]):
+        """New sink writing to stream."""
+        self.stream = stream
+
+    def write(self, entries: Sequence[ev.LogEntry]) -> None:
+        """Write the batch in a single call to the stream."""
+        self.stream.write(
+            "".join(json.dumps(ev.as_dict(entry=entry)) + "\n" for entry in entries)
+        )
+
+    def flush(self) -> None:
+        """Flush the stream."""
+        self.stream.flush()
+
+
+class RotatingFileSink(LogSink):
+    """Appends rendered log lines to a file, rotating it when it grows too big.
+
+    When a batch would take the file past max_bytes, path is renamed to
+    path.1, path.1 to path.2 and so on, keeping backup_count old files.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, "os.PathLike[str]"],
+        max_bytes: int = 10_000_000,
+        backup_count: int = 3,
+    ):
+        """New sink appending to the file at path."""
+        self.path = os.fspath(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.file = open(self.path, "ab")
+
+    def write(self, entries: Sequence[ev.LogEntry]) -> None:
+        """Append the rendered batch, rotating first if it would not fit."""
+        data = "".join(ev.render(entry=entry) for entry in entries).encode("utf-8")
+        if self.file.tell() and self.file.tell() + len(data) > self.max_bytes:
+            self.rotate()
+        self.file.write(data)
+
+    def rotate(self) -> None:
+        """Move the current file into the backups and start a new one."""
+        self.file.close()
+        for number in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{number}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{number + 1}")
+        if self.backup_count:
+            os.replace(self.path, f"{self.path}.1")
+        self.file = open(self.path, "wb")
+
+    def flush(self) -> None:
+        """Flush the file."""
+        self.file.flush()
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        self.file.close()
+
+
+class ThreadedSink(LogSink):
+    """Hands batches to another sink on a background thread.
+
+    write() only queues the batch, so rendering and I/O happen off the
+    thread running the simulation. flush() waits for the queue to drain.
+    If the inner sink raises, later batches are dropped and the error is
+    raised again by the next call to write(), flush() or close().
+    """
+
+    def __init__(self, sink: LogSink, max_batches: int = 1024):
+        """New sink feeding sink from a daemon thread."""
+        self.sink = sink
+        self.error: Optional[Exception] = None
+        self.batches: "queue.Queue[Optional[List[ev.LogEntry]]]" = queue.Queue(
+            maxsize=max_batches
+        )
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        """Write queued batches until close() queues None."""
+        while True:
+            batch = self.batches.get()
+            try:
+                if batch is None:
+                    return
+                if self.error is None:
+                    self.sink.write(entries=batch)
+            except Exception as error:
+                self.error = error
+            finally:
+                self.batches.task_done()
+
+    def raise_error(self) -> None:
+        """Raise the error the inner sink raised, if it has raised one."""
+        if self.error is not None:
+            raise self.error
+
+    def write(self, entries: Sequence[ev.LogEntry]) -> None:
+        """Queue a copy of the batch for the background thread."""
+        self.raise_error()
+        self.batches.put(list(entries))
+
+    def flush(self) -> None:
+        """Wait until every queued batch is written, then flush the sink."""
+        self.batches.join()
+        self.raise_error()
+        self.sink.flush()
+
+    def close(self) -> None:
+        """Write everything queued, stop the thread and close the sink."""
+        self.batches.put(None)
+        self.thread.join()
+        self.sink.close()
+        self.raise_error()
@@ -0,0 +1,260 @@
+"""Exact outcomes of small Combats, as a Markov chain over hit points."""
+from dataclasses import dataclass
+from typing import Dict
+from typing import Hashable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+
+from . import combat as cb
+from . import helpers as h
+from . import probability as pr
+from . import roll as r
+
+
+SOLVER_MAX_STATES = 65536
+HitPoints = Tuple[int, ...]
+Moves = List[Tuple[float, HitPoints]]
+
+
+@dataclass(frozen=True)
+class SolverResult:
+    """Exact chance of each side winning, and the expected rounds fought.
+
+    None in wins is a draw: a fight in which nobody can deal damage any
+    more. Unlike run_to_completion(), there is no max_rounds. A draw adds
+    no rounds to expected_rounds, where run_to_completion() would fight on
+    to max_rounds, and a fight long enough to be cut short by max_rounds
+    is played out to a winner here.
+    """
+
+    wins: Dict[Optional[Hashable], float]
+    expected_rounds: float
+
+    def win_rate(self, side: Optional[Hashable]) -> float:
+        """Chance that a side wins. None gives the chance of a draw."""
+        return self.wins.get(side, 0.0)
+
+
+class MarkovSolver:
+    """A Combat as a Markov chain over (hit points of each Combatant, cursor).
+
+    Follows Combat.run_to_completion() with its default policies: on its
+    turn each Combatant attacks the first standing enemy with its first
+    Attack, and a Combatant that drops to 0 HP leaves the turn order.
+    Hit points only go down, so once every reachable set of hit points is
+    found, they are solved in order of increasing total, each from sets
+    already solved. Every cursor for one set of hit points is solved at
+    once, as turns that deal no damage go round in a cycle. The number of
+    reachable sets grows with the hit points on each side, so this is for
+    small encounters: one that can reach more than max_states raises
+    ValueError.
+    """
+
+    def __init__(self, encounter: cb.Combat, max_states: int = SOLVER_MAX_STATES):
+        """Lay out an encounter whose initiative has been rolled."""
+        if not encounter.turn_order or encounter.has_finished:
+            raise ValueError("Can only solve a Combat with initiative and no result.")
+        slots = encounter.turn_order.slots
+        if any(
+            combatant.removal_condition != h.RemovalConditions.ZERO_HP
+            for combatant in slots
+        ):
+            raise ValueError("Can only solve Combats where 0 HP removes a Combatant.")
+        sides: Dict[Hashable, int] = {}
+        self.side_index = tuple(
+            sides.setdefault(encounter.side(faction=combatant.faction), len(sides))
+            for combatant in slots
+        )
+        self.sides: Tuple[Hashable, ...] = tuple(sides)
+        position = {
+            encounter.id_of(combatant=combatant): index
+            for index, combatant in enumerate(slots)
+        }
+        self.target_order = tuple(
+            position[combatant_id] for combatant_id in encounter.standing_sides
+        )
+        self.start_hit_points: HitPoints = tuple(
+            combatant.current_hit_points if index in self.target_order else 0
+            for index, combatant in enumerate(slots)
+        )
+        self.stays_in_order = tuple(
+            hit_points == 0 for hit_points in self.start_hit_points
+        )
+        self.attacks = tuple(
+            combatant.attacks[0] if combatant.attacks else None for combatant in slots
+        )
+        self.armor_class = tuple(combatant.armor_class for combatant in slots)
+        self.start_cursor = encounter.turn_order.cursor if encounter.has_started else 0
+        self.start_round = encounter.current_round if encounter.has_started else 1
+        self.draw = len(self.sides)
+        self.rounds = len(self.sides) + 1
+        self.max_states = max_states
+        self.values: Dict[HitPoints, np.ndarray] = {}
+
+    def solve(self) -> SolverResult:
+        """Exact win chances and expected rounds, from the encounter's state."""
+        outcome = self.terminal(hit_points=self.start_hit_points)
+        if outcome is None:
+            for hit_points in sorted(self.reachable(), key=sum):
+                self.values[hit_points] = self.cycle_values(hit_points=hit_points)
+            outcome = self.values[self.start_hit_points][self.start_cursor]
+        wins: Dict[Optional[Hashable], float] = {
+            side: float(outcome[index]) for index, side in enumerate(self.sides)
+        }
+        wins[None] = float(outcome[self.draw])
+        return SolverResult(
+            wins=wins, expected_rounds=self.start_round + float(outcome[self.rounds])
+        )
+
+    def reachable(self) -> List[HitPoints]:
+        """Every set of hit points with two sides standing that can be reached."""
+        found = {self.start_hit_points}
+        stack = [self.start_hit_points]
+        while stack:
+            hit_points = stack.pop()
+            for attacker in self.in_order(hit_points=hit_points):
+                _, moves = self.moves(hit_points=hit_points, attacker=attacker)
+                for _, later in moves:
+                    if later in found or self.terminal(hit_points=later) is not None:
+                        continue
+                    if len(found) >= self.max_states:
+                        raise ValueError(
+                            f"Encounter too large: more than {self.max_states} "
+                            "sets of hit points to solve."
+                        )
+                    found.add(later)
+                    stack.append(later)
+        return list(found)
+
+    def in_order(self, hit_points: HitPoints) -> List[int]:
+        """Positions of the Combatants still in the turn order."""
+        return [
+            index
+            for index, current in enumerate(hit_points)
+            if current > 0 or self.stays_in_order[index]
+        ]
+
+    def terminal(self, hit_points: HitPoints) -> Optional[np.ndarray]:
+        """Outcome if fewer than two sides are standing, or None if not."""
+        standing = {
+            self.side_index[index]
+            for index, current in enumerate(hit_points)
+            if current > 0
+        }
+        if len(standing) > 1:
+            return None
+        outcome = np.zeros(len(self.sides) + 2)
+        outcome[standing.pop() if standing else self.draw] = 1.0
+        return outcome
+
+    def target(self, hit_points: HitPoints, attacker: int) -> int:
+        """Position of the first standing enemy of the attacker.
+
+        Only asked while two sides are standing, so there always is one.
+        """
+        side = self.side_index[attacker]
+        return next(
+            index
+            for index in self.target_order
+            if hit_points[index] > 0 and self.side_index[index] != side
+        )
+
+    def damage(
+        self, hit_points: HitPoints, attacker: int
+    ) -> Tuple[Optional[int], r.Distribution]:
+        """The attacker's target and the distribution of damage dealt to it."""
+        attack = self.attacks[attacker]
+        if attack is None:
+            return None, pr.NO_DAMAGE
+        target = self.target(hit_points=hit_points, attacker=attacker)
+        damage = pr.damage_distribution(
+            damage_dice=attack.damage_dice,
+            damage_bonus=attack.damage_bonus,
+            attack_bonus=attack.attack_bonus,
+            armor_class=self.armor_class[target],
+        )
+        if damage.minimum < 0:
+            raise ValueError(f"Cannot solve {attack}, which can heal its target.")
+        return target, damage
+
+    def moves(self, hit_points: HitPoints, attacker: int) -> Tuple[float, Moves]:
+        """Chance the attacker deals no damage, and the hit points it can leave."""
+        target, damage = self.damage(hit_points=hit_points, attacker=attacker)
+        if target is None:
+            return 1.0, []
+        current = hit_points[target]
+        moves: Moves = []
+        lowest, highest = max(damage.minimum, 1), min(damage.maximum, current - 1)
+        for dealt in range(lowest, highest + 1):
+            chance = damage.probability(value=dealt)
+            if chance:
+                moves.append((chance, self.hit(hit_points, target, current - dealt)))
+        chance = damage.at_least(value=current)
+        if chance:
+            moves.append((chance, self.hit(hit_points, target, 0)))
+        return damage.probability(value=0), moves
+
+    def after(self, hit_points: HitPoints, attacker: int) -> np.ndarray:
+        """Outcome from the turn after the attacker's, once damage is dealt."""
+        outcome = self.terminal(hit_points=hit_points)
+        if outcome is not None:
+            return outcome
+        actors = self.in_order(hit_points=hit_points)
+        later = [index for index in actors if index > attacker]
+        outcome = self.values[hit_points][later[0] if later else actors[0]].copy()
+        if not later:
+            outcome[self.rounds] += 1.0
+        return outcome
+
+    def cycle_values(self, hit_points: HitPoints) -> np.ndarray:
+        """Outcome from each cursor position, for one set of hit points.
+
+        Each turn either deals damage, moving to lower hit points, or goes
+        on to the next turn with probability stay. Around the cycle of
+        turns, values[k] = moved[k] + stay[k] * values[k + 1], which is
+        solved in closed form. If no turn can ever deal damage the fight
+        is a draw.
+        """
+        width = len(self.sides) + 2
+        values = np.zeros((len(hit_points), width))
+        actors = self.in_order(hit_points=hit_points)
+        count = len(actors)
+        stay = np.ones(count)
+        moved = np.zeros((count, width))
+        for position, attacker in enumerate(actors):
+            if position == count - 1:
+                moved[position, self.rounds] = 1.0
+            stay[position], moves = self.moves(hit_points=hit_points, attacker=attacker)
+            moved[position] *= stay[position]
+            for chance, later in moves:
+                outcome = self.after(hit_points=later, attacker=attacker)
+                moved[position] += chance * outcome
+        if stay.prod() >= 1.0:
+            values[:, self.draw] = 1.0
+            return values
+        for start in range(count):
+            total = np.zeros(width)
+            carried = 1.0
+            for step in range(count):
+                position = (start + step) % count
+                total += carried * moved[position]
+                carried *= stay[position]
+            values[actors[start]] = total / (1.0 - carried)
+        return values
+
+    @staticmethod
+    def hit(hit_points: HitPoints, target: int, remaining: int) -> HitPoints:
+        """Hit points with the target's set to remaining."""
+        return hit_points[:target] + (remaining,) + hit_points[target + 1 :]
+
+
+def solve(encounter: cb.Combat, max_states: int = SOLVER_MAX_STATES) -> SolverResult:
+    """Exact win chances and expected rounds for a small encounter.
+
+    Initiative must have been rolled, as the answer depends on the turn
+    order. See MarkovSolver for the rules that are followed.
+    """
+    return MarkovSolver(encounter=encounter, max_states=max_states).solve()
@@ -0,0 +1,159 @@
+"""Contains the TurnOrder class."""
+from bisect import bisect_left
+from bisect import bisect_right
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from . import combatant as c
+
+
+TurnKey = Tuple[int, int]
+
+
+class TurnOrder:
+    """Combatants in the order they act, with a cursor on whoever is acting.
+
+    Slots are sorted by descending initiative and then by the order in which
+    Combatants joined, so ties keep a stable order. Advancing the cursor is
+    O(1). Finding a slot for insertion or removal is an O(log n) bisection;
+    shifting the list after it is a single memmove.
+
+    When the current Combatant leaves, the cursor steps back onto the slot
+    before it, which is -1 if it was at the top, and its key is kept as
+    gap. Until the cursor moves again, Combatants joining with a key
+    before the gap have had their turn this round and the rest have not.
+    """
+
+    def __init__(self) -> None:
+        """New, empty turn order."""
+        self.keys: List[TurnKey] = []
+        self.slots: List[c.Combatant] = []
+        self.key_of: Dict[c.Combatant, TurnKey] = {}
+        self.cursor: int = 0
+        self.joined: int = 0
+        self.gap: Optional[TurnKey] = None
+
+    def __len__(self) -> int:
+        """Number of Combatants in the turn order."""
+        return len(self.slots)
+
+    def __contains__(self, combatant: object) -> bool:
+        """Is the Combatant in the turn order?"""
+        return combatant in self.key_of
+
+    def clear(self) -> None:
+        """Remove every Combatant and reset the cursor."""
+        self.keys.clear()
+        self.slots.clear()
+        self.key_of.clear()
+        self.cursor = 0
+        self.gap = None
+
+    def load(
+        self, keys: List[TurnKey], slots: List[c.Combatant], cursor: int, joined: int
+    ) -> None:
+        """Replace the whole turn order with slots already sorted by keys."""
+        self.keys = keys
+        self.slots = slots
+        self.key_of = {slots[position]: key for position, key in enumerate(keys)}
+        self.cursor = cursor
+        self.joined = joined
+        self.gap = None
+
+    def insert(self, combatant: c.Combatant, initiative: int) -> None:
+        """Add a Combatant after any others with the same initiative.
+
+        If the new slot comes before the cursor, or before the gap left by
+        a current Combatant that has been removed, the cursor moves with
+        the Combatant it was on.
+        """
+        if combatant in self.key_of:
+            raise ValueError(f"Combatant {str(combatant)} is already in turn order.")
+        key = (-initiative, self.joined)
+        self.joined += 1
+        position = bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.slots.insert(position, combatant)
+        self.key_of[combatant] = key
+        passed = position <= self.cursor if self.gap is None else key < self.gap
+        if passed and len(self.slots) > 1:
+            self.cursor += 1
+
+    def remove(self, combatant: c.Combatant) -> int:
+        """Remove a Combatant and return the initiative it had.
+
+        If it was the current Combatant, the cursor steps back so that
+        peek() and advance() still give the Combatant that was next.
+        """
+        try:
+            key = self.key_of.pop(combatant)
+        except KeyError as ke:
+            raise ValueError(
+                f"Combatant {str(combatant)} not found in turn order."
+            ) from ke
+        position = bisect_left(self.keys, key)
+        del self.keys[position]
+        del self.slots[position]
+        if position == self.cursor and self.gap is None:
+            self.gap = key
+        if position <= self.cursor:
+            self.cursor -= 1
+        return -key[0]
+
+    def initiative_of(self, combatant: c.Combatant) -> int:
+        """Initiative of a Combatant in the turn order."""
+        return -self.key_of[combatant][0]
+
+    def start(self) -> c.Combatant:
+        """Put the cursor on the first Combatant and return them."""
+        self.cursor = 0
+        self.gap = None
+        return self.slots[0]
+
+    def current(self) -> c.Combatant:
+        """The Combatant under the cursor."""
+        return self.slots[self.cursor]
+
+    def current_initiative(self) -> int:
+        """Initiative of the slot under the cursor."""
+        return -self.keys[self.cursor][0]
+
+    def peek(self) -> c.Combatant:
+        """The Combatant who will act next, wrapping to the top of the order."""
+        return self.slots[(self.cursor + 1) % len(self.slots)]
+
+    def at_end(self) -> bool:
+        """Is the cursor on the last slot, so that advancing wraps round?"""
+        return self.cursor + 1 >= len(self.slots)
+
+    def advance(self) -> c.Combatant:
+        """Move the cursor on by one slot, wrapping, and return that Combatant."""
+        self.cursor = (self.cursor + 1) % len(self.slots)
+        self.gap = None
+        return self.slots[self.cursor]
+
+
+def insert_descending(values: List[int], value: int) -> None:
+    """Insert value into a list kept in descending order, by bisection."""
+    low, high = 0, len(values)
+    while low < high:
+        middle = (low + high) // 2
+        if values[middle] > value:
+            low = middle + 1
+        else:
+            high = middle
+    values.insert(low, value)
+
+
+def next_lower(values: List[int], value: int) -> int:
+    """First entry of a descending list below value, or the first entry."""
+    low, high = 0, len(values)
+    while low < high:
+        middle = (low + high) // 2
+        if values[middle] >= value:
+            low = middle + 1
+        else:
+            high = middle
+    return values[low] if low < len(values) else values[0]
@@ -3,10 +3,17 @@ import copy
 
 import pytest
 
+import dot_combat.events as ev
 import dot_combat.helpers as h
+import dot_combat.policy as policy
 from dot_combat.attack import Attack
 from dot_combat.combat import Combat
+from dot_combat.combat import CombatResult
 from dot_combat.combatant import Combatant
+from dot_combat.rng import BufferedRandomSource
+from dot_combat.rng import RandomSource
+from dot_combat.sinks import MemorySink
+from dot_combat.sinks import PrintSink
 
 
 @pytest.fixture
@@ -63,6 +70,66 @@ def test_technical_log_comment(test_combat) -> None:
     assert "XYZA" in test_combat.technical_log
 
 
+def test_log_event(test_combat) -> None:
+    """Events are stored unformatted, and rendered into the right log."""
+    attacker, target = test_combat.combatant_list
+    test_combat.log_event(ev.Event.ATTACKS, attacker, target, "Shortsword")
+    assert test_combat.event_log[-1] == ev.LogEntry(
+        0, 0, ev.Event.ATTACKS, 0, 1, ("Shortsword",)
+    )
+    assert "0 attacks 1 with Shortsword" in test_combat.narrative_log
+    assert "attacks" not in test_combat.technical_log
+
+
+def test_combatant_registry(test_combat, test_attack_list) -> None:
+    """Combatants get ids on joining, and can be found and removed by id."""
+    first, second = test_combat.combatant_list
+    assert test_combat.combatant_ids == {first: 0, second: 1}
+    third = Combatant(
+        max_hit_points=3,
+        armor_class=12,
+        faction=h.Faction.PCS,
+        attacks=test_attack_list,
+    )
+    test_combat.add_combatant(new_combatant=third)
+    assert test_combat.id_of(combatant=third) == 2
+    assert test_combat.combatant_with_id(combatant_id=2) is third
+    test_combat.remove_combatant_by_id(combatant_id=1)
+    assert test_combat.combatant_list == (first, third)
+    assert test_combat.roster[1] is second
+    assert "Removing Combatant 1." in test_combat.narrative_log
+    with pytest.raises(ValueError):
+        test_combat.combatant_with_id(combatant_id=1)
+    with pytest.raises(ValueError):
+        test_combat.remove_combatant(combatant_to_remove=second)
+    stranger = Combatant(max_hit_points=1, armor_class=10, attacks=[])
+    with pytest.raises(ValueError):
+        test_combat.remove_combatant(combatant_to_remove=stranger)
+
+
+def test_combatant_in_two_combats(test_combat, test_attack_list) -> None:
+    """Joining a second Combat leaves a Combatant's place in the first alone."""
+    first, second = test_combat.combatant_list
+    other = Combat(
+        combatant_list=[
+            Combatant(max_hit_points=3, armor_class=12, attacks=test_attack_list)
+            for _ in range(3)
+        ],
+        log_level=h.LogLevel.OFF,
+    )
+    other.add_combatant(new_combatant=first)
+    assert other.id_of(combatant=first) == 3
+    assert test_combat.id_of(combatant=first) == 0
+    first.start_turn()
+    first.dodge()
+    assert test_combat.combatants_dodging() == [first]
+    assert other.combatants_dodging() == [first]
+    test_combat.remove_combatant(combatant_to_remove=first)
+    assert list(test_combat.standing_sides) == [1]
+    assert sum(test_combat.side_counts.values()) == 1
+    assert other.combatant_list[-1] is first
+
+
 def test_fill_initiative_list(mocker, test_combat):
     """All combatants are added to the initiative order."""
     mocker.patch("dot_combat.roll.single_die_roll", return_value=1)
@@ -195,16 +262,18 @@ def test_next_combatant(test_combat, test_attack_list):
     with pytest.raises(ValueError):
         _ = test_combat.next_combatant()
     test_combat.start_combat()
-
-    test_combat.current_initiative = 10
-    assert test_combat.next_combatant() == test_combat.combatant_list[0]
-    test_combat.current_initiative = 13
-    with pytest.raises(ValueError):
-        _ = test_combat.next_combatant()
-    test_combat.current_combatant = test_combat.combatant_list[1]
+    assert test_combat.current_combatant == test_combat.combatant_list[0]
+    assert test_combat.current_initiative == 17
+    assert test_combat.next_combatant() == test_combat.combatant_list[1]
+    test_combat.advance_combatant()
     assert test_combat.next_combatant() == test_combatant_3
-    test_combat.current_combatant = test_combatant_3
+    test_combat.advance_combatant()
     assert test_combat.next_combatant() == test_combatant_4
+    test_combat.advance_combatant()
+    assert test_combat.current_initiative == 10
+    assert test_combat.next_combatant() == test_combat.combatant_list[0]
+    test_combat.advance_combatant()
+    assert test_combat.current_initiative == 17
 
     test_combat.initiative_order = {
         10: [
@@ -215,13 +284,14 @@ def test_next_combatant(test_combat, test_attack_list):
         ],
     }
     test_combat.populate_used_initiatives()
-    test_combat.current_initiative = 10
-    test_combat.current_combatant = test_combat.combatant_list[0]
+    test_combat.start_combat()
     assert test_combat.next_combatant() == test_combat.combatant_list[1]
-    test_combat.current_combatant = test_combat.combatant_list[1]
+    test_combat.advance_combatant()
     assert test_combat.next_combatant() == test_combatant_3
-    test_combat.current_combatant = test_combatant_3
+    test_combat.advance_combatant()
     assert test_combat.next_combatant() == test_combatant_4
+    test_combat.advance_combatant()
+    assert test_combat.next_combatant() == test_combat.combatant_list[0]
 
 
 def test_advance_combatant(mocker, test_combat):
@@ -311,9 +381,11 @@ def test_remove_combatant(test_combat, test_attack_list):
         17: [test_combat3.combatant_list[0]],
         13: [test_combat3.combatant_list[1], test_combatant_3],
     }
+    test_combat3.populate_used_initiatives()
     assert len(test_combat3.initiative_order) == 2
     test_combat3.remove_combatant(combatant_to_remove=test_combat3.combatant_list[0])
     assert len(test_combat3.initiative_order) == 1
+    assert test_combat3.used_initiatives == [13]
     # cover _not_ deleting the initiative key
     test_combatant_3 = Combatant(
         max_hit_points=3,
@@ -329,6 +401,7 @@ def test_remove_combatant(test_combat, test_attack_list):
         17: [test_combat4.combatant_list[0]],
         13: [test_combat4.combatant_list[1], test_combatant_3],
     }
+    test_combat4.populate_used_initiatives()
     assert len(test_combat4.initiative_order) == 2
     test_combat4.remove_combatant(combatant_to_remove=test_combat4.combatant_list[1])
     assert len(test_combat4.initiative_order) == 2
@@ -347,7 +420,7 @@ def test_remove_combatant(test_combat, test_attack_list):
     test_combat5.remove_combatant(combatant_to_remove=test_combatant_3)
     with pytest.raises(ValueError):
         test_combat5.remove_combatant(combatant_to_remove=test_combatant_3)
-    test_combat5.combatant_list.append(test_combatant_3)
+    test_combat5.register_combatant(combatant=test_combatant_3)
     test_combat5.initiative_order = {
         17: [test_combat5.combatant_list[0]],
         13: [test_combat5.combatant_list[1]],
@@ -374,6 +447,61 @@ def test_combat_over(test_combat):
     assert "Combat can end." in test_combat.technical_log
 
 
+def test_factions_and_alliances(mocker, test_attack_list):
+    """Any number of factions can fight, and allied factions share a side."""
+
+    def make_combatant(faction, hit_points=5):
+        return Combatant(
+            max_hit_points=hit_points,
+            armor_class=10,
+            faction=faction,
+            attacks=test_attack_list,
+        )
+
+    knight, squire, orc, goblin = (
+        make_combatant(faction="order"),
+        make_combatant(faction="order"),
+        make_combatant(faction="orcs", hit_points=1),
+        make_combatant(faction="goblins", hit_points=50),
+    )
+    combat = Combat(
+        combatant_list=[knight, squire, orc, goblin],
+        log_level=h.LogLevel.OFF,
+        alliances=[("orcs", "goblins")],
+    )
+    assert combat.side(faction="order") == "order"
+    assert combat.side(faction="orcs") == combat.side(faction="goblins")
+    assert len(combat.side_counts) == 2
+    combat.fill_initiative_list()
+    combat.start_combat()
+    mocker.patch("dot_combat.roll.single_die_roll", return_value=20)
+    combat.manage_attack(
+        attacking_combatant=knight, attack_used=knight.attacks[0], target_combatant=orc
+    )
+    assert combat.side_counts[combat.side(faction="orcs")] == 1
+    combat.manage_attack(
+        attacking_combatant=knight,
+        attack_used=knight.attacks[0],
+        target_combatant=goblin,
+    )
+    assert combat.side_counts[combat.side(faction="goblins")] == 1
+    assert combat.combat_over() is False
+    combat.flee_combatant(combatant_to_flee=goblin)
+    assert goblin.fighting_status == h.FightingStatus.FLED
+    assert combat.has_finished is True
+    assert combat.side_counts == {"order": 2}
+    squire.take_damage(hp_damage=5, damage_type=h.DamageType.SLASHING)
+    assert combat.side_counts == {"order": 1}
+    squire.take_damage(hp_damage=5, damage_type=h.DamageType.SLASHING)
+    squire.heal(hp_heal=0)
+    assert combat.side_counts == {"order": 1}
+    squire.heal(hp_heal=3)
+    assert combat.side_counts == {"order": 2}
+    assert list(combat.standing_sides) == [0, 1]
+    with pytest.raises(ValueError):
+        Combat(combatant_list=[]).update_standing(combatant=make_combatant("order"))
+
+
 def test_damage_combatant(test_combat):
     """Do combatants lose HP correctly and get removed from the combat at 0HP?"""
     test_combat.combatant_list[0].faction = h.Faction.PCS
@@ -487,3 +615,313 @@ def test_combatants_readied(test_combat):
     assert test_combat.combatants_readied() == [test_combat.combatant_list[0]]
     test_combat.combatant_list[0].start_turn()
     assert test_combat.combatants_readied() == []
+
+
+def test_status_indexes(test_combat):
+    """Status indexes follow readied actions, removals and replaced lists."""
+    first, second = test_combat.combatant_list
+    for combatant in (second, first):
+        combatant.start_turn()
+        combatant.make_ready()
+    assert test_combat.readied == {0: first, 1: second}
+    assert test_combat.combatants_readied() == [first, second]
+    assert copy.deepcopy(first).status_listeners == []
+    copied = copy.deepcopy(test_combat)
+    assert copied.combatant_list[0].status_listeners == [copied.update_status]
+    first.take_readied_action()
+    assert test_combat.combatants_readied() == [second]
+    test_combat.remove_combatant(combatant_to_remove=second)
+    assert test_combat.combatants_readied() == []
+    assert second.status_listeners == []
+    first.start_turn()
+    first.dodge()
+    test_combat.combatant_list = [second]
+    assert test_combat.combatants_dodging() == []
+    assert first.status_listeners == []
+    with pytest.raises(ValueError):
+        Combat(combatant_list=[]).update_status(
+            combatant=Combatant(max_hit_points=1, armor_class=10, attacks=[])
+        )
+
+
+def test_random_source(test_combat, test_attack_list):
+    """A Combat with a seeded source is reproducible from that seed."""
+    first = copy.deepcopy(test_combat)
+    second = copy.deepcopy(test_combat)
+    first.set_random_source(random_source=RandomSource(seed=5))
+    second.set_random_source(random_source=RandomSource(seed=5))
+    new_combatant = Combatant(
+        max_hit_points=3, armor_class=12, attacks=test_attack_list
+    )
+    first.add_combatant(new_combatant=new_combatant)
+    assert new_combatant.random_source is first.random_source
+    second.add_combatant(new_combatant=copy.deepcopy(new_combatant))
+    first.fill_initiative_list()
+    second.fill_initiative_list()
+    assert first.used_initiatives == second.used_initiatives
+    seeded = Combat(combatant_list=[], random_source=RandomSource(seed=5))
+    assert seeded.random_source is not None
+
+
+def test_log_level(mocker, test_combat):
+    """Only events at or below the chosen log level are recorded."""
+    mocker.patch("dot_combat.roll.single_die_roll", return_value=15)
+    quiet = copy.deepcopy(test_combat)
+    narrative_only = copy.deepcopy(test_combat)
+    quiet.set_log_level(log_level=h.LogLevel.OFF)
+    narrative_only.set_log_level(log_level=h.LogLevel.NARRATIVE)
+    for this_combat in [quiet, narrative_only]:
+        this_combat.fill_initiative_list()
+        this_combat.start_combat()
+        this_combat.manage_attack(
+            attacking_combatant=this_combat.combatant_list[0],
+            attack_used=this_combat.combatant_list[0].attacks[0],
+            target_combatant=this_combat.combatant_list[1],
+        )
+        this_combat.advance_combatant()
+        this_combat.narrative_log_comment(comment="XYZA")
+        this_combat.technical_log_comment(comment="XYZA")
+    assert quiet.event_log == []
+    assert "rolls a 15, hitting" in narrative_only.narrative_log
+    assert "XYZA" in narrative_only.narrative_log
+    assert narrative_only.technical_log == ""
+    assert Combat(combatant_list=[], log_level=h.LogLevel.OFF).logs_narrative is False
+
+
+def test_log_level_off(mocker, test_combat, test_attack_list):
+    """Nothing at all is recorded when logging is off."""
+    mocker.patch("dot_combat.roll.single_die_roll", return_value=10)
+    test_combat.set_log_level(log_level=h.LogLevel.OFF)
+    test_combat.combatant_list[0].faction = h.Faction.PCS
+    assert test_combat.can_start_combat() is False
+    assert test_combat.combat_over() is False
+    test_combat.add_combatants(
+        new_combatants=[
+            Combatant(max_hit_points=5, armor_class=10, attacks=test_attack_list)
+        ]
+    )
+    test_combat.fill_initiative_list()
+    assert test_combat.can_start_combat() is True
+    test_combat.start_combat()
+    assert test_combat.can_start_combat() is False
+    test_combat.advance_initiative()
+    test_combat.advance_round()
+    test_combat.damage_combatant(
+        combatant_to_damage=test_combat.combatant_list[2],
+        gross_damage=1,
+        damage_type=h.DamageType.FIRE,
+    )
+    test_combat.damage_combatant(
+        combatant_to_damage=test_combat.combatant_list[1],
+        gross_damage=5,
+        damage_type=h.DamageType.FIRE,
+    )
+    test_combat.remove_combatant(combatant_to_remove=test_combat.combatant_list[1])
+    assert test_combat.has_finished is True
+    with pytest.raises(ValueError):
+        test_combat.next_combatant()
+    empty_combat = Combat(combatant_list=[], log_level=h.LogLevel.OFF)
+    assert empty_combat.can_start_combat() is False
+    assert test_combat.event_log == []
+
+
+def test_log_sink(test_combat):
+    """Events are sent to the log sink in batches, including at the end."""
+    memory_sink = MemorySink()
+    test_combat.log_sink = memory_sink
+    test_combat.narrative_log_comment(comment="XYZA")
+    assert memory_sink.entries == []
+    test_combat.flush_log()
+    assert len(memory_sink.entries) == 1
+    test_combat.flush_log()
+    assert len(memory_sink.entries) == 1
+    test_combat.end_combat()
+    assert memory_sink.entries == test_combat.event_log
+    assert isinstance(Combat(combatant_list=[]).log_sink, PrintSink)
+
+
+def test_run_to_completion(test_attack_list):
+    """A seeded fight runs to the same result every time."""
+
+    def make_fight(log_level=h.LogLevel.OFF):
+        combatants = [
+            Combatant(
+                max_hit_points=hit_points,
+                armor_class=12,
+                faction=faction,
+                attacks=test_attack_list,
+            )
+            for faction, hit_points in (
+                (h.Faction.PCS, 12),
+                (h.Faction.PCS, 8),
+                (h.Faction.ENEMIES, 7),
+                (h.Faction.ENEMIES, 7),
+                (h.Faction.ENEMIES, 7),
+            )
+        ]
+        return Combat(
+            combatant_list=combatants,
+            random_source=RandomSource(seed=11),
+            log_level=log_level,
+            log_sink=MemorySink(),
+        )
+
+    result = make_fight().run_to_completion()
+    assert result == make_fight(log_level=h.LogLevel.TECHNICAL).run_to_completion()
+    assert result.winner in (h.Faction.PCS, h.Faction.ENEMIES)
+    assert result.rounds >= 1
+    assert len(result.survivors) == len(result.hit_points) >= 1
+    assert all(hit_points > 0 for hit_points in result.hit_points)
+    weakest = make_fight().run_to_completion(
+        target_policy=policy.weakest_standing_enemy
+    )
+    assert weakest.winner is not None
+
+
+def test_dropped_but_not_removed(mocker, test_attack_list):
+    """A Combatant at 0 HP that stays in the combat stops fighting."""
+    mocker.patch("dot_combat.roll.single_die_roll", return_value=20)
+    hero = Combatant(
+        max_hit_points=100,
+        armor_class=10,
+        faction=h.Faction.PCS,
+        attacks=test_attack_list,
+    )
+    undead = Combatant(
+        max_hit_points=5,
+        armor_class=10,
+        attacks=test_attack_list,
+        removal_condition=h.RemovalConditions.DEAD,
+    )
+    fight = Combat(combatant_list=[hero, undead], log_level=h.LogLevel.OFF)
+    result = fight.run_to_completion()
+    assert result == CombatResult(
+        winner=h.Faction.PCS,
+        rounds=1,
+        survivors=(0,),
+        hit_points=(hero.current_hit_points,),
+    )
+    assert undead.current_hit_points == 0
+    assert fight.combatant_list == (hero, undead)
+    hit_points = hero.current_hit_points
+    fight.take_turn(attacker=undead)
+    assert hero.current_hit_points == hit_points
+
+
+def test_run_to_completion_limits(test_combat, test_attack_list):
+    """Round caps, one-sided fights, and combats that cannot start."""
+    test_combat.combatant_list[0].faction = h.Faction.PCS
+    stalemate = test_combat.run_to_completion(
+        attack_policy=lambda attacker, target: None, max_rounds=3
+    )
+    assert stalemate == CombatResult(
+        winner=None, rounds=3, survivors=(0, 1), hit_points=(1, 2)
+    )
+    assert "Starting round 3." in test_combat.technical_log
+    assert "Starting round 4." not in test_combat.technical_log
+    one_sided = Combat(
+        combatant_list=[
+            Combatant(max_hit_points=3, armor_class=10, attacks=test_attack_list)
+        ],
+        log_level=h.LogLevel.OFF,
+    )
+    assert one_sided.run_to_completion().winner == h.Faction.ENEMIES
+    one_sided.take_turn(attacker=one_sided.combatant_list[0])
+    assert one_sided.combatant_list[0].current_hit_points == 3
+    resumed = Combat(
+        combatant_list=[
+            Combatant(
+                max_hit_points=3,
+                armor_class=10,
+                faction=faction,
+                attacks=test_attack_list,
+            )
+            for faction in (h.Faction.PCS, h.Faction.ENEMIES)
+        ],
+        log_level=h.LogLevel.OFF,
+    )
+    resumed.fill_initiative_list()
+    capped = resumed.run_to_completion(max_rounds=1)
+    assert capped.rounds == 1
+    assert resumed.run_to_completion() == capped
+    with pytest.raises(ValueError):
+        Combat(combatant_list=[]).run_to_completion()
+
+
+def test_advance_combatant_starts_rounds(mocker, test_combat):
+    """Wrapping round the turn order starts a new round."""
+    mocker.patch("dot_combat.roll.single_die_roll", return_value=10)
+    test_combat.fill_initiative_list()
+    test_combat.start_combat()
+    test_combat.advance_combatant()
+    assert test_combat.current_round == 1
+    test_combat.advance_combatant()
+    assert test_combat.current_round == 2
+
+
+@pytest.mark.parametrize(
+    "random_source", [None, RandomSource(seed=2), BufferedRandomSource(seed=2)]
+)
+def test_snapshot_and_restore(random_source, test_attack_list):
+    """Restoring a snapshot replays the same fight from the same point."""
+    combat = Combat(
+        combatant_list=[
+            Combatant(
+                max_hit_points=9,
+                armor_class=11,
+                faction=faction,
+                attacks=test_attack_list,
+            )
+            for faction in (h.Faction.PCS, h.Faction.PCS, h.Faction.ENEMIES)
+        ],
+        random_source=random_source,
+        log_sink=MemorySink(),
+    )
+    before_start = combat.snapshot()
+    combat.fill_initiative_list()
+    combat.start_combat()
+    combat.current_combatant.start_turn()
+    combat.current_combatant.dodge()
+    branch = combat.snapshot()
+    first = combat.run_to_completion()
+    first_log = combat.technical_log
+    combat.restore(snapshot=branch)
+    assert combat.has_finished is False
+    assert combat.combatants_dodging() == [combat.current_combatant]
+    assert len(combat.combatant_list) == 3
+    assert combat.run_to_completion() == first
+    assert combat.technical_log == first_log
+    combat.restore(snapshot=before_start)
+    assert combat.has_started is False
+    assert combat.initiative_order == {}
+    assert combat.combatants_dodging() == []
+    assert all(x.current_hit_points == 9 for x in combat.combatant_list)
+
+
+def test_restore_registry(test_combat, test_attack_list):
+    """Combatants that joined after a snapshot are forgotten on restore."""
+    test_combat.fill_initiative_list()
+    snapshot = test_combat.snapshot()
+    first, second = test_combat.combatant_list
+    newcomer = Combatant(max_hit_points=4, armor_class=10, attacks=test_attack_list)
+    test_combat.add_combatant(new_combatant=newcomer)
+    test_combat.remove_combatant(combatant_to_remove=second)
+    test_combat.restore(snapshot=snapshot)
+    assert test_combat.combatant_list == (first, second)
+    assert test_combat.roster == {0: first, 1: second}
+    assert test_combat.next_combatant_id == 2
+    assert newcomer.status_listeners == []
+    assert second.status_listeners == [test_combat.update_status]
+    assert len(test_combat.turn_order) == 2
+    assert sum(len(bucket) for bucket in test_combat.initiative_order.values()) == 2
+    assert test_combat.snapshot().combatant_states == snapshot.combatant_states
+    test_combat.add_combatant(new_combatant=newcomer)
+    test_combat.remove_combatant(combatant_to_remove=newcomer)
+    test_combat.remove_combatant(combatant_to_remove=second)
+    without_second = test_combat.snapshot()
+    test_combat.restore(snapshot=snapshot)
+    test_combat.restore(snapshot=without_second)
+    assert test_combat.combatant_list == (first,)
+    assert test_combat.roster == {0: first, 1: second, 2: newcomer}
+    assert test_combat.next_combatant_id == 3
+    assert second.status_listeners == []
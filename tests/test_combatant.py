@@ -8,6 +8,7 @@ from dot_combat.combatant import Combatant
 from dot_combat.helpers import DamageType
 from dot_combat.helpers import FightingStatus
 from dot_combat.helpers import RemovalConditions
+from dot_combat.rng import RandomSource
 
 
 @pytest.fixture
@@ -269,3 +270,27 @@ def test_take_readied_action(test_attack_list):
     assert this_combatant.is_readied is True
     this_combatant.take_readied_action()
     assert this_combatant.is_readied is False
+
+
+def test_random_source(test_attack_list):
+    """Combatants with identically seeded sources roll identically."""
+    first = Combatant(
+        max_hit_points=10,
+        armor_class=15,
+        attacks=test_attack_list,
+        random_source=RandomSource(seed=3),
+    )
+    second = Combatant(
+        max_hit_points=10,
+        armor_class=15,
+        attacks=test_attack_list,
+        random_source=RandomSource(seed=3),
+    )
+    for _ in range(10):
+        assert first.roll_initiative() == second.roll_initiative()
+        assert first.roll_attack(
+            attack=first.attacks[0], with_advantage=True
+        ) == second.roll_attack(attack=second.attacks[0], with_advantage=True)
+        assert first.roll_damage(
+            attack=first.attacks[0], critical_hit=True
+        ) == second.roll_damage(attack=second.attacks[0], critical_hit=True)
@@ -0,0 +1,46 @@
+"""Test cases for the events module."""
+from dot_combat import events as ev
+from dot_combat.helpers import DamageType
+
+
+def test_every_event_has_a_format() -> None:
+    """Each Event has a channel and a template."""
+    assert set(ev.EVENT_FORMATS) == set(ev.Event)
+
+
+def test_render() -> None:
+    """Entries render to the same lines the logs have always used."""
+    entry = ev.LogEntry(2, 14, ev.Event.DAMAGE_DEALT, "Orc", None, (7, DamageType.FIRE))
+    assert ev.channel(entry=entry) == ev.Channel.NARRATIVE
+    assert ev.describe(entry=entry) == "Orc causes 7 HP of DamageType.FIRE damage."
+    assert ev.render(entry=entry) == (
+        "R: 2  I:14 Orc causes 7 HP of DamageType.FIRE damage.\n"
+    )
+    attack = ev.LogEntry(1, 9, ev.Event.ATTACKS, "Orc", "Elf", ("Axe",))
+    assert ev.describe(entry=attack) == "Orc attacks Elf with Axe"
+
+
+def test_render_channel() -> None:
+    """Only entries on the requested channel are rendered, in order."""
+    entries = [
+        ev.LogEntry(0, 0, ev.Event.FILLED_INITIATIVE),
+        ev.LogEntry(1, 20, ev.Event.NARRATIVE_COMMENT, values=("first",)),
+        ev.LogEntry(1, 20, ev.Event.STARTING_ROUND, values=(2,)),
+        ev.LogEntry(2, 20, ev.Event.NARRATIVE_COMMENT, values=("second",)),
+    ]
+    assert ev.render_channel(entries=entries, log_channel=ev.Channel.NARRATIVE) == (
+        "R: 1  I:20 first\nR: 2  I:20 second\n"
+    )
+    assert ev.render_channel(entries=entries, log_channel=ev.Channel.TECHNICAL) == (
+        "R: 0  I:0 Filled initiative order.\nR: 1  I:20 Starting round 2.\n"
+    )
+
+
+def test_as_dict() -> None:
+    """Entries become dicts of JSON-friendly values."""
+    entry = ev.LogEntry(3, 7, ev.Event.ATTACKS, 1, 2, (DamageType.ACID, 1.5, object))
+    entry_dict = ev.as_dict(entry=entry)
+    assert entry_dict["event"] == "ATTACKS"
+    assert entry_dict["actor"] == 1
+    assert entry_dict["values"] == ["ACID", 1.5, str(object)]
+    assert entry_dict["text"] == "1 attacks 2 with DamageType.ACID"
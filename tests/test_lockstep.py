@@ -0,0 +1,107 @@
+"""Test cases for the lockstep module."""
+import numpy as np
+import pytest
+
+from dot_combat import helpers as h
+from dot_combat import lockstep as ls
+from dot_combat import simulate as s
+from dot_combat.attack import Attack
+from dot_combat.combat import Combat
+from dot_combat.combatant import Combatant
+
+
+def make_attack(damage_dice: str, attack_bonus: int = 3) -> Attack:
+    """A melee Attack."""
+    return Attack(
+        name="Weapon",
+        attack_bonus=attack_bonus,
+        damage_dice=damage_dice,
+        damage_type=h.DamageType.SLASHING,
+        damage_bonus=1,
+        range=5,
+        long_range=None,
+    )
+
+
+@pytest.fixture
+def encounter():
+    """A knight and an archer against two wolves."""
+    return Combat(
+        combatant_list=[
+            Combatant(
+                max_hit_points=14,
+                armor_class=16,
+                faction=h.Faction.PCS,
+                attacks=[make_attack(damage_dice="1d8")],
+            ),
+            Combatant(
+                max_hit_points=8,
+                armor_class=12,
+                faction=h.Faction.PCS,
+                attacks=[make_attack(damage_dice="1d6")],
+            ),
+            Combatant(
+                max_hit_points=11,
+                armor_class=13,
+                attacks=[make_attack(damage_dice="2d4", attack_bonus=4)],
+            ),
+            Combatant(
+                max_hit_points=11,
+                armor_class=13,
+                attacks=[make_attack(damage_dice="2d4", attack_bonus=4)],
+            ),
+        ],
+        log_level=h.LogLevel.OFF,
+    )
+
+
+def test_layout(encounter) -> None:
+    """Combatants are laid out in join order, sharing dice expressions."""
+    encounter.combatant_list[1].current_hit_points = 0
+    encounter.recount_sides()
+    layout = ls.LockstepEncounter.from_combat(encounter=encounter)
+    assert layout.combatant_ids.tolist() == [0, 1, 2, 3]
+    assert layout.hit_points.tolist() == [14, 0, 11, 11]
+    assert layout.damage_index.tolist() == [0, 1, 2, 2]
+    assert layout.side_index.tolist() == [0, 0, 1, 1]
+    assert layout.sides == (h.Faction.PCS, h.Faction.ENEMIES)
+    alive = np.array([[True, False, True, False], [True, True, False, False]])
+    assert layout.sides_left(alive=alive).tolist() == [2, 1]
+
+
+def test_matches_simulate(encounter) -> None:
+    """Lockstep fights agree with one-at-a-time fights in distribution."""
+    lockstep = ls.simulate_lockstep(encounter=encounter, k=20000, seed=4)
+    single = s.simulate(encounter=encounter, n=2000, workers=1, seed=4)
+    assert lockstep == ls.simulate_lockstep(encounter=encounter, k=20000, seed=4)
+    assert lockstep.fights == 20000
+    assert sum(lockstep.wins.values()) == 20000
+    assert lockstep.win_rate(side=h.Faction.PCS) == pytest.approx(
+        single.win_rate(side=h.Faction.PCS), abs=0.05
+    )
+    assert lockstep.mean_rounds() == pytest.approx(single.mean_rounds(), rel=0.1)
+    assert lockstep.survival_rate(combatant_id=0) == pytest.approx(
+        single.survival_rate(combatant_id=0), abs=0.05
+    )
+
+
+def test_lockstep_limits() -> None:
+    """Round caps, fights over before they start, and Combatants unarmed."""
+    pacifists = Combat(
+        combatant_list=[
+            Combatant(max_hit_points=5, armor_class=10, attacks=[], faction=faction)
+            for faction in (h.Faction.PCS, h.Faction.ENEMIES)
+        ],
+        log_level=h.LogLevel.OFF,
+    )
+    capped = ls.simulate_lockstep(encounter=pacifists, k=10, max_rounds=3)
+    assert capped.wins == {None: 10}
+    assert capped.rounds == {3: 10}
+    assert capped.hit_points == {0: {5: 10}, 1: {5: 10}}
+    lonely = Combat(
+        combatant_list=[Combatant(max_hit_points=5, armor_class=10, attacks=[])],
+        log_level=h.LogLevel.OFF,
+    )
+    assert ls.simulate_lockstep(encounter=lonely, k=4).rounds == {1: 4}
+    with pytest.raises(ValueError):
+        ls.simulate_lockstep(encounter=lonely, k=0)
@@ -0,0 +1,50 @@
+"""Test cases for the policy module."""
+from dot_combat import helpers as h
+from dot_combat import policy
+from dot_combat.attack import Attack
+from dot_combat.combat import Combat
+from dot_combat.combatant import Combatant
+
+
+CLUB = Attack(
+    name="Club",
+    attack_bonus=2,
+    damage_dice="d4",
+    damage_type=h.DamageType.BLUDGEONING,
+    damage_bonus=0,
+    range=5,
+    long_range=None,
+)
+
+
+def make_combatant(faction, hit_points, attacks=(CLUB,)):
+    """A Combatant of a faction with some hit points."""
+    return Combatant(
+        max_hit_points=hit_points,
+        armor_class=10,
+        faction=faction,
+        attacks=list(attacks),
+    )
+
+
+def test_target_policies() -> None:
+    """Target policies pick a standing enemy, or None if there is none."""
+    hero = make_combatant(faction=h.Faction.PCS, hit_points=10)
+    big = make_combatant(faction=h.Faction.ENEMIES, hit_points=9)
+    small = make_combatant(faction=h.Faction.ENEMIES, hit_points=3)
+    middle = make_combatant(faction=h.Faction.ENEMIES, hit_points=5)
+    fight = Combat(combatant_list=[hero, big, small, middle], log_level=h.LogLevel.OFF)
+    assert policy.first_standing_enemy(fight, hero) is big
+    assert policy.weakest_standing_enemy(fight, hero) is small
+    assert policy.first_standing_enemy(fight, small) is hero
+    alone = Combat(combatant_list=[hero], log_level=h.LogLevel.OFF)
+    assert policy.first_standing_enemy(alone, hero) is None
+    assert policy.weakest_standing_enemy(alone, hero) is None
+
+
+def test_first_attack() -> None:
+    """The first Attack is chosen, or None for a Combatant without any."""
+    armed = make_combatant(faction=h.Faction.PCS, hit_points=1)
+    unarmed = make_combatant(faction=h.Faction.PCS, hit_points=1, attacks=())
+    assert policy.first_attack(armed, unarmed) is CLUB
+    assert policy.first_attack(unarmed, armed) is None
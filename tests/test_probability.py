@@ -0,0 +1,194 @@
+"""Test cases for the probability module."""
+import itertools
+from fractions import Fraction
+
+import pytest
+
+from dot_combat import helpers as h
+from dot_combat import probability as p
+from dot_combat import solver as so
+from dot_combat.attack import Attack
+from dot_combat.combat import Combat
+from dot_combat.combatant import Combatant
+from dot_combat.sinks import NullSink
+
+
+def brute_force(attack_bonus, armor_class, advantage, crit_range):
+    """Odds found by listing every pair of d20 rolls."""
+    counts = {"miss": 0, "hit": 0, "critical": 0}
+    for first, second in itertools.product(range(1, 21), repeat=2):
+        raw = {
+            h.Advantage.NONE: first,
+            h.Advantage.ADVANTAGE: max(first, second),
+            h.Advantage.DISADVANTAGE: min(first, second),
+        }[advantage]
+        if raw == 1:
+            counts["miss"] += 1
+        elif raw >= crit_range:
+            counts["critical"] += 1
+        elif raw + attack_bonus >= armor_class:
+            counts["hit"] += 1
+        else:
+            counts["miss"] += 1
+    return p.HitChances(**{key: value / 400 for key, value in counts.items()})
+
+
+@pytest.mark.parametrize("advantage", list(h.Advantage))
+@pytest.mark.parametrize("crit_range", [20, 19, 18])
+def test_hit_chances_match_brute_force(advantage, crit_range) -> None:
+    """Odds agree with enumerating every roll, across bonuses and ACs."""
+    for attack_bonus in (-2, 0, 5, 12, 30):
+        for armor_class in (5, 10, 15, 20, 25):
+            chances = p.hit_chances(
+                attack_bonus=attack_bonus,
+                armor_class=armor_class,
+                advantage=advantage,
+                crit_range=crit_range,
+            )
+            assert chances == pytest.approx(
+                brute_force(attack_bonus, armor_class, advantage, crit_range)
+            )
+            assert sum(chances) == pytest.approx(1)
+
+
+def test_hit_chances() -> None:
+    """Natural 1s always miss, natural 20s always crit, and results are cached."""
+    chances = p.hit_chances(attack_bonus=5, armor_class=15)
+    assert chances == pytest.approx(p.HitChances(miss=0.45, hit=0.5, critical=0.05))
+    assert chances.any_hit == pytest.approx(0.55)
+    assert p.hit_chances(attack_bonus=50, armor_class=10).miss == pytest.approx(0.05)
+    assert p.hit_chances(attack_bonus=-50, armor_class=30).any_hit == pytest.approx(
+        0.05
+    )
+    assert p.hit_chances(
+        attack_bonus=0, armor_class=30, advantage=h.Advantage.ADVANTAGE
+    ).critical == pytest.approx(float(1 - Fraction(19, 20) ** 2))
+    assert p.hit_chances(attack_bonus=5, armor_class=15) is chances
+    with pytest.raises(ValueError):
+        p.hit_chances(attack_bonus=5, armor_class=15, crit_range=1)
+
+
+@pytest.fixture
+def dagger():
+    """A +4 dagger dealing 1d4+2."""
+    return Attack(
+        name="Dagger",
+        attack_bonus=4,
+        damage_dice="1d4",
+        damage_bonus=2,
+        damage_type=h.DamageType.PIERCING,
+        range=20,
+        long_range=60,
+    )
+
+
+@pytest.fixture
+def target(dagger):
+    """A Combatant with AC 14."""
+    return Combatant(max_hit_points=10, armor_class=14, attacks=[dagger])
+
+
+def test_attack_chances(dagger, target) -> None:
+    """An Attack against a Combatant uses its bonus and their AC."""
+    assert p.attack_chances(
+        attack=dagger, target=target, advantage=h.Advantage.DISADVANTAGE
+    ) == p.hit_chances(
+        attack_bonus=4, armor_class=14, advantage=h.Advantage.DISADVANTAGE
+    )
+
+
+def test_expected_dpr(dagger, target) -> None:
+    """Misses deal nothing, hits the dice plus bonus, crits the dice twice."""
+    damage = p.dpr_distribution(attacker=dagger, target=target)
+    assert damage.probability(value=0) == pytest.approx(0.45)
+    assert damage.probability(value=3) == pytest.approx(0.5 / 4)
+    assert damage.probability(value=4) == pytest.approx(0.5 / 4 + 0.05 / 16)
+    assert damage.maximum == 10
+    assert sum(damage.pmf) == pytest.approx(1)
+    assert p.expected_dpr(attacker=dagger, target=target) == pytest.approx(2.6)
+    assert p.attack_damage(attack=dagger, target=target) is damage
+    assert p.expected_dpr(
+        attacker=dagger, target=target, advantage=h.Advantage.ADVANTAGE
+    ) > p.expected_dpr(attacker=dagger, target=target)
+
+
+def test_combatant_dpr(dagger, target) -> None:
+    """A Combatant deals the damage of its best Attack, or none without one."""
+    greataxe = Attack(
+        name="Greataxe",
+        attack_bonus=5,
+        damage_dice="1d12",
+        damage_bonus=3,
+        damage_type=h.DamageType.SLASHING,
+        range=5,
+        long_range=None,
+    )
+    fighter = Combatant(max_hit_points=20, armor_class=16, attacks=[dagger, greataxe])
+    assert p.best_attack(attacker=fighter, target=target) is greataxe
+    fighter.attacks.reverse()
+    assert p.best_attack(attacker=fighter, target=target) is greataxe
+    assert p.expected_dpr(attacker=fighter, target=target) == p.expected_dpr(
+        attacker=greataxe, target=target
+    )
+    unarmed = Combatant(max_hit_points=5, armor_class=10, attacks=[])
+    assert p.best_attack(attacker=unarmed, target=target) is None
+    assert p.expected_dpr(attacker=unarmed, target=target) == 0
+
+
+def test_time_to_kill(dagger) -> None:
+    """Rounds to drop a target are geometric when any hit will do."""
+    chance = p.hit_chances(attack_bonus=4, armor_class=14).any_hit
+    result = p.time_to_kill(attacks=[dagger], max_hit_points=3, armor_class=14)
+    assert result.survival < 1e-9
+    assert result.rounds.minimum == 1
+    for rounds in range(1, 6):
+        assert result.rounds.probability(value=rounds) == pytest.approx(
+            (1 - chance) ** (rounds - 1) * chance
+        )
+    assert result.rounds.mean == pytest.approx(1 / chance)
+    assert p.time_to_kill(attacks=[dagger], max_hit_points=3, armor_class=14) is result
+    tough = p.time_to_kill(attacks=[dagger], max_hit_points=40, armor_class=14)
+    assert tough.rounds.mean == pytest.approx(40 / 2.6, rel=0.1)
+    assert sum(tough.rounds.pmf) == pytest.approx(1)
+    twice = p.time_to_kill(attacks=[dagger, dagger], max_hit_points=3, armor_class=14)
+    assert twice.rounds.mean < result.rounds.mean
+    quick = p.time_to_kill(
+        attacks=[dagger], max_hit_points=3, armor_class=14, epsilon=0.5
+    )
+    assert 0 < quick.survival < 0.5
+    assert sum(quick.rounds.pmf) == pytest.approx(1)
+    assert quick.rounds.cdf(value=quick.rounds.maximum) == pytest.approx(1)
+    assert quick.rounds.mean < result.rounds.mean
+    with pytest.raises(ValueError):
+        p.kill_time(
+            attacks=(("1d4", 2, 4),), armor_class=14, max_hit_points=40, max_rounds=3
+        )
+
+
+def test_time_to_kill_matches_solver(dagger) -> None:
+    """Against a target that cannot fight back, the solver agrees."""
+    fighter = Combatant(
+        max_hit_points=10, armor_class=10, attacks=[dagger], faction=h.Faction.PCS
+    )
+    dummy = Combatant(max_hit_points=9, armor_class=14, attacks=[])
+    combat = Combat(combatant_list=[fighter, dummy], log_sink=NullSink())
+    combat.fill_initiative_list()
+    result = p.combatant_time_to_kill(attacker=fighter, target=dummy)
+    assert result.rounds.mean == pytest.approx(
+        so.solve(encounter=combat).expected_rounds
+    )
+    with pytest.raises(ValueError):
+        p.combatant_time_to_kill(attacker=dummy, target=fighter)
+    with pytest.raises(ValueError):
+        p.time_to_kill(attacks=[dagger], max_hit_points=0, armor_class=14)
+    healing = Attack(
+        name="Healing Word",
+        attack_bonus=4,
+        damage_dice="1d4",
+        damage_bonus=-5,
+        damage_type=h.DamageType.RADIANT,
+        range=60,
+        long_range=None,
+    )
+    with pytest.raises(ValueError):
+        p.time_to_kill(attacks=[healing], max_hit_points=5, armor_class=14)
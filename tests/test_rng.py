@@ -0,0 +1,128 @@
+"""Test cases for the rng module."""
+from array import array
+
+import pytest
+
+from dot_combat import rng
+
+
+def test_random_source_reproducible() -> None:
+    """Streams built from the same seed produce the same numbers."""
+    first = rng.RandomSource(seed=42)
+    second = rng.RandomSource(seed=42)
+    assert [first.die_roll(sides=20) for _ in range(50)] == [
+        second.die_roll(sides=20) for _ in range(50)
+    ]
+    assert first.dice_rolls(dice_num=5, dice_size=6) == second.dice_rolls(
+        dice_num=5, dice_size=6
+    )
+    assert first.dice_total(dice_num=3, dice_size=8) == second.dice_total(
+        dice_num=3, dice_size=8
+    )
+    assert first.random() == second.random()
+
+
+def test_random_source_ranges() -> None:
+    """Dice results fall within the faces of the die."""
+    source = rng.RandomSource(seed=1)
+    assert {source.die_roll(sides=4) for _ in range(200)} == {1, 2, 3, 4}
+    rolls = source.dice_rolls(dice_num=10, dice_size=6)
+    assert len(rolls) == 10
+    assert all(1 <= roll <= 6 for roll in rolls)
+    assert 1 <= source.dice_total(dice_num=1, dice_size=6) <= 6
+    assert 0.0 <= source.random() < 1.0
+
+
+def test_spawn() -> None:
+    """Spawned streams are reproducible and independent of each other."""
+    children = rng.spawn_sources(seed=7, n=3)
+    again = rng.RandomSource(seed=7).spawn(n=3)
+    sequences = [child.dice_rolls(dice_num=20, dice_size=20) for child in children]
+    assert sequences == [child.dice_rolls(dice_num=20, dice_size=20) for child in again]
+    assert len({tuple(sequence) for sequence in sequences}) == 3
+    assert all(type(child) is rng.RandomSource for child in children)
+
+
+def test_buffered_random_source() -> None:
+    """Buffered streams are reproducible and refill when blocks run out."""
+    first = rng.BufferedRandomSource(seed=11, block_size=16)
+    second = rng.BufferedRandomSource(seed=11, block_size=16)
+    first_rolls = [first.die_roll(sides=20) for _ in range(100)]
+    assert first_rolls == [second.die_roll(sides=20) for _ in range(100)]
+    assert set(first_rolls) <= set(range(1, 21))
+    assert len(first.blocks[20]) == 12
+    assert 1 <= first.die_roll(sides=300) <= 300
+    assert 1 <= first.die_roll(sides=70000) <= 70000
+    rolls = first.dice_rolls(dice_num=10, dice_size=6)
+    assert len(rolls) == 10
+    assert all(1 <= roll <= 6 for roll in rolls)
+    assert len(first.blocks[6]) == 6
+    assert len(first.dice_rolls(dice_num=10, dice_size=6)) == 10
+    assert len(first.dice_rolls(dice_num=40, dice_size=6)) == 40
+    assert 3 <= first.dice_total(dice_num=3, dice_size=6) <= 18
+    first = rng.BufferedRandomSource(seed=11, block_size=16)
+    second = rng.BufferedRandomSource(seed=11, block_size=16)
+    uniforms = [first.random() for _ in range(40)]
+    assert uniforms == [second.random() for _ in range(40)]
+    assert all(0.0 <= uniform < 1.0 for uniform in uniforms)
+
+
+def test_buffered_spawn() -> None:
+    """Children of a buffered stream are buffered in the same way."""
+    children = rng.BufferedRandomSource(seed=2, block_size=32).spawn(n=2)
+    assert all(isinstance(child, rng.BufferedRandomSource) for child in children)
+    assert all(child.block_size == 32 for child in children)
+
+
+def test_snapshot_and_restore() -> None:
+    """Restored streams repeat the rolls they made after the snapshot."""
+    for source in (
+        rng.RandomSource(seed=6),
+        rng.BufferedRandomSource(seed=6, block_size=8),
+        rng.RecordingRandomSource(source=rng.RandomSource(seed=6)),
+    ):
+        source.die_roll(sides=20)
+        source.random()
+        snapshot = source.snapshot()
+        rolls = [source.die_roll(sides=20) for _ in range(20)]
+        dice = source.dice_rolls(dice_num=3, dice_size=6)
+        uniforms = [source.random() for _ in range(10)]
+        source.restore(snapshot=snapshot)
+        assert [source.die_roll(sides=20) for _ in range(20)] == rolls
+        assert source.dice_rolls(dice_num=3, dice_size=6) == dice
+        assert [source.random() for _ in range(10)] == uniforms
+
+
+def test_record_and_replay() -> None:
+    """A replay hands out exactly what was recorded, and then stops."""
+    recorder = rng.RecordingRandomSource(source=rng.BufferedRandomSource(seed=4))
+    rolls = [recorder.die_roll(sides=20) for _ in range(5)]
+    dice = recorder.dice_rolls(dice_num=3, dice_size=6)
+    total = recorder.dice_total(dice_num=2, dice_size=8)
+    uniform = recorder.random()
+    tape = recorder.tape()
+    fresh = rng.BufferedRandomSource(seed=4)
+    expected = [fresh.die_roll(sides=20) for _ in range(5)]
+    expected += fresh.dice_rolls(dice_num=3, dice_size=6)
+    expected += fresh.dice_rolls(dice_num=2, dice_size=8)
+    assert expected[:8] == rolls + dice
+    assert sum(expected[8:]) == total
+    assert tape.dice.tolist() == expected
+    assert tape.uniforms.tolist() == [uniform]
+    assert isinstance(recorder.spawn(n=1)[0].source, rng.BufferedRandomSource)
+    replay = rng.ReplayRandomSource(tape=tape)
+    assert [replay.die_roll(sides=20) for _ in range(5)] == rolls
+    snapshot = replay.snapshot()
+    assert replay.dice_rolls(dice_num=3, dice_size=6) == dice
+    replay.restore(snapshot=snapshot)
+    assert replay.dice_rolls(dice_num=3, dice_size=6) == dice
+    assert replay.dice_total(dice_num=2, dice_size=8) == total
+    assert replay.random() == uniform
+    for draw in (lambda: replay.die_roll(sides=20), replay.random):
+        with pytest.raises(ValueError):
+            draw()
+    replay = rng.ReplayRandomSource(tape=tape)
+    with pytest.raises(ValueError):
+        replay.die_roll(sides=1)
+    recorder.clear()
+    assert recorder.tape() == rng.Tape(dice=array("I"), uniforms=array("d"))
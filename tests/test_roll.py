@@ -1,6 +1,12 @@
 """Test cases for the roll module."""
+import itertools
+from collections import Counter
+
+import numpy as np
 import pytest
 
+from dot_combat import helpers as h
+from dot_combat import rng
 from dot_combat import roll as r
 
 
@@ -56,3 +62,234 @@ def test_roll(mocker) -> None:
     assert r.roll(full_roll_description="d100") == 1
     assert r.roll(full_roll_description="4d100+4") == 8
     assert r.roll(full_roll_description="1d100-3") == -2
+
+
+def test_roll_multiple_terms(mocker) -> None:
+    """Several dice and constant terms can be combined in one expression."""
+    mocker.patch("dot_combat.roll.single_die_roll", return_value=2)
+    assert r.roll(full_roll_description="2d6+1d4-1") == 5
+    assert r.roll(full_roll_description="d8-d4+3") == 3
+    assert r.roll(full_roll_description="-d4") == -2
+    assert r.roll(full_roll_description="1 + 2d6") == 5
+    assert r.roll(full_roll_description="0d6") == 0
+
+
+def test_parse_expression() -> None:
+    """Dice terms are kept in order and constants are folded together."""
+    expression = r.parse_expression(full_roll_description="2d6+1d4-1+3")
+    assert expression.terms == (
+        r.DiceTerm(sign=1, dice_num=2, dice_size=6),
+        r.DiceTerm(sign=1, dice_num=1, dice_size=4),
+    )
+    assert expression.constant == 2
+    assert r.parse_expression(full_roll_description="-d4").terms == (
+        r.DiceTerm(sign=-1, dice_num=1, dice_size=4),
+    )
+    for bad_description in ["", "2d6+", "2d6++1", "d0", "2d6d3", "x", "3+y"]:
+        with pytest.raises(ValueError) as exception_info:
+            r.parse_expression(full_roll_description=bad_description)
+        assert "Could not evaluate dice expression" in str(exception_info)
+
+
+def test_compile_expression() -> None:
+    """Compiled expressions are cached and can be rolled directly."""
+    expression = r.compile_expression(full_roll_description="3d6+2")
+    assert r.compile_expression(full_roll_description="3d6+2") is expression
+    for _ in range(20):
+        assert 5 <= expression.roll() <= 20
+        assert 5 <= r.roll(full_roll_description=expression) <= 20
+
+
+def test_roll_many() -> None:
+    """Batches of results are returned as arrays within the expected range."""
+    generator = np.random.default_rng(seed=1)
+    results = r.roll_many(
+        full_roll_description="2d6+1d4-1", n=1000, generator=generator
+    )
+    assert results.shape == (1000,)
+    assert results.min() >= 2
+    assert results.max() <= 15
+    assert r.roll_many(full_roll_description="7", n=3).tolist() == [7, 7, 7]
+    assert r.roll_many(full_roll_description="-d1", n=2).tolist() == [-1, -1]
+    expression = r.compile_expression(full_roll_description="d20")
+    assert set(r.roll_many(full_roll_description=expression, n=2000).tolist()) == set(
+        range(1, 21)
+    )
+
+
+def test_roll_many_sequence() -> None:
+    """A sequence of descriptions gives one row of results per description."""
+    results = r.roll_many(full_roll_description=["d1", "2d1+3", "4"], n=5)
+    assert results.shape == (3, 5)
+    assert results[:, 0].tolist() == [1, 5, 4]
+    first = r.roll_many(
+        full_roll_description=["d6", "8d6"], n=10, generator=np.random.default_rng(3)
+    )
+    second = r.roll_many(
+        full_roll_description=["d6", "8d6"], n=10, generator=np.random.default_rng(3)
+    )
+    assert (first == second).all()
+
+
+def test_distribution() -> None:
+    """Exact distributions have the right support, moments and CDF."""
+    d6 = r.distribution(full_roll_description="d6")
+    assert d6.minimum == 1
+    assert d6.maximum == 6
+    assert d6.mean == pytest.approx(3.5)
+    assert d6.variance == pytest.approx(35 / 12)
+    assert d6.probability(value=4) == pytest.approx(1 / 6)
+    assert d6.probability(value=7) == 0.0
+    assert d6.cdf(value=0) == 0.0
+    assert d6.cdf(value=2) == pytest.approx(1 / 3)
+    assert d6.cdf(value=9) == 1.0
+    assert d6.at_least(value=6) == pytest.approx(1 / 6)
+    assert d6.shift(constant=2).values.tolist() == [3, 4, 5, 6, 7, 8]
+    two_d6 = r.distribution(full_roll_description="2d6+1")
+    assert two_d6.minimum == 3
+    assert two_d6.maximum == 13
+    assert two_d6.probability(value=8) == pytest.approx(6 / 36)
+    big = r.distribution(full_roll_description="8d6+4")
+    assert big.mean == pytest.approx(32.0)
+    assert big.variance == pytest.approx(8 * 35 / 12)
+    assert big.pmf.sum() == pytest.approx(1.0)
+    mixed = r.distribution(full_roll_description="d4-d4-2")
+    assert mixed.minimum == -5
+    assert mixed.maximum == 1
+    assert mixed.mean == pytest.approx(-2.0)
+    assert r.distribution(full_roll_description="0d6+3").values.tolist() == [3]
+
+
+def test_distribution_cached() -> None:
+    """Distributions are cached per expression and cannot be modified."""
+    first = r.distribution(full_roll_description="3d8")
+    assert r.distribution(full_roll_description="3d8") is first
+    with pytest.raises(ValueError):
+        first.pmf[0] = 1.0
+    expression = r.compile_expression(full_roll_description="3d8")
+    assert r.distribution(full_roll_description=expression).mean == first.mean
+
+
+def test_alias_table() -> None:
+    """Alias tables reproduce the distribution they were built from."""
+    table = r.alias_table(full_roll_description="2d6")
+    assert r.alias_table(full_roll_description="2d6") is table
+    distribution = r.distribution(full_roll_description="2d6")
+    slot_mass = np.full(len(distribution.pmf), 1 / len(distribution.pmf))
+    rebuilt = slot_mass * table.thresholds
+    np.add.at(rebuilt, table.aliases, slot_mass * (1 - table.thresholds))
+    assert rebuilt == pytest.approx(distribution.pmf)
+    samples = table.sample_many(n=20000, generator=np.random.default_rng(seed=5))
+    assert samples.min() >= 2
+    assert samples.max() <= 12
+    assert samples.mean() == pytest.approx(7.0, abs=0.1)
+    for _ in range(50):
+        assert 2 <= table.sample() <= 12
+
+
+def test_roll_alias_method() -> None:
+    """RollMethod.ALIAS gives results with the same support as rolling dice."""
+    for _ in range(50):
+        assert 10 <= r.roll(full_roll_description="10d10", method=h.RollMethod.ALIAS)
+    assert r.roll(full_roll_description="3", method=h.RollMethod.ALIAS) == 3
+    results = r.roll_many(
+        full_roll_description=["20d6", "d4+1"], n=1000, method=h.RollMethod.ALIAS
+    )
+    assert results[0].min() >= 20
+    assert results[0].max() <= 120
+    assert set(results[1].tolist()) == {2, 3, 4, 5}
+
+
+def test_roll_from_source() -> None:
+    """Rolls drawn from seeded sources are reproducible."""
+    first = rng.RandomSource(seed=99)
+    second = rng.RandomSource(seed=99)
+    for description in ["d20", "8d6+4", "2d6-1d4"]:
+        assert r.roll(full_roll_description=description, source=first) == r.roll(
+            full_roll_description=description, source=second
+        )
+    assert r.roll(
+        full_roll_description="10d10", method=h.RollMethod.ALIAS, source=first
+    ) == r.roll(full_roll_description="10d10", method=h.RollMethod.ALIAS, source=second)
+
+
+def test_d20(mocker) -> None:
+    """The d20 shortcut rolls from a source, or from single_die_roll."""
+    source = rng.BufferedRandomSource(seed=4)
+    assert all(1 <= r.d20(source=source) <= 20 for _ in range(100))
+    mocker.patch("dot_combat.roll.single_die_roll", return_value=17)
+    assert r.d20() == 17
+
+
+def test_keep_dice(mocker) -> None:
+    """Only the highest or lowest dice are kept."""
+    mocker.patch("dot_combat.roll.single_die_roll", side_effect=[3, 6, 1, 5])
+    assert r.roll(full_roll_description="4d6kh3") == 14
+    mocker.patch("dot_combat.roll.single_die_roll", side_effect=[3, 6, 1, 5])
+    assert r.roll(full_roll_description="4d6kl2+1") == 5
+    mocker.patch("dot_combat.roll.single_die_roll", side_effect=[4, 17, 4, 17])
+    assert r.roll(full_roll_description="2d20kh1") == 17
+    assert r.roll(full_roll_description="2d20kl1") == 4
+    source = rng.RandomSource(seed=8)
+    for _ in range(20):
+        assert 3 <= r.roll(full_roll_description="4d6kh3", source=source) <= 18
+    term = r.parse_expression(full_roll_description="2d20kl1").terms[0]
+    assert term.keep == 1
+    assert term.keep_highest is False
+
+
+def test_exploding_dice(mocker) -> None:
+    """Dice showing their maximum are rolled again and added."""
+    mocker.patch("dot_combat.roll.single_die_roll", side_effect=[6, 2, 6, 6, 3])
+    assert r.roll(full_roll_description="2d6!") == 23
+    mocker.patch("dot_combat.roll.single_die_roll", return_value=4)
+    assert r.roll(full_roll_description="d4!") == 4 * (r.MAX_EXPLOSIONS + 1)
+    assert r.parse_expression(full_roll_description="d6!").terms[0].explode is True
+
+
+def test_keep_and_explode_invalid() -> None:
+    """Impossible keep counts and exploding one-sided dice are rejected."""
+    for bad_description in ["4d6kh0", "2d6kh3", "d1!", "d6k3", "4d6kx3", "d6!!"]:
+        with pytest.raises(ValueError) as exception_info:
+            r.parse_expression(full_roll_description=bad_description)
+        assert "Could not evaluate dice expression" in str(exception_info)
+
+
+def test_keep_and_explode_distribution() -> None:
+    """Distributions for kept and exploding dice match direct enumeration."""
+    counts = Counter(
+        sum(sorted(dice)[1:]) for dice in itertools.product(range(1, 7), repeat=4)
+    )
+    four_d6_kh3 = r.distribution(full_roll_description="4d6kh3")
+    for total, ways in counts.items():
+        assert four_d6_kh3.probability(value=total) == pytest.approx(ways / 6**4)
+    assert four_d6_kh3.minimum == 3
+    disadvantage = r.distribution(full_roll_description="2d20kl1")
+    assert disadvantage.probability(value=1) == pytest.approx(39 / 400)
+    assert disadvantage.mean == pytest.approx(7.175)
+    exploding = r.distribution(full_roll_description="d6!")
+    assert exploding.pmf.sum() == pytest.approx(1.0)
+    assert exploding.probability(value=6) == 0.0
+    assert exploding.probability(value=8) == pytest.approx(1 / 36)
+    assert exploding.mean == pytest.approx(4.2)
+    assert r.distribution(full_roll_description="-2d6!").mean == pytest.approx(-8.4)
+
+
+def test_keep_and_explode_roll_many() -> None:
+    """Batched kept and exploding dice agree with their exact distributions."""
+    generator = np.random.default_rng(seed=12)
+    for description in ["4d6kh3", "4d6kl3", "2d20kh1", "2d20kl1", "3d6!", "d4!"]:
+        results = r.roll_many(
+            full_roll_description=description, n=40000, generator=generator
+        )
+        exact = r.distribution(full_roll_description=description)
+        assert results.min() >= exact.minimum
+        assert results.mean() == pytest.approx(exact.mean, rel=0.02)
+
+
+def test_exploding_roll_many_limit(mocker) -> None:
+    """Batched exploding dice stop after MAX_EXPLOSIONS explosions."""
+    generator = mocker.Mock()
+    generator.integers.side_effect = lambda low, high, size: np.full(size, high - 1)
+    results = r.roll_many(full_roll_description="2d4!", n=3, generator=generator)
+    assert results.tolist() == [8 * (r.MAX_EXPLOSIONS + 1)] * 3
@@ -0,0 +1,139 @@
+"""Test cases for the serialize module."""
+import json
+
+import pytest
+
+from dot_combat import events as ev
+from dot_combat import helpers as h
+from dot_combat import serialize as s
+from dot_combat.attack import Attack
+from dot_combat.combat import Combat
+from dot_combat.combatant import Combatant
+from dot_combat.rng import RandomSource
+from dot_combat.sinks import MemorySink
+
+
+@pytest.fixture
+def fight():
+    """A started fight between allied factions and goblins, one Combatant fled."""
+    scimitar = Attack(
+        name="Scimitar",
+        attack_bonus=4,
+        damage_dice="1d6",
+        damage_type=h.DamageType.SLASHING,
+        damage_bonus=2,
+        range=5,
+        long_range=None,
+    )
+    combatants = [
+        Combatant(max_hit_points=12, armor_class=16, attacks=[scimitar], faction=side)
+        for side in ("fighters", "wizards")
+    ] + [
+        Combatant(max_hit_points=7, armor_class=15, attacks=[scimitar])
+        for _ in range(3)
+    ]
+    combat = Combat(
+        combatant_list=combatants,
+        random_source=RandomSource(seed=5),
+        log_sink=MemorySink(),
+        alliances=[["fighters", "wizards"]],
+    )
+    combat.fill_initiative_list()
+    combat.start_combat()
+    combat.current_combatant.start_turn()
+    combat.current_combatant.dodge()
+    combat.flee_combatant(combatant_to_flee=combatants[4])
+    return combat
+
+
+@pytest.mark.parametrize("name", ["fight.json", "fight.dotc"])
+def test_save_and_load(fight, tmp_path, name) -> None:
+    """A loaded fight carries on exactly as the saved one does."""
+    s.save(combat=fight, path=tmp_path / name, include_log=True)
+    saved_entries = len(fight.event_log)
+    sink = MemorySink()
+    loaded = s.load(path=tmp_path / name, log_sink=sink)
+    assert loaded.side(faction="wizards") == loaded.side(faction="fighters")
+    assert loaded.combatants_dodging() == [loaded.current_combatant]
+    assert loaded.roster[0].attacks[0] is loaded.roster[2].attacks[0]
+    assert len(loaded.combatant_list) == 4
+    assert loaded.event_log == fight.event_log
+    fight.set_random_source(random_source=RandomSource(seed=8))
+    loaded.set_random_source(random_source=RandomSource(seed=8))
+    assert loaded.run_to_completion() == fight.run_to_completion()
+    assert loaded.technical_log == fight.technical_log
+    loaded.flush_log()
+    assert len(sink.entries) == len(loaded.event_log) - saved_entries
+
+
+def test_formats(fight) -> None:
+    """JSON is readable and versioned; binary is smaller; the log is optional."""
+    data = json.loads(s.dumps_json(combat=fight))
+    assert data["format"] == s.FORMAT_NAME
+    assert data["version"] == s.FORMAT_VERSION
+    assert data["log"] is None
+    assert data["combatants"][2]["faction"] == ["Faction", "ENEMIES"]
+    assert data["alliances"] == [["fighters", "wizards"]]
+    scimitar = fight.roster[0].attacks[0]
+    assert s.encode_value(value=scimitar) == str(scimitar)
+    binary = s.dumps_binary(combat=fight)
+    assert binary.startswith(s.MAGIC)
+    assert len(binary) < len(s.dumps_json(combat=fight))
+    loaded = s.loads_binary(data=binary)
+    assert loaded.event_log == []
+    assert s.to_dict(combat=loaded) == s.to_dict(combat=fight)
+
+
+def test_load_leaves_random_module_alone(fight, mocker) -> None:
+    """Loading rebuilds the Combat without touching the global random state."""
+    setstate = mocker.patch("random.setstate")
+    text = s.dumps_json(combat=fight)
+    assert s.to_dict(combat=s.loads_json(text=text)) == s.to_dict(combat=fight)
+    setstate.assert_not_called()
+
+
+def test_unsupported_versions(fight) -> None:
+    """Data from another format or version is refused."""
+    data = s.to_dict(combat=fight)
+    data["version"] = s.FORMAT_VERSION + 1
+    with pytest.raises(ValueError):
+        s.from_dict(data=data)
+    with pytest.raises(ValueError):
+        s.loads_binary(data=b"PKL!" + s.dumps_binary(combat=fight)[4:])
+
+
+def test_logged_attacks(fight) -> None:
+    """Attacks in the log load back as the Attacks of the loaded Combatants."""
+    fight.run_to_completion()
+    loaded = s.loads_json(text=s.dumps_json(combat=fight, include_log=True))
+    assert loaded.event_log == fight.event_log
+    logged = [
+        value
+        for entry in loaded.event_log
+        for value in entry.values
+        if isinstance(value, Attack)
+    ]
+    assert logged
+    assert all(attack is loaded.roster[0].attacks[0] for attack in logged)
+    lone = Attack(
+        name="Sling",
+        attack_bonus=2,
+        damage_dice="1d4",
+        damage_type=h.DamageType.BLUDGEONING,
+        damage_bonus=0,
+        range=30,
+        long_range=120,
+    )
+    fight.log_event(ev.Event.ATTACKS, 0, 2, lone)
+    data = s.to_dict(combat=fight, include_log=True)
+    assert len(data["attacks"]) == 2
+    assert s.from_dict(data=data).event_log[-1].values == (lone,)
+
+
+def test_truncated_binary(fight) -> None:
+    """Binary data cut short anywhere is refused."""
+    binary = s.dumps_binary(combat=fight)
+    meta_end = s.HEADER.size + s.HEADER.unpack_from(binary)[2]
+    for end in (4, meta_end - 1, meta_end + 2, len(binary) - 1):
+        with pytest.raises(ValueError, match="truncated"):
+            s.loads_binary(data=binary[:end])
@@ -0,0 +1,142 @@
+"""Test cases for the simulate module."""
+import pytest
+
+from dot_combat import helpers as h
+from dot_combat import simulate as s
+from dot_combat.attack import Attack
+from dot_combat.combat import Combat
+from dot_combat.combatant import Combatant
+from dot_combat.rng import RandomSource
+from dot_combat.sinks import RotatingFileSink
+
+
+@pytest.fixture
+def encounter(tmp_path):
+    """Two fighters against three goblins, logging to a file."""
+    scimitar = Attack(
+        name="Scimitar",
+        attack_bonus=4,
+        damage_dice="1d6",
+        damage_type=h.DamageType.SLASHING,
+        damage_bonus=2,
+        range=5,
+        long_range=None,
+    )
+    combatants = [
+        Combatant(max_hit_points=12, armor_class=16, attacks=[scimitar], faction=side)
+        for side in (h.Faction.PCS, h.Faction.PCS)
+    ] + [
+        Combatant(max_hit_points=7, armor_class=15, attacks=[scimitar])
+        for _ in range(3)
+    ]
+    return Combat(
+        combatant_list=combatants,
+        log_sink=RotatingFileSink(path=tmp_path / "combat.log"),
+    )
+
+
+def test_simulate_in_process(encounter) -> None:
+    """Tallies cover every fight and leave the encounter untouched."""
+    result = s.simulate(encounter=encounter, n=250, workers=1, seed=3, chunk_size=100)
+    assert result.fights == 250
+    assert sum(result.wins.values()) == 250
+    assert sum(result.rounds.values()) == 250
+    assert result.win_rate(side=h.Faction.PCS) + result.win_rate(
+        side=h.Faction.ENEMIES
+    ) + result.win_rate(side=None) == pytest.approx(1)
+    assert result.mean_rounds() >= 1
+    assert sorted(result.hit_points) == [0, 1, 2, 3, 4]
+    assert all(sum(tally.values()) == 250 for tally in result.hit_points.values())
+    assert 0 <= result.survival_rate(combatant_id=0) <= 1
+    assert encounter.has_started is False
+    assert encounter.event_log == []
+    assert result == s.simulate(
+        encounter=encounter, n=250, workers=1, seed=3, chunk_size=100
+    )
+    with pytest.raises(ValueError):
+        s.simulate(encounter=encounter, n=0)
+
+
+def test_simulate_workers_agree(encounter) -> None:
+    """The same seed gives the same tallies whatever the number of workers."""
+    in_process = s.simulate(encounter=encounter, n=50, workers=1, seed=8, chunk_size=25)
+    pooled = s.simulate(encounter=encounter, n=50, workers=2, seed=8, chunk_size=25)
+    assert pooled == in_process
+    assert s.simulate(encounter=encounter, n=5).fights == 5
+
+
+def test_record_and_replay(encounter) -> None:
+    """A fight replayed from its tape ends exactly as the recording did."""
+    outcome, tape = s.record_fight(
+        encounter=encounter, random_source=RandomSource(seed=12)
+    )
+    replayed = s.replay_fight(encounter=encounter, tape=tape)
+    assert replayed.result() == outcome
+    assert replayed.event_log == []
+    assert encounter.has_started is False
+    with pytest.raises(ValueError):
+        s.replay_fight(encounter=encounter, tape=tape._replace(dice=tape.dice[:5]))
+
+
+def enemies_win(outcome) -> bool:
+    """Keep policy picking out the fights the goblins win."""
+    return outcome.winner == h.Faction.ENEMIES
+
+
+def test_keep(encounter) -> None:
+    """Kept fights are labelled, match across workers and can be fought again."""
+    result = s.simulate(
+        encounter=encounter, n=60, workers=1, seed=3, chunk_size=20, keep=enemies_win
+    )
+    assert len(result.kept) == result.wins[h.Faction.ENEMIES] > 0
+    pooled = s.simulate(
+        encounter=encounter, n=60, workers=2, seed=3, chunk_size=20, keep=enemies_win
+    )
+    labels = [(kept.chunk, kept.fight, kept.outcome) for kept in result.kept]
+    assert labels == [(kept.chunk, kept.fight, kept.outcome) for kept in pooled.kept]
+    assert {kept.chunk for kept in result.kept} <= {0, 1, 2}
+    for kept in result.kept:
+        outcome, tape = s.record_fight(
+            encounter=encounter, random_source=kept.random_source
+        )
+        assert outcome == kept.outcome
+        assert s.replay_fight(encounter=encounter, tape=tape).result() == outcome
+
+
+def test_wilson_interval() -> None:
+    """Intervals match known values and stay inside [0, 1]."""
+    assert s.z_score(confidence=0.95) == pytest.approx(1.959964, abs=1e-6)
+    low, high = s.wilson_interval(successes=0, trials=10, z=1.96)
+    assert low == 0
+    assert high == pytest.approx(0.2775, abs=1e-4)
+    low, high = s.wilson_interval(successes=50, trials=100, z=1.96)
+    assert (low, high) == pytest.approx((0.4038, 0.5962), abs=1e-4)
+
+
+def test_simulate_stops_early(encounter) -> None:
+    """A lopsided fight stops once its win rates are precise enough."""
+    encounter.remove_combatant(combatant_to_remove=encounter.combatant_list[-1])
+    encounter.remove_combatant(combatant_to_remove=encounter.combatant_list[-1])
+    result = s.simulate(
+        encounter=encounter,
+        n=100000,
+        workers=1,
+        seed=6,
+        chunk_size=50,
+        precision=0.05,
+    )
+    assert result.fights < 1000
+    assert result.fights % 50 == 0
+    assert result.converged(precision=0.05)
+    assert not result.converged(precision=0.001)
+    low, high = result.win_rate_interval(side=h.Faction.PCS)
+    assert low <= result.win_rate(side=h.Faction.PCS) <= high
+    assert high - low <= 0.1
+    assert result == s.simulate(
+        encounter=encounter,
+        n=100000,
+        workers=2,
+        seed=6,
+        chunk_size=50,
+        precision=0.05,
+    )
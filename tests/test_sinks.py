@@ -0,0 +1,133 @@
+"""Test cases for the sinks module."""
+import io
+import json
+import threading
+
+import pytest
+
+from dot_combat import events as ev
+from dot_combat import sinks
+from dot_combat.helpers import DamageType
+
+
+def make_entries(count: int):
+    """A batch of narrative and technical entries."""
+    entries = []
+    for index in range(count):
+        if index % 2:
+            values = (index, DamageType.FIRE)
+            entries.append(
+                ev.LogEntry(1, 12, ev.Event.DAMAGE_DEALT, "Orc", None, values)
+            )
+        else:
+            entries.append(ev.LogEntry(1, 12, ev.Event.STARTING_ROUND, values=(index,)))
+    return entries
+
+
+def test_null_and_memory_sinks() -> None:
+    """Null sinks discard entries and memory sinks keep them."""
+    entries = make_entries(count=4)
+    null_sink = sinks.NullSink()
+    null_sink.write(entries=entries)
+    null_sink.close()
+    memory_sink = sinks.MemorySink()
+    memory_sink.write(entries=entries[:2])
+    memory_sink.write(entries=entries[2:])
+    memory_sink.close()
+    assert memory_sink.entries == entries
+
+
+def test_print_sink(capsys) -> None:
+    """Print sinks print the narrative log, then the technical log."""
+    entries = make_entries(count=2)
+    stream = io.StringIO()
+    sinks.PrintSink(stream=stream).write(entries=entries)
+    assert stream.getvalue() == (
+        "\nR: 1  I:12 Orc causes 1 HP of DamageType.FIRE damage.\n\n\n"
+        "R: 1  I:12 Starting round 0.\n\n"
+    )
+    stdout_sink = sinks.PrintSink()
+    stdout_sink.write(entries=entries)
+    stdout_sink.flush()
+    assert "Starting round 0." in capsys.readouterr().out
+
+
+def test_jsonl_sink() -> None:
+    """JSONL sinks write one JSON object per entry."""
+    stream = io.StringIO()
+    sink = sinks.JsonlSink(stream=stream)
+    sink.write(entries=make_entries(count=2))
+    sink.flush()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert lines[0]["event"] == "STARTING_ROUND"
+    assert lines[1] == {
+        "round": 1,
+        "initiative": 12,
+        "event": "DAMAGE_DEALT",
+        "actor": "Orc",
+        "target": None,
+        "values": [1, "FIRE"],
+        "text": "Orc causes 1 HP of DamageType.FIRE damage.",
+    }
+
+
+def test_rotating_file_sink(tmp_path) -> None:
+    """Files are rotated when a batch would take them past max_bytes."""
+    path = tmp_path / "combat.log"
+    sink = sinks.RotatingFileSink(path=path, max_bytes=100, backup_count=2)
+    for _ in range(4):
+        sink.write(entries=make_entries(count=2))
+        sink.flush()
+    sink.close()
+    assert path.read_text().count("Starting round 0.") == 1
+    assert (tmp_path / "combat.log.1").exists()
+    assert (tmp_path / "combat.log.2").exists()
+    assert not (tmp_path / "combat.log.3").exists()
+    no_backups = sinks.RotatingFileSink(path=path, max_bytes=10, backup_count=0)
+    no_backups.write(entries=make_entries(count=2))
+    no_backups.write(entries=make_entries(count=1))
+    no_backups.close()
+    assert path.read_text() == "R: 1  I:12 Starting round 0.\n"
+
+
+def test_threaded_sink() -> None:
+    """Batches written through a ThreadedSink all reach the inner sink."""
+    inner = sinks.MemorySink()
+    sink = sinks.ThreadedSink(sink=inner, max_batches=2)
+    batches = [make_entries(count=3) for _ in range(10)]
+    for batch in batches:
+        sink.write(entries=batch)
+    sink.flush()
+    assert inner.entries == [entry for batch in batches for entry in batch]
+    sink.close()
+    assert not sink.thread.is_alive()
+
+
+class FailingSink(sinks.MemorySink):
+    """Raises on every batch, once it is released."""
+
+    def __init__(self) -> None:
+        """New sink, held until release is set."""
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, entries) -> None:
+        """Wait for release, then fail."""
+        self.release.wait()
+        raise OSError("disk full")
+
+
+def test_threaded_sink_error() -> None:
+    """An error in the inner sink is raised again instead of hanging."""
+    inner = FailingSink()
+    sink = sinks.ThreadedSink(sink=inner, max_batches=1)
+    sink.write(entries=make_entries(count=1))
+    sink.write(entries=make_entries(count=1))
+    inner.release.set()
+    with pytest.raises(OSError, match="disk full"):
+        sink.flush()
+    with pytest.raises(OSError, match="disk full"):
+        sink.write(entries=make_entries(count=1))
+    with pytest.raises(OSError, match="disk full"):
+        sink.close()
+    assert not sink.thread.is_alive()
@@ -0,0 +1,156 @@
+"""Test cases for the solver module."""
+import pytest
+
+from dot_combat import helpers as h
+from dot_combat import simulate as s
+from dot_combat import solver as so
+from dot_combat.attack import Attack
+from dot_combat.combat import Combat
+from dot_combat.combatant import Combatant
+from dot_combat.rng import RandomSource
+from dot_combat.sinks import NullSink
+
+
+def attack(attack_bonus=4, damage_dice="1d6", damage_bonus=2):
+    """A melee Attack."""
+    return Attack(
+        name="Scimitar",
+        attack_bonus=attack_bonus,
+        damage_dice=damage_dice,
+        damage_bonus=damage_bonus,
+        damage_type=h.DamageType.SLASHING,
+        range=5,
+        long_range=None,
+    )
+
+
+def rolled(combatants):
+    """A Combat of the Combatants, with initiative rolled."""
+    combat = Combat(
+        combatant_list=combatants,
+        random_source=RandomSource(seed=2),
+        log_sink=NullSink(),
+    )
+    combat.fill_initiative_list()
+    return combat
+
+
+def test_duel() -> None:
+    """Two 1 HP Combatants who only hit on a natural 20: a geometric duel."""
+    first, second = [
+        Combatant(
+            max_hit_points=1,
+            armor_class=30,
+            attacks=[attack(attack_bonus=0)],
+            faction=faction,
+        )
+        for faction in (h.Faction.PCS, h.Faction.ENEMIES)
+    ]
+    combat = rolled(combatants=[first, second])
+    leader = combat.turn_order.slots[0].faction
+    result = so.solve(encounter=combat)
+    assert result.win_rate(side=leader) == pytest.approx(1 / 1.95)
+    assert result.win_rate(side=None) == 0
+    assert result.expected_rounds == pytest.approx(1 / (1 - 0.95**2))
+
+
+def test_matches_simulation() -> None:
+    """The exact answer agrees with simulating the same turn order."""
+    combat = rolled(
+        combatants=[
+            Combatant(
+                max_hit_points=12,
+                armor_class=16,
+                attacks=[attack()],
+                faction=h.Faction.PCS,
+            )
+            for _ in range(2)
+        ]
+        + [Combatant(max_hit_points=7, armor_class=15, attacks=[attack()])]
+    )
+    result = so.solve(encounter=combat)
+    assert sum(result.wins.values()) == pytest.approx(1)
+    simulated = s.simulate(encounter=combat, n=1000, workers=1, seed=5)
+    assert simulated.win_rate(side=h.Faction.PCS) == pytest.approx(
+        result.win_rate(side=h.Faction.PCS), abs=0.05
+    )
+    assert simulated.mean_rounds() == pytest.approx(result.expected_rounds, rel=0.1)
+
+
+def test_solve_from_any_state() -> None:
+    """Started, one-sided and stalled fights are all solved from where they are."""
+    big_hitter = Combatant(
+        max_hit_points=20,
+        armor_class=12,
+        attacks=[attack(damage_dice="1d2", damage_bonus=10)],
+        faction=h.Faction.PCS,
+    )
+    ogre = Combatant(max_hit_points=20, armor_class=12, attacks=[attack()])
+    combat = rolled(combatants=[big_hitter, ogre])
+    combat.start_combat()
+    combat.advance_combatant()
+    combat.advance_combatant()
+    result = so.solve(encounter=combat)
+    assert result.expected_rounds > 2
+    assert sum(result.wins.values()) == pytest.approx(1)
+    alone = so.solve(encounter=rolled(combatants=[ogre]))
+    assert alone == so.SolverResult(
+        wins={h.Faction.ENEMIES: 1.0, None: 0.0}, expected_rounds=1
+    )
+    unarmed = [
+        Combatant(max_hit_points=5, armor_class=10, attacks=[], faction=faction)
+        for faction in (h.Faction.PCS, h.Faction.ENEMIES)
+    ]
+    assert so.solve(encounter=rolled(combatants=unarmed)).win_rate(side=None) == 1
+
+
+def test_unsolvable() -> None:
+    """Fights outside the solver's rules are refused."""
+    with pytest.raises(ValueError):
+        so.solve(encounter=Combat(combatant_list=[], log_sink=NullSink()))
+    undying = Combatant(
+        max_hit_points=5,
+        armor_class=10,
+        attacks=[attack()],
+        removal_condition=h.RemovalConditions.DEAD,
+    )
+    with pytest.raises(ValueError):
+        so.solve(encounter=rolled(combatants=[undying]))
+    healer = Combatant(
+        max_hit_points=5,
+        armor_class=10,
+        attacks=[attack(damage_dice="1d4", damage_bonus=-5)],
+        faction=h.Faction.PCS,
+    )
+    target = Combatant(max_hit_points=5, armor_class=10, attacks=[])
+    with pytest.raises(ValueError):
+        so.solve(encounter=rolled(combatants=[healer, target]))
+
+
+def test_long_fights() -> None:
+    """Hundreds of hits in a row need no recursion; too many states are refused."""
+    tank = Combatant(
+        max_hit_points=600,
+        armor_class=25,
+        attacks=[attack(attack_bonus=0, damage_dice="1d1", damage_bonus=0)],
+        faction=h.Faction.PCS,
+    )
+    pest = Combatant(
+        max_hit_points=1,
+        armor_class=30,
+        attacks=[attack(attack_bonus=30, damage_dice="1d1", damage_bonus=0)],
+    )
+    result = so.solve(encounter=rolled(combatants=[tank, pest]))
+    assert sum(result.wins.values()) == pytest.approx(1)
+    assert result.win_rate(side=h.Faction.PCS) > 0.99
+    duellists = [
+        Combatant(
+            max_hit_points=400,
+            armor_class=10,
+            attacks=[attack(damage_dice="1d1", damage_bonus=0)],
+            faction=faction,
+        )
+        for faction in (h.Faction.PCS, h.Faction.ENEMIES)
+    ]
+    with pytest.raises(ValueError, match="too large"):
+        so.solve(encounter=rolled(combatants=duellists), max_states=1000)
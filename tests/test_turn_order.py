@@ -0,0 +1,106 @@
+"""Test cases for the turn_order module."""
+import pytest
+
+from dot_combat import turn_order as t
+from dot_combat.combatant import Combatant
+
+
+def make_combatants(count: int):
+    """Combatants with no attacks."""
+    return [
+        Combatant(
+            max_hit_points=1,
+            current_hit_points=1,
+            control="DM",
+            armor_class=10,
+            attacks=[],
+        )
+        for _ in range(count)
+    ]
+
+
+def test_insert_keeps_order() -> None:
+    """Slots are by descending initiative, then by order of joining."""
+    first, second, third, fourth = make_combatants(count=4)
+    turn_order = t.TurnOrder()
+    turn_order.insert(combatant=first, initiative=10)
+    turn_order.insert(combatant=second, initiative=15)
+    turn_order.insert(combatant=third, initiative=10)
+    turn_order.insert(combatant=fourth, initiative=5)
+    assert turn_order.slots == [second, first, third, fourth]
+    assert len(turn_order) == 4
+    assert third in turn_order
+    assert turn_order.initiative_of(combatant=third) == 10
+    with pytest.raises(ValueError):
+        turn_order.insert(combatant=first, initiative=1)
+
+
+def test_advance_wraps() -> None:
+    """Advancing goes round the slots in order."""
+    first, second = make_combatants(count=2)
+    turn_order = t.TurnOrder()
+    turn_order.insert(combatant=first, initiative=12)
+    turn_order.insert(combatant=second, initiative=3)
+    assert turn_order.start() == first
+    assert turn_order.current_initiative() == 12
+    assert turn_order.peek() == second
+    assert turn_order.advance() == second
+    assert turn_order.current_initiative() == 3
+    assert turn_order.peek() == first
+    assert turn_order.advance() == first
+
+
+def test_cursor_follows_changes() -> None:
+    """Joining and leaving does not change who is current or next."""
+    first, second, third, fourth, fifth = make_combatants(count=5)
+    turn_order = t.TurnOrder()
+    turn_order.insert(combatant=first, initiative=15)
+    turn_order.insert(combatant=second, initiative=10)
+    turn_order.insert(combatant=third, initiative=5)
+    turn_order.start()
+    turn_order.advance()
+    turn_order.insert(combatant=fourth, initiative=20)
+    assert turn_order.current() == second
+    turn_order.insert(combatant=fifth, initiative=1)
+    assert turn_order.current() == second
+    assert turn_order.remove(combatant=second) == 10
+    assert turn_order.peek() == third
+    assert turn_order.advance() == third
+    turn_order.remove(combatant=third)
+    assert turn_order.advance() == fifth
+    turn_order.remove(combatant=fourth)
+    assert turn_order.peek() == first
+    with pytest.raises(ValueError):
+        turn_order.remove(combatant=fourth)
+    turn_order.clear()
+    assert len(turn_order) == 0
+
+
+def test_remove_top_then_insert() -> None:
+    """Joining after the top Combatant leaves on its turn keeps the order."""
+    first, second, third, fourth = make_combatants(count=4)
+    turn_order = t.TurnOrder()
+    turn_order.insert(combatant=first, initiative=15)
+    turn_order.insert(combatant=second, initiative=10)
+    turn_order.start()
+    turn_order.remove(combatant=first)
+    turn_order.insert(combatant=third, initiative=20)
+    assert turn_order.cursor == 0
+    assert turn_order.current() == third
+    assert turn_order.peek() == second
+    turn_order.insert(combatant=fourth, initiative=12)
+    assert turn_order.slots == [third, fourth, second]
+    assert turn_order.advance() == fourth
+    assert turn_order.gap is None
+
+
+def test_descending_helpers() -> None:
+    """Bisection helpers for lists of initiatives in descending order."""
+    values = [20, 10]
+    t.insert_descending(values=values, value=15)
+    t.insert_descending(values=values, value=5)
+    t.insert_descending(values=values, value=25)
+    assert values == [25, 20, 15, 10, 5]
+    assert t.next_lower(values=values, value=20) == 15
+    assert t.next_lower(values=values, value=12) == 10
+    assert t.next_lower(values=values, value=5) == 25